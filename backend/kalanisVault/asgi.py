@@ -2,6 +2,9 @@
 ASGI config for kalanisVault project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving it with an ASGI server runs the native async read endpoints under
+/api/v1/async/ without tying up a thread per request while they wait on
+the database; the rest of the API runs in a thread pool as under WSGI.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -0,0 +1,140 @@
+"""
+Support for the native async read endpoints under /api/v1/async/.
+
+DRF views are synchronous, so these endpoints are plain Django async views
+wrapped by async_api_view, which does what APIView would: authenticate the
+JWT with the async ORM, require a logged-in user, allow only GET and HEAD,
+render errors through DRF's exception handler and render data with DRF's
+JSON renderer, so responses match their synchronous twins.
+
+The endpoints reuse their viewset's queryset and serializer setup through
+drf_view and only run the queries themselves. Serializers must get data
+that is already loaded, because touching the database from sync code in
+an async view raises SynchronousOnlyOperation.
+
+Django's async ORM still runs each query on a thread per request, so the
+gain is in how many requests a worker can keep in flight, not in faster
+individual queries; serve kalanisVault.asgi with an ASGI server to get it.
+"""
+import functools
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+User = get_user_model()
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the user with the async ORM. Token
+    validation does no I/O and is inherited unchanged.
+    """
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Async version of JWTAuthentication.get_user"""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+        return user
+
+
+authentication = AsyncJWTAuthentication()
+
+
+def render(data, status=200, headers=None):
+    """Return data rendered the way a DRF Response would be"""
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status,
+        headers=headers,
+        content_type='application/json',
+    )
+
+
+async def alist(queryset):
+    """Evaluate a queryset with async iteration, prefetches included"""
+    return [obj async for obj in queryset]
+
+
+def drf_view(view_class, request, action, **kwargs):
+    """
+    Return an instance of a synchronous DRF view set up for ``request``, to
+    borrow its queryset, filter and serializer logic.
+    """
+    drf_request = Request(request, authenticators=())
+    drf_request.user = request.user
+    return view_class(
+        request=drf_request, action=action, format_kwarg=None, args=(), kwargs=kwargs
+    )
+
+
+def async_api_view(view):
+    """
+    Turn an async Django view into an authenticated, read-only API endpoint;
+    see the module docstring.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            if request.method not in SAFE_METHODS:
+                raise exceptions.MethodNotAllowed(request.method)
+
+            result = await authentication.aauthenticate(request)
+            request.user = result[0] if result else AnonymousUser()
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+
+            return await view(request, *args, **kwargs)
+        except Exception as error:
+            if isinstance(error, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                error.auth_header = authentication.authenticate_header(request)
+
+            response = exception_handler(error, {'request': request})
+            if response is None:
+                raise
+            headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+            if isinstance(error, exceptions.MethodNotAllowed):
+                headers['Allow'] = ', '.join(SAFE_METHODS)
+            return render(response.data, status=response.status_code, headers=headers)
+
+    return wrapper
@@ -0,0 +1,64 @@
+"""
+Helpers for answering conditional GETs.
+
+Views compute a validator from a cheap query (timestamps, counters and IDs
+instead of the serialized payload) and pass a render callable that builds
+the full response. When the request's If-None-Match or If-Modified-Since
+header still matches, a bodiless 304 is returned and render never runs.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Hash the validator parts into a quoted ETag"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return quote_etag(digest)
+
+
+def latest(*timestamps):
+    """Return the most recent of the given timestamps, ignoring None"""
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    return max(timestamps) if timestamps else None
+
+
+def set_validators(response, etag, last_modified=None):
+    """
+    Attach the validators to a response. Responses are per-user, so they
+    may only be stored privately and must be revalidated before reuse.
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def conditional_response(request, render, etag, last_modified=None):
+    """
+    Return a 304 if the request's preconditions show the client already
+    has the current representation, otherwise the result of render().
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+    if response is None:
+        response = render()
+    return set_validators(response, etag, last_modified)
+
+
+async def aconditional_response(request, render, etag, last_modified=None):
+    """Async version of conditional_response, awaiting render()"""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+    if response is None:
+        response = await render()
+    return set_validators(response, etag, last_modified)
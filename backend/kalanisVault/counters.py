@@ -0,0 +1,35 @@
+"""
+Helpers for the denormalized counter columns kept by the apps. Signal
+handlers adjust counters with F() expressions as rows change, and the
+recount commands rebuild them with correlated COUNT subqueries.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def count_subquery(queryset, field):
+    """
+    Build a correlated COUNT subquery over ``queryset`` grouped on ``field``.
+
+    Unlike ``Count()`` across a join, several of these can be used on the
+    same queryset without multiplying rows.
+    """
+    counts = queryset.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def adjust(queryset, field, delta, **changes):
+    """
+    Add ``delta`` to ``field`` on every row of ``queryset`` in one UPDATE,
+    together with any other field ``changes``. Decrements are clamped at
+    zero so drift can never violate the positive-integer constraint.
+    """
+    if not delta:
+        return
+    if delta > 0:
+        value = F(field) + delta
+    else:
+        value = Greatest(F(field) + delta, 0)
+    queryset.update(**{field: value}, **changes)
@@ -0,0 +1,186 @@
+"""
+Request-scoped routing between the primary database and read replicas.
+
+ReplicaRoutingMiddleware decides per request where reads go and keeps
+the decision in a context variable, which ReplicaRouter consults:
+
+- Requests with a safe method (GET, HEAD, OPTIONS) read from one replica
+  of READ_REPLICAS['ALIASES'], picked once per request.
+- Other requests use the primary for everything.
+- A write during a safe request pins the rest of that request to the
+  primary, so it reads its own writes.
+- A session that wrote is pinned to the primary for
+  READ_REPLICAS['STICKY_SECONDS'] afterwards, the lag window replicas
+  need to catch up. Sessions are told apart by their Authorization header
+  (JWT clients) or session cookie, and remembered in the default cache;
+  a cookie carries the pin as well, for browsers.
+
+Code running outside a request (management commands, background threads)
+always uses the primary. With no replicas configured every query does.
+The default cache must be shared between workers (e.g. Redis) for the
+session pin to hold across them; the cookie works either way.
+"""
+import contextvars
+import hashlib
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+KEY_PREFIX = 'db_router:pinned'
+
+
+class RoutingState:
+    """Where the current request reads from, and whether it wrote"""
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+def replica_aliases():
+    return settings.READ_REPLICAS['ALIASES']
+
+
+def pin_to_primary():
+    """Send the rest of the current request's reads to the primary"""
+    state = _state.get()
+    if state is not None:
+        state.replica = None
+
+
+@contextmanager
+def routing(replica=None):
+    """Route reads in the block to ``replica``, or the primary if None"""
+    token = _state.set(RoutingState(replica))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending reads to the replica chosen for the current
+    request and every write to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        # Related objects come from where the instance was loaded
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        state = _state.get()
+        if state is None or state.replica is None:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.replica = None
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def _session_key(request):
+    credential = (
+        request.headers.get('Authorization')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credential:
+        return None
+    digest = hashlib.blake2b(credential.encode(), digest_size=16).hexdigest()
+    return f"{KEY_PREFIX}:{digest}"
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Choose the database a request reads from; see the module docstring.
+    Runs natively under both WSGI and ASGI: the routing state is a context
+    variable, which sync_to_async carries into the threads that run sync
+    views and ORM calls.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        aliases = replica_aliases()
+        if not aliases:
+            return self.get_response(request)
+
+        session_key = _session_key(request)
+        pinned = self.must_pin(request) or (
+            session_key is not None and cache.get(session_key) is not None
+        )
+        with routing(None if pinned else random.choice(aliases)) as state:
+            response = self.get_response(request)
+
+        if state.wrote:
+            if session_key is not None:
+                cache.set(session_key, True, settings.READ_REPLICAS['STICKY_SECONDS'])
+            self.set_pin_cookie(request, response)
+        return response
+
+    async def __acall__(self, request):
+        aliases = replica_aliases()
+        if not aliases:
+            return await self.get_response(request)
+
+        session_key = _session_key(request)
+        pinned = self.must_pin(request) or (
+            session_key is not None and await cache.aget(session_key) is not None
+        )
+        with routing(None if pinned else random.choice(aliases)) as state:
+            response = await self.get_response(request)
+
+        if state.wrote:
+            if session_key is not None:
+                await cache.aset(session_key, True, settings.READ_REPLICAS['STICKY_SECONDS'])
+            self.set_pin_cookie(request, response)
+        return response
+
+    def must_pin(self, request):
+        """Whether the request reads from the primary regardless of the cache"""
+        return (
+            request.method not in SAFE_METHODS
+            or settings.READ_REPLICAS['COOKIE_NAME'] in request.COOKIES
+        )
+
+    def set_pin_cookie(self, request, response):
+        config = settings.READ_REPLICAS
+        response.set_cookie(
+            config['COOKIE_NAME'], '1',
+            max_age=config['STICKY_SECONDS'],
+            httponly=True,
+            samesite='Lax',
+            secure=request.is_secure(),
+        )
@@ -0,0 +1,231 @@
+"""
+Upload-time image pipeline.
+
+Each image field listed in IMAGE_PIPELINE['VARIANTS'] gets a JSON field
+named ``<field>_variants``. When a new upload is saved, it is decoded once
+in a worker thread pool after the transaction commits. The decoded image is
+resized to every configured size, each size is written in every configured
+format, and a tiny base64 LQIP placeholder is added. The result is recorded
+on the row as:
+
+    {"source": <name of the original>,
+     "lqip": "data:image/webp;base64,...",
+     "sizes": {"sm": {"width": 64, "height": 64,
+                      "webp": <name>, "jpeg": <name>}, ...}}
+
+An upload that cannot be processed is recorded as {"source": <name>,
+"error": <message>}, so later saves of the row do not schedule it again;
+``build_image_variants --retry-failed`` retries those.
+
+Variants are saved as ``<upload dir>/variants/<original file name>/<size>.<ext>``
+so the original can always be recovered from a variant's name, even when
+the storage files them one level further down (see playlists.storage).
+"""
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger('kalanisVault')
+
+VARIANTS_DIR = 'variants'
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+_executor = None
+
+# Sent with sender=model, pk and field_name once variants are recorded,
+# since they are written with update() and no post_save is sent
+variants_ready = Signal()
+
+
+def variants_field(field_name):
+    return f"{field_name}_variants"
+
+
+def get_config(model, field_name):
+    """Return the variant config of an image field, or None if it has none"""
+    return settings.IMAGE_PIPELINE['VARIANTS'].get(f"{model._meta.label}.{field_name}")
+
+
+def variant_name(source, size, image_format):
+    directory, _, file_name = source.rpartition('/')
+    return f"{directory}/{VARIANTS_DIR}/{file_name}/{size}.{EXTENSIONS[image_format]}"
+
+
+def source_name(name):
+    """Return the original a variant was made from, or the name itself"""
+    directory, marker, rest = name.partition(f"/{VARIANTS_DIR}/")
+    if not marker or '/' not in rest:
+        return name
+    # The storage may nest the variant further below the original's name
+    return f"{directory}/{rest.split('/', 1)[0]}"
+
+
+def variant_names(variants):
+    """Return every file name recorded in a variants dict"""
+    return [
+        name
+        for size in (variants or {}).get('sizes', {}).values()
+        for image_format, name in size.items()
+        if image_format in EXTENSIONS
+    ]
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PIPELINE['WORKERS'],
+            thread_name_prefix='image-pipeline'
+        )
+    return _executor
+
+
+def process_on_commit(instance, field_name, using=None, update_fields=None):
+    """
+    Schedule variants for an instance's image once the transaction commits,
+    unless the save did not write the field, or the current upload already
+    has them (or failed to get them) or is the field's default.
+    """
+    if update_fields is not None and field_name not in update_fields:
+        return
+    field = instance._meta.get_field(field_name)
+    name = getattr(instance, field_name).name
+    variants = getattr(instance, variants_field(field_name)) or {}
+    if not name or name == field.default or variants.get('source') == name:
+        return
+
+    task = partial(_run, type(instance), instance.pk, field_name, name)
+    if settings.IMAGE_PIPELINE['ASYNC']:
+        transaction.on_commit(lambda: _get_executor().submit(task), using=using)
+    else:
+        transaction.on_commit(task, using=using)
+
+
+def process(model, pk, field_name, name):
+    """
+    Build and record the variants of one upload in the calling thread. A
+    failure is recorded on the row before it is raised.
+    """
+    try:
+        variants = build_variants(name, get_config(model, field_name))
+    except Exception as error:
+        _record(model, pk, field_name, name, {'source': name, 'error': str(error) or repr(error)})
+        raise
+    if _record(model, pk, field_name, name, variants):
+        variants_ready.send(sender=model, pk=pk, field_name=field_name)
+        return True
+    return False
+
+
+def _record(model, pk, field_name, name, variants):
+    # Only record them if the row still holds the same upload
+    changes = {variants_field(field_name): variants}
+    if any(field.name == 'updated_at' for field in model._meta.fields):
+        changes['updated_at'] = timezone.now()
+    return model._default_manager.filter(pk=pk, **{field_name: name}).update(**changes)
+
+
+def _run(model, pk, field_name, name):
+    close_old_connections()
+    try:
+        process(model, pk, field_name, name)
+    except Exception:
+        logger.exception("Failed to build image variants for %s", name)
+    finally:
+        close_old_connections()
+
+
+def _encode(image, image_format, quality):
+    if image_format == 'jpeg' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, format=image_format.upper(), quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def build_variants(source, config):
+    """
+    Decode ``source`` from the default storage once and write its variants.
+    Sizes are produced largest first, each resized from the previous one.
+    """
+    pipeline = settings.IMAGE_PIPELINE
+    sizes = sorted(config['sizes'].items(), key=lambda item: item[1], reverse=True)
+
+    with default_storage.open(source, 'rb') as file:
+        image = Image.open(file)
+        # Lets JPEG decoding skip straight to a reduced scale
+        image.draft('RGB', (sizes[0][1], sizes[0][1]))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    result = {'source': source, 'sizes': {}}
+    for size_name, size in sizes:
+        if config.get('crop'):
+            image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        else:
+            image = image.copy()
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        entry = {'width': image.width, 'height': image.height}
+        for image_format in pipeline['FORMATS']:
+            name = variant_name(source, size_name, image_format)
+            default_storage.delete(name)
+            entry[image_format] = default_storage.save(
+                name, ContentFile(_encode(image, image_format, pipeline['QUALITY']))
+            )
+        result['sizes'][size_name] = entry
+
+    lqip = image.copy()
+    lqip.thumbnail((pipeline['LQIP_SIZE'], pipeline['LQIP_SIZE']))
+    encoded = base64.b64encode(_encode(lqip, 'webp', 30)).decode('ascii')
+    result['lqip'] = f"data:image/webp;base64,{encoded}"
+    return result
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only field rendering the variants of an image field with absolute
+    URLs, or None until the current upload has been processed.
+    """
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        variants = getattr(instance, variants_field(self.image_field)) or {}
+        name = getattr(instance, self.image_field).name
+        if not name or variants.get('source') != name or 'error' in variants:
+            return None
+
+        request = self.context.get('request')
+
+        def url(name):
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        return {
+            'lqip': variants['lqip'],
+            'sizes': {
+                size_name: {
+                    key: url(value) if key in EXTENSIONS else value
+                    for key, value in entry.items()
+                }
+                for size_name, entry in variants['sizes'].items()
+            }
+        }
@@ -0,0 +1,171 @@
+"""
+Per-request query budgets, to catch N+1 regressions before production does.
+
+QueryBudgetMiddleware counts the queries a request runs and the time they
+take, on every database alias. Counting is done by an execute wrapper
+installed on each connection, which records into a context variable set
+for the request, so queries that async views run in sync_to_async threads
+are counted too and background threads are not.
+
+A request is over budget when it runs more queries than the budget for
+its URL name in QUERY_BUDGET['BUDGETS'] (QUERY_BUDGET['MAX_QUERIES'] for
+others), or when one SQL template repeats more than
+QUERY_BUDGET['MAX_REPEATS'] times, the mark of a query per row. Requests
+over budget are logged, or fail with QueryBudgetExceeded when
+QUERY_BUDGET['RAISE'] is set, as in development and tests.
+
+With QUERY_BUDGET['HEADERS'] every response carries X-Query-Count and a
+Server-Timing entry with the database time. The middleware is opt-in:
+unless QUERY_BUDGET['ENABLED'] is set it removes itself at startup.
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('kalanisVault')
+
+# Literals and IN lists, which vary between queries of the same template
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r"\bIN \((?:\s*(?:%s|\?)\s*,?)+\)")
+WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised for a request over its query budget when QUERY_BUDGET['RAISE'] is set"""
+
+
+def sql_template(sql):
+    """Reduce SQL to a template shared by queries differing only in values"""
+    sql = LITERALS.sub('?', sql)
+    sql = IN_LISTS.sub('IN (...)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """Queries run for one request"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.duration = 0.0
+        self.templates = Counter()
+
+    def record(self, sql, duration):
+        template = sql_template(sql)
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            self.templates[template] += 1
+
+    def repeated(self, limit):
+        """Return (template, count) for templates run more than limit times"""
+        with self._lock:
+            return [
+                (template, count) for template, count in self.templates.most_common()
+                if count > limit
+            ]
+
+
+_stats = contextvars.ContextVar('query_stats', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record(sql, time.perf_counter() - started)
+
+
+def install_wrapper(connection, **kwargs):
+    """Make a connection report its queries to the current request"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class QueryBudgetMiddleware:
+    """
+    Count each request's queries and enforce its budget; see the module
+    docstring.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET['ENABLED']:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_wrapper, dispatch_uid='query_budget')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        # Connections opened before the signal was connected
+        for connection in connections.all(initialized_only=True):
+            install_wrapper(connection)
+
+        stats = QueryStats()
+        token = _stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        return self.check(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = _stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stats.reset(token)
+        return self.check(request, response, stats)
+
+    def get_budget(self, request):
+        """Return the view name and query budget of the request"""
+        config = settings.QUERY_BUDGET
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        return view_name, config['BUDGETS'].get(view_name, config['MAX_QUERIES'])
+
+    def check(self, request, response, stats):
+        config = settings.QUERY_BUDGET
+        if config['HEADERS']:
+            response['X-Query-Count'] = str(stats.count)
+            timing = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f"{existing}, {timing}" if existing else timing
+
+        view_name, budget = self.get_budget(request)
+        repeated = stats.repeated(config['MAX_REPEATS'])
+        if stats.count <= budget and not repeated:
+            return response
+
+        problems = []
+        if stats.count > budget:
+            problems.append(f"{stats.count} queries (budget {budget})")
+        problems.extend(f"{count}x {template[:300]}" for template, count in repeated)
+        message = (
+            f"{request.method} {request.path} ({view_name}) over its query budget "
+            f"in {stats.duration * 1000:.1f}ms: " + '; '.join(problems)
+        )
+        if config['RAISE']:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        return response
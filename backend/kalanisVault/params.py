@@ -0,0 +1,19 @@
+"""
+Parsing of the page and limit query parameters of paginated endpoints.
+"""
+from rest_framework.exceptions import ValidationError
+
+
+def get_page_params(params, default_limit, max_limit):
+    """
+    Return (page, limit) from the query parameters, with page at least 1
+    and limit clamped to 1..max_limit. Values that are not integers raise
+    a ValidationError, which the API answers with a 400.
+    """
+    values = {}
+    for name, default in (('page', 1), ('limit', default_limit)):
+        try:
+            values[name] = int(params.get(name, default))
+        except (TypeError, ValueError):
+            raise ValidationError({name: "A whole number is required."})
+    return max(values['page'], 1), min(max(values['limit'], 1), max_limit)
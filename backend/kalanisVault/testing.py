@@ -0,0 +1,189 @@
+"""
+Helpers shared by the test suites of the apps.
+"""
+import re
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from playlists import videos
+from playlists.models import Playlist, PlaylistView, Tag
+from users.models import User
+
+
+def create_user(number):
+    return User.objects.create_user(
+        email=f"user{number}@example.com",
+        username=f"user{number}",
+        first_name="Test",
+        last_name=f"User{number}",
+        password="password123!",
+        is_active=True,
+    )
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "Plans are checked with SQLite's EXPLAIN QUERY PLAN")
+# Queries are captured on the default connection, so keep reads off replicas
+@override_settings(READ_REPLICAS={**settings.READ_REPLICAS, 'ALIASES': []})
+class QueryPlanTestCase(TestCase):
+    """
+    Base class for tests that run an endpoint and check, with EXPLAIN QUERY
+    PLAN, that its queries on a table are served by an index.
+    """
+    def setUp(self):
+        cache.clear()
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    def get_plans(self, client, path, table, contains=''):
+        """
+        Request path and return the plans of its SELECTs reading table,
+        optionally only those whose SQL contains a fragment.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        pattern = re.compile(rf'^SELECT .* FROM "{table}"')
+        plans = [
+            self.query_plan(query['sql'])
+            for query in queries.captured_queries
+            if pattern.match(query['sql']) and contains in query['sql']
+        ]
+        self.assertTrue(plans, f"{path} did not read {table}")
+        return plans
+
+    def assertUsesIndex(self, plan, table, ordered=False):
+        """
+        Fail if the plan scans table without an index or, with ordered,
+        needs a temporary B-tree to sort the rows.
+        """
+        for step in plan:
+            self.assertNotRegex(
+                step, rf'^SCAN (TABLE )?{table}\b(?! USING)', f"Full scan of {table}: {plan}"
+            )
+            if ordered:
+                self.assertNotIn('TEMP B-TREE', step, f"{table} is sorted without an index: {plan}")
+
+
+class PlaylistDataMixin:
+    """
+    Forty playlists of four users with videos, a tag and views by the
+    first user, who the test client is logged in as.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(number) for number in range(4)]
+        tag = Tag.objects.create(name="music")
+        for number in range(40):
+            playlist = Playlist.objects.create(
+                title=f"Playlist {number}",
+                user=cls.users[number % 4],
+                is_public=number % 3 != 0,
+                view_count=number * 7 % 13,
+            )
+            playlist.tags.add(tag)
+            # Through add_videos so video_count matches, as it would in use
+            videos.add_videos(playlist, [
+                {'tiktok_url': f"https://example.com/{number}/{position}",
+                 'tiktok_id': f"{number}{position}"}
+                for position in range(5)
+            ])
+            PlaylistView.objects.create(user=cls.users[0], playlist=playlist)
+        cls.playlist = Playlist.objects.filter(user=cls.users[0]).first()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+
+def bearer(user):
+    return f"Bearer {AccessToken.for_user(user)}"
+
+
+@override_settings(
+    READ_REPLICAS={**settings.READ_REPLICAS, 'ALIASES': []},
+    PLAYLIST_VIEW_BUFFER={**settings.PLAYLIST_VIEW_BUFFER, 'FLUSH_INTERVAL': 0, 'JOURNAL_DIR': None},
+)
+class AsyncEndpointTestCase(TestCase):
+    """
+    Base class for tests comparing the async endpoints under /api/v1/async/
+    with their synchronous twins.
+    """
+    def setUp(self):
+        cache.clear()
+
+    async def assertSameResponse(self, user, path):
+        """Fetch path from both APIs as user and return the async response"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=bearer(user))
+        expected = await sync_to_async(client.get)(f'/api/v1/{path}')
+        response = await AsyncClient().get(
+            f'/api/v1/async/{path}', headers={'Authorization': bearer(user)}
+        )
+        self.assertEqual(response.status_code, expected.status_code, response.content)
+        self.assertEqual(response.json(), expected.json())
+        return response
+
+
+class StubServer:
+    """
+    Local HTTP server standing in for a remote host in tests of outbound
+    requests. ``routes`` maps a path to a function called with the request
+    handler that returns (status, headers, body); other paths get a 404.
+    Every request's path, with its query, is recorded in ``requests`` and
+    the client port it came from in ``ports``, so connection reuse shows.
+    """
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.requests = []
+        self.ports = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keeps connections open between requests, like a real upstream
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                server.ports.append(self.client_address[1])
+                route = server.routes.get(urlsplit(self.path).path)
+                status, headers, body = route(self) if route else (404, {}, b'')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.host = f"127.0.0.1:{self._server.server_port}"
+        threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True
+        ).start()
+
+    def url(self, path):
+        return f"http://{self.host}{path}"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
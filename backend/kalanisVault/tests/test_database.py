@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    """
+    Tests for the production DATABASE_PROFILES entry, on a scratch SQLite
+    database outside the test databases.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'profile.sqlite3')
+
+    def connect(self, profile):
+        config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': self.path,
+            **settings.DATABASE_PROFILES[profile],
+        }
+        configured = connections.configure_settings({
+            DEFAULT_DB_ALIAS: dict(settings.DATABASES[DEFAULT_DB_ALIAS]),
+            profile: config,
+        })
+        connection = DatabaseWrapper(configured[profile], alias=profile)
+        self.addCleanup(connection.close)
+        connection.ensure_connection()
+        return connection
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_production_settings(self):
+        profile = settings.DATABASE_PROFILES['production']
+        self.assertGreater(profile['CONN_MAX_AGE'], 0)
+        self.assertTrue(profile['CONN_HEALTH_CHECKS'])
+        self.assertEqual(profile['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            self.assertIn(f"PRAGMA {name}={value}", profile['OPTIONS']['init_command'])
+
+    def test_pragmas_are_applied_before_connection_created(self):
+        seen = {}
+
+        def check(sender, connection, **kwargs):
+            if connection.alias == 'production':
+                seen['journal_mode'] = self.pragma(connection, 'journal_mode')
+                seen['busy_timeout'] = self.pragma(connection, 'busy_timeout')
+
+        connection_created.connect(check)
+        self.addCleanup(connection_created.disconnect, check)
+        connection = self.connect('production')
+
+        self.assertEqual(seen, {
+            'journal_mode': 'wal',
+            'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout'],
+        })
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'temp_store'), 2)
+        self.assertEqual(self.pragma(connection, 'cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_development_keeps_sqlite_defaults(self):
+        connection = self.connect('development')
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'delete')
+        self.assertIsNone(connection.transaction_mode)
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from kalanisVault.db_router import ReplicaRoutingMiddleware
+from playlists.models import Tag
+
+
+# A second SQLite alias for the router tests, set up like the replicas of
+# DATABASE_REPLICA_URLS: a mirror of the test database
+REPLICA = 'replica1'
+if REPLICA not in connections.settings:
+    connections.settings[REPLICA] = {
+        **connections.settings['default'],
+        'TEST': {**connections.settings['default']['TEST'], 'MIRROR': 'default'},
+    }
+
+
+# A TransactionTestCase, as the replica connection cannot read rows the
+# default one has not committed
+@override_settings(READ_REPLICAS={**settings.READ_REPLICAS, 'ALIASES': [REPLICA]})
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory(headers={'Authorization': 'Bearer token'})
+
+    def view(self, write=False):
+        """A view that reads, and optionally writes then reads again"""
+        def view(request):
+            Tag.objects.count()
+            if write:
+                Tag.objects.create(name="tag")
+                Tag.objects.count()
+            return HttpResponse()
+        return view
+
+    def request(self, method='get', write=False, **kwargs):
+        """Return the response and the number of queries run per alias"""
+        middleware = ReplicaRoutingMiddleware(self.view(write))
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = middleware(getattr(self.factory, method)('/', **kwargs))
+        return response, {'default': len(primary), REPLICA: len(replica)}
+
+    def test_safe_reads_use_the_replica(self):
+        self.assertEqual(self.request()[1], {'default': 0, REPLICA: 1})
+
+    def test_writes_use_the_primary(self):
+        self.assertEqual(self.request('post')[1], {'default': 1, REPLICA: 0})
+        self.assertEqual(self.request('post', write=True)[1], {'default': 3, REPLICA: 0})
+
+    def test_write_pins_the_rest_of_the_request(self):
+        response, queries = self.request(write=True)
+        # The first read happens before the write; the rest follow it
+        self.assertEqual(queries, {'default': 2, REPLICA: 1})
+        self.assertIn(settings.READ_REPLICAS['COOKIE_NAME'], response.cookies)
+
+    def test_session_is_pinned_for_the_lag_window(self):
+        self.request('post', write=True)
+        self.assertEqual(self.request()[1], {'default': 1, REPLICA: 0})
+
+        # Another session still reads the replica
+        other = self.factory.get('/', headers={'Authorization': 'Bearer other'})
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            ReplicaRoutingMiddleware(self.view())(other)
+        self.assertEqual(len(replica), 1)
+
+        # Once the window has passed the session reads the replica again,
+        # unless a browser still sends the pin cookie
+        cache.clear()
+        self.assertEqual(self.request()[1], {'default': 0, REPLICA: 1})
+        self.factory.cookies[settings.READ_REPLICAS['COOKIE_NAME']] = '1'
+        self.assertEqual(self.request()[1], {'default': 1, REPLICA: 0})
+
+    def test_code_outside_requests_uses_the_primary(self):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            Tag.objects.count()
+        self.assertEqual((len(primary), len(replica)), (1, 0))
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from kalanisVault.middleware import QueryBudgetExceeded, QueryBudgetMiddleware, sql_template
+from kalanisVault.testing import PlaylistDataMixin
+from playlists.models import Playlist
+
+
+@override_settings(
+    QUERY_BUDGET={**settings.QUERY_BUDGET, 'ENABLED': True, 'RAISE': True},
+    READ_REPLICAS={**settings.READ_REPLICAS, 'ALIASES': []},
+    PLAYLIST_VIEW_BUFFER={**settings.PLAYLIST_VIEW_BUFFER, 'FLUSH_INTERVAL': 0, 'JOURNAL_DIR': None},
+)
+class QueryBudgetTests(PlaylistDataMixin, TestCase):
+    """
+    Tests for the query budget middleware, and that the hot endpoints stay
+    within their budgets.
+    """
+    def test_hot_endpoints_stay_within_budget(self):
+        for path in [
+            '/api/v1/playlists/', f'/api/v1/playlists/{self.playlist.pk}/',
+            '/api/v1/playlists/explore/', '/api/v1/playlists/search/?q=playlist',
+            '/api/v1/playlists/popular/', '/api/v1/playlists/recent_playlists/',
+            '/api/v1/playlists/my_playlists/', '/api/v1/playlists/liked_playlists/',
+            f'/api/v1/users/by-username/{self.users[1].username}/',
+            f'/api/v1/users/follow-status/{self.users[1].pk}/', '/api/v1/users/search/?q=user',
+        ]:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries"$')
+                self.assertGreater(int(response['X-Query-Count']), 0)
+
+    def test_budget_is_per_view(self):
+        budgets = {**settings.QUERY_BUDGET['BUDGETS'], 'playlist-popular': 0}
+        with override_settings(QUERY_BUDGET={**settings.QUERY_BUDGET, 'BUDGETS': budgets}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, '(playlist-popular)'):
+                self.client.get('/api/v1/playlists/popular/')
+
+    def test_repeated_queries_are_detected(self):
+        def view(request):
+            for playlist in Playlist.objects.all()[:10]:
+                playlist.user.username
+            return HttpResponse()
+
+        middleware = QueryBudgetMiddleware(view)
+        with self.assertRaisesMessage(QueryBudgetExceeded, '10x SELECT'):
+            middleware(RequestFactory().get('/'))
+
+    def test_templates_ignore_values(self):
+        self.assertEqual(
+            sql_template("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            sql_template("SELECT * FROM t WHERE id IN (%s)  AND name = 'y' LIMIT 1"),
+        )
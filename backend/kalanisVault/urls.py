@@ -9,6 +9,9 @@ urlpatterns = [
     path("api/v1/auth/", include('djoser.urls.jwt')),
     path("api/v1/", include('playlists.urls')),  
     path("api/v1/users/", include('users.urls')), 
+    # Async versions of the busiest read endpoints, for ASGI deployments
+    path("api/v1/async/", include('playlists.async_urls')),
+    path("api/v1/async/users/", include('users.async_urls')),
 ]
 
 if settings.DEBUG:
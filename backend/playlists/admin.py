@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Playlist, Video, Tag, PlaylistView
+from .models import Playlist, Video, Tag, PlaylistView, MediaBlob
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -12,7 +12,7 @@ class PlaylistAdmin(admin.ModelAdmin):
     list_display = ['title', 'user', 'created_at', 'is_public', 'video_count', 'like_count', 'view_count', 'share_count']
     list_filter = ['is_public', 'created_at', 'updated_at', 'tags']
     search_fields = ['title', 'description', 'user__username', 'user__email']
-    readonly_fields = ['created_at', 'updated_at', 'view_count', 'share_count']
+    readonly_fields = ['created_at', 'updated_at', 'view_count', 'share_count', 'like_count', 'video_count']
     filter_horizontal = ['tags']
 
 @admin.register(Video)
@@ -27,4 +27,10 @@ class PlaylistViewAdmin(admin.ModelAdmin):
     list_display = ['user', 'playlist', 'viewed_at']
     list_filter = ['viewed_at']
     search_fields = ['user__username', 'playlist__title']
-    readonly_fields = ['viewed_at']
\ No newline at end of file
+    readonly_fields = ['viewed_at']
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'refcount', 'size', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['name', 'refcount', 'size', 'created_at']
\ No newline at end of file
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class PlaylistsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'playlists'
\ No newline at end of file
+    name = 'playlists'
+
+    def ready(self):
+        from . import signals  # noqa: F401
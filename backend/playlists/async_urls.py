@@ -0,0 +1,9 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('playlists/', async_views.playlist_list, name='async-playlist-list'),
+    path('playlists/explore/', async_views.explore, name='async-playlist-explore'),
+    path('playlists/search/', async_views.search, name='async-playlist-search'),
+    path('playlists/<int:pk>/', async_views.playlist_detail, name='async-playlist-detail'),
+]
@@ -0,0 +1,141 @@
+"""
+Native async versions of the busiest playlist read endpoints, served under
+/api/v1/async/. They answer like the matching PlaylistViewSet actions and
+run independent queries, like a page of playlists and which of them the
+user liked, concurrently. See kalanisVault.async_api.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.shortcuts import aget_object_or_404
+
+from kalanisVault.async_api import alist, async_api_view, drf_view, render
+from kalanisVault.conditional import aconditional_response, make_etag
+from kalanisVault.params import get_page_params
+from . import explore as explore_feed, search as search_backends
+from .models import Playlist
+from .response_cache import response_cache
+from .serializers import aget_liked_ids
+from .view_buffer import view_buffer
+from .views import PlaylistViewSet
+
+
+async def get_liked_ids(view, playlist_ids):
+    """Liked IDs among playlist_ids, if the response includes is_liked"""
+    if not view.wants_is_liked():
+        return set()
+    return await aget_liked_ids(view.request, playlist_ids)
+
+
+def serialize(view, instance, liked_ids, many=False):
+    context = view.get_serializer_context()
+    context['liked_ids'] = liked_ids
+    return view.get_serializer_class()(instance, many=many, context=context).data
+
+
+@async_api_view
+async def playlist_list(request):
+    """
+    Return public playlists and the user's private playlists, filtered and
+    ordered like PlaylistViewSet.list.
+    """
+    view = drf_view(PlaylistViewSet, request, 'list')
+    queryset = view.filter_queryset(view.get_queryset())
+    
+    playlists, liked_ids = await asyncio.gather(
+        alist(queryset),
+        get_liked_ids(view, queryset.values('pk')),
+    )
+    return render(serialize(view, playlists, liked_ids, many=True))
+
+
+@async_api_view
+async def playlist_detail(request, pk):
+    """
+    Return a playlist with its videos, answering conditional requests like
+    PlaylistViewSet.retrieve.
+    """
+    view = drf_view(PlaylistViewSet, request, 'retrieve', pk=pk)
+    state = await aget_object_or_404(view.get_state_queryset(), pk=pk)
+    
+    # Recording may flush the buffer, which writes synchronously
+    await sync_to_async(view_buffer.record)(request.user.id, state['id'], state['user_id'])
+    
+    async def render_playlist():
+        playlist, liked = await asyncio.gather(
+            aget_object_or_404(view.get_queryset(), pk=pk),
+            Playlist.likes.through.objects.filter(
+                user_id=request.user.pk, playlist_id=pk
+            ).aexists(),
+        )
+        return render(serialize(view, playlist, {playlist.pk} if liked else set()))
+    
+    return await aconditional_response(
+        request,
+        render_playlist,
+        etag=make_etag(request.user.id, *state.values()),
+        last_modified=view.get_state_last_modified(state)
+    )
+
+
+@async_api_view
+async def explore(request):
+    """
+    Return a page of the explore feed, sharing response cache entries with
+    PlaylistViewSet.explore.
+    """
+    view = drf_view(PlaylistViewSet, request, 'explore')
+    page, limit = get_page_params(request.GET, 6, settings.EXPLORE_MAX_LIMIT)
+    key = await explore_feed.aget_permutation_key(
+        request.user.id, explore_feed.parse_generation(request.GET.get('generation'))
+    )
+    page_ids = await explore_feed.aget_page_ids(request.user.id, page, limit, key)
+    
+    async def compute():
+        playlists = await view.with_representation(Playlist.objects.filter(
+            is_public=True
+        )).ain_order(page_ids)
+        return view.shared_list_body(playlists)
+    
+    cached, liked_ids = await asyncio.gather(
+        response_cache.aget_or_set(
+            'playlists', 'explore',
+            view.cached_list_params((key, page, limit)),
+            compute
+        ),
+        get_liked_ids(view, page_ids),
+    )
+    return render(
+        view.with_is_liked(cached, liked_ids),
+        headers={explore_feed.GENERATION_HEADER: explore_feed.key_generation(key)}
+    )
+
+
+@async_api_view
+async def search(request):
+    """
+    Search playlists like PlaylistViewSet.search, best match first.
+    """
+    query = request.GET.get('q', '')
+    if not query:
+        return render(
+            {'detail': 'Search query is required.'},
+            status=400
+        )
+    
+    view = drf_view(PlaylistViewSet, request, 'search')
+    page, limit = get_page_params(request.GET, 20, 100)
+    
+    # Picking the backend may introspect or build the FTS table, and the
+    # search runs raw SQL; neither has an async API, so both run in a thread
+    def search_ids():
+        backend = search_backends.get_backend()
+        return backend.search(query, request.user, (page - 1) * limit, limit)
+
+    ranked_ids = await sync_to_async(search_ids)()
+    playlists, liked_ids = await asyncio.gather(
+        view.with_representation(Playlist.objects.all()).ain_order(ranked_ids),
+        get_liked_ids(view, ranked_ids),
+    )
+    return render(serialize(view, playlists, liked_ids, many=True))
@@ -0,0 +1,33 @@
+"""
+This module rebuilds the denormalized counter columns on Playlist and User
+in bulk from the underlying tables. Signal handlers keep them in step as
+rows change, with kalanisVault.counters.adjust.
+"""
+from kalanisVault.counters import count_subquery
+
+
+def recount_playlists(queryset):
+    """Recompute video_count and like_count for every playlist in queryset"""
+    playlist_model = queryset.model
+    video_model = playlist_model._meta.get_field('videos').related_model
+    likes_model = playlist_model._meta.get_field('likes').remote_field.through
+
+    return queryset.update(
+        video_count=count_subquery(video_model.objects.all(), 'playlist'),
+        like_count=count_subquery(likes_model.objects.all(), 'playlist'),
+    )
+
+
+def recount_users(queryset):
+    """Recompute the playlist, like and follow counters for every user in queryset"""
+    user_model = queryset.model
+    playlist_model = user_model._meta.get_field('playlists').related_model
+    follow_model = user_model._meta.get_field('followers').related_model
+    likes_model = playlist_model._meta.get_field('likes').remote_field.through
+
+    return queryset.update(
+        playlist_count=count_subquery(playlist_model.objects.all(), 'user'),
+        liked_playlist_count=count_subquery(likes_model.objects.all(), 'user'),
+        follower_count=count_subquery(follow_model.objects.all(), 'followed'),
+        following_count=count_subquery(follow_model.objects.all(), 'follower'),
+    )
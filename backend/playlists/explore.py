@@ -0,0 +1,207 @@
+"""
+This module builds the shuffled playlist orderings served by the explore feed.
+Each day every user bucket gets one permutation of the public, non-empty
+playlist IDs. It is built once and cached as compact ID arrays of
+EXPLORE_CHUNK_SIZE IDs each, so serving a page only fetches the chunks the
+page covers.
+
+The permutation keys carry a generation, bumped by invalidate() when a
+playlist joins the feed, so new playlists show up without waiting for the
+next day. Clients keep paging through the permutation they started on by
+sending back the generation of their first page (GENERATION_HEADER) for
+as long as it stays cached, so the bump only reaches them on a refresh.
+"""
+import random
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Playlist
+
+EXPLORE_CACHE_PREFIX = 'explore'
+GENERATION_KEY = f'{EXPLORE_CACHE_PREFIX}:generation'
+# Response header with the generation a page was served from
+GENERATION_HEADER = 'X-Explore-Generation'
+
+
+def get_bucket(user_id):
+    """Returns the explore bucket a user falls into"""
+    return (user_id or 0) % settings.EXPLORE_USER_BUCKETS
+
+
+def get_seed(day, bucket):
+    """Returns the shuffle seed for a given day and user bucket"""
+    return day.toordinal() * 1000 + bucket
+
+
+def build_permutation(seed):
+    """
+    Build the shuffled ID array of every public playlist that has videos.
+
+    A private Random instance is used so the global RNG is never reseeded.
+    """
+    ids = array('q', Playlist.objects.filter(
+        is_public=True,
+        video_count__gt=0
+    ).order_by('id').values_list('id', flat=True))
+
+    random.Random(seed).shuffle(ids)
+    return ids
+
+
+async def abuild_permutation(seed):
+    """Async version of build_permutation"""
+    ids = array('q', [
+        pk async for pk in Playlist.objects.filter(
+            is_public=True,
+            video_count__gt=0
+        ).order_by('id').values_list('id', flat=True)
+    ])
+
+    random.Random(seed).shuffle(ids)
+    return ids
+
+
+def _bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns() // 1000, None)
+
+
+def invalidate():
+    """
+    Rebuild every permutation on its next use. Done now and again on
+    commit, so permutations built from reads made before the commit are
+    dropped too.
+    """
+    _bump_generation()
+    transaction.on_commit(_bump_generation)
+
+
+def videos_added(playlist_id, count):
+    """
+    Invalidate the permutations if adding ``count`` videos just gave a
+    public playlist its first ones, which puts it in the feed. Call after
+    video_count has been updated.
+    """
+    if Playlist.objects.filter(pk=playlist_id, is_public=True, video_count=count).exists():
+        invalidate()
+
+
+def _permutation_key(generation, user_id):
+    day = timezone.now().date()
+    return f"{EXPLORE_CACHE_PREFIX}:{day.isoformat()}:{get_bucket(user_id)}:{generation}"
+
+
+def parse_generation(value):
+    """Return the generation a client sent back, or None if it is not one"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def key_generation(key):
+    """Returns the generation a permutation key was built with"""
+    return key.rsplit(':', 1)[1]
+
+
+def get_permutation_key(user_id, generation=None):
+    """
+    Returns the cache key of today's permutation for the user's bucket: the
+    one of ``generation`` while it is still cached, or else the current one.
+    """
+    if generation is not None:
+        key = _permutation_key(generation, user_id)
+        if cache.get(f"{key}:length") is not None:
+            return key
+    # Start from the clock so an evicted generation never comes back with
+    # a value older permutations were stored under
+    generation = cache.get_or_set(GENERATION_KEY, time.time_ns() // 1000, None)
+    return _permutation_key(generation, user_id)
+
+
+async def aget_permutation_key(user_id, generation=None):
+    """Async version of get_permutation_key"""
+    if generation is not None:
+        key = _permutation_key(generation, user_id)
+        if await cache.aget(f"{key}:length") is not None:
+            return key
+    generation = await cache.aget_or_set(GENERATION_KEY, time.time_ns() // 1000, None)
+    return _permutation_key(generation, user_id)
+
+
+def _chunk_entries(key, ids):
+    """Cache entries storing ids as chunks, plus the permutation length"""
+    size = settings.EXPLORE_CHUNK_SIZE
+    entries = {
+        f"{key}:{index}": ids[start:start + size]
+        for index, start in enumerate(range(0, len(ids), size))
+    }
+    entries[f"{key}:length"] = len(ids)
+    return entries
+
+
+def _page_keys(key, offset, limit):
+    """Keys of the length entry and of the chunks a page may cover"""
+    size = settings.EXPLORE_CHUNK_SIZE
+    first, last = offset // size, (offset + limit - 1) // size
+    return [f"{key}:length"] + [f"{key}:{index}" for index in range(first, last + 1)]
+
+
+def _page_from_chunks(key, found, offset, limit):
+    """
+    Assemble a page from cached chunks, or return None if the permutation
+    or one of the chunks the page needs is not cached.
+    """
+    length = found.get(f"{key}:length")
+    if length is None:
+        return None
+    end = min(offset + limit, length)
+    if offset >= end:
+        return []
+
+    size = settings.EXPLORE_CHUNK_SIZE
+    ids = array('q')
+    for index in range(offset // size, (end - 1) // size + 1):
+        chunk = found.get(f"{key}:{index}")
+        if chunk is None:
+            return None
+        ids.extend(chunk)
+    start = offset - offset // size * size
+    return list(ids[start:start + end - offset])
+
+
+def get_page_ids(user_id, page, limit, key=None):
+    """
+    Return the playlist IDs for one explore page, in feed order, building
+    and caching today's permutation for the user's bucket if needed.
+    ``key`` is a permutation key from get_permutation_key, by default the
+    current one.
+    """
+    key = key or get_permutation_key(user_id)
+    offset = (page - 1) * limit
+    page_ids = _page_from_chunks(key, cache.get_many(_page_keys(key, offset, limit)), offset, limit)
+    if page_ids is None:
+        ids = build_permutation(get_seed(timezone.now().date(), get_bucket(user_id)))
+        cache.set_many(_chunk_entries(key, ids), settings.EXPLORE_CACHE_TIMEOUT)
+        page_ids = list(ids[offset:offset + limit])
+    return page_ids
+
+
+async def aget_page_ids(user_id, page, limit, key=None):
+    """Async version of get_page_ids"""
+    key = key or await aget_permutation_key(user_id)
+    offset = (page - 1) * limit
+    found = await cache.aget_many(_page_keys(key, offset, limit))
+    page_ids = _page_from_chunks(key, found, offset, limit)
+    if page_ids is None:
+        ids = await abuild_permutation(get_seed(timezone.now().date(), get_bucket(user_id)))
+        await cache.aset_many(_chunk_entries(key, ids), settings.EXPLORE_CACHE_TIMEOUT)
+        page_ids = list(ids[offset:offset + limit])
+    return page_ids
@@ -0,0 +1,58 @@
+"""
+This module holds the shared HTTP client for outbound requests.
+
+One requests.Session is kept per process so connections to the same host
+(TikTok's CDN and APIs) are pooled and reused across requests and threads
+instead of paying a TCP and TLS handshake for every fetch. Failed
+connections and 429/5xx answers to idempotent requests are retried with
+backoff.
+"""
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_session = None
+_lock = threading.Lock()
+
+
+def _build_session():
+    config = settings.HTTP_CLIENT
+    retry = Retry(
+        total=config['RETRIES'],
+        backoff_factor=config['BACKOFF'],
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET', 'HEAD'),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config['POOL_CONNECTIONS'],
+        pool_maxsize=config['POOL_SIZE'],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = config['USER_AGENT']
+    return session
+
+
+def get_session():
+    """Return the process-wide pooled session"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def reset_session():
+    """Close the pooled session, e.g. after its settings changed"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
@@ -0,0 +1,126 @@
+"""
+This module writes playlist likes straight to the likes table.
+Each like or unlike is a single indexed INSERT or DELETE, so its cost does
+not depend on how many likes the playlist already has. Because the rows
+are written directly, m2m_changed is sent by hand for the rows that
+actually changed so the counter handlers still run.
+"""
+from django.db import IntegrityError, router, transaction
+from django.db.models.signals import m2m_changed
+from users.models import User
+from .models import Playlist
+
+Like = Playlist.likes.through
+
+
+def _send_changed(action, instance, reverse, pk_set):
+    m2m_changed.send(
+        sender=Like,
+        instance=instance,
+        action=action,
+        reverse=reverse,
+        model=Playlist if reverse else User,
+        pk_set=pk_set,
+        using=router.db_for_write(Like, instance=instance),
+    )
+
+
+def like(playlist, user):
+    """Like a playlist. Returns whether a like was added"""
+    try:
+        with transaction.atomic():
+            Like.objects.create(playlist_id=playlist.pk, user_id=user.pk)
+            _send_changed('post_add', playlist, False, {user.pk})
+    except IntegrityError:
+        return False
+    return True
+
+
+def unlike(playlist, user):
+    """Remove a like from a playlist. Returns whether a like was removed"""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(playlist_id=playlist.pk, user_id=user.pk).delete()
+        if deleted:
+            _send_changed('post_remove', playlist, False, {user.pk})
+    return bool(deleted)
+
+
+def is_liked(playlist, user):
+    return Like.objects.filter(playlist_id=playlist.pk, user_id=user.pk).exists()
+
+
+class _Conflict(Exception):
+    """A concurrent like or unlike changed rows a bulk write expected"""
+
+
+def _insert_likes(playlist_ids, user):
+    """
+    Insert likes for the given playlists in one statement, or one by one
+    if another request liked some of them first. Returns the IDs of the
+    playlists whose like was inserted here.
+    """
+    if not playlist_ids:
+        return set()
+    try:
+        with transaction.atomic():
+            Like.objects.bulk_create([
+                Like(playlist_id=playlist_id, user_id=user.pk) for playlist_id in playlist_ids
+            ])
+        return playlist_ids
+    except IntegrityError:
+        inserted = set()
+        for playlist_id in playlist_ids:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(playlist_id=playlist_id, user_id=user.pk)
+            except IntegrityError:
+                continue
+            inserted.add(playlist_id)
+        return inserted
+
+
+def _delete_likes(playlist_ids, user):
+    """
+    Delete likes for the given playlists in one statement, or one by one
+    if another request removed some of them first. Returns the IDs of the
+    playlists whose like was deleted here.
+    """
+    if not playlist_ids:
+        return set()
+    try:
+        with transaction.atomic():
+            deleted, _ = Like.objects.filter(user_id=user.pk, playlist_id__in=playlist_ids).delete()
+            if deleted != len(playlist_ids):
+                raise _Conflict()
+        return playlist_ids
+    except _Conflict:
+        return {
+            playlist_id for playlist_id in playlist_ids
+            if Like.objects.filter(user_id=user.pk, playlist_id=playlist_id).delete()[0]
+        }
+
+
+def set_liked(playlist_ids, user, liked):
+    """
+    Like or unlike many playlists at once.
+    Returns the set of playlist IDs whose like state changed; m2m_changed
+    is sent for those only, as with like() and unlike().
+    """
+    playlist_ids = set(playlist_ids)
+    with transaction.atomic():
+        # Lock the likes that exist, so they cannot be removed under us
+        existing = set(Like.objects.select_for_update().filter(
+            user_id=user.pk,
+            playlist_id__in=playlist_ids
+        ).values_list('playlist_id', flat=True))
+
+        if liked:
+            changed = _insert_likes(playlist_ids - existing, user)
+            action = 'post_add'
+        else:
+            changed = _delete_likes(existing, user)
+            action = 'post_remove'
+
+        if changed:
+            _send_changed(action, user, True, changed)
+    return changed
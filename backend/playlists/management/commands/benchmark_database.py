@@ -0,0 +1,171 @@
+"""
+Management command that compares database profiles under concurrent load.
+"""
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.utils import timezone
+from kalanisVault.counters import adjust
+from playlists.models import Playlist, PlaylistView, Tag
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a mixed read/write workload from concurrent threads against a "
+        "scratch SQLite database for each DATABASE_PROFILES entry and report "
+        "throughput, latency and 'database is locked' errors. Each operation "
+        "ends like a request does, so profiles without persistent connections "
+        "reconnect every time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', default=list(settings.DATABASE_PROFILES),
+            help="Profiles to compare, in order."
+        )
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent workers.")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per profile.")
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help="Share of operations that write (0 to 1)."
+        )
+        parser.add_argument('--playlists', type=int, default=500, help="Playlists to seed.")
+
+    def handle(self, *args, **options):
+        unknown = set(options['profiles']) - settings.DATABASE_PROFILES.keys()
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+        self.stdout.write(
+            f"{options['threads']} threads, {options['duration']}s per profile, "
+            f"{options['write_ratio']:.0%} writes"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in options['profiles']:
+                alias = f"benchmark_{profile}"
+                self.add_database(alias, profile, os.path.join(directory, f"{profile}.sqlite3"))
+                try:
+                    ids = self.seed(alias, options['playlists'])
+                    result = self.run_workload(alias, ids, options)
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.settings[alias]
+                self.report(profile, result, options['duration'])
+
+    def add_database(self, alias, profile, path):
+        """Register a scratch database configured like the given profile"""
+        config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            **settings.DATABASE_PROFILES[profile],
+        }
+        # configure_settings fills in the defaults and requires a default alias
+        configured = connections.configure_settings({
+            DEFAULT_DB_ALIAS: dict(settings.DATABASES[DEFAULT_DB_ALIAS]),
+            alias: config,
+        })
+        connections.settings[alias] = configured[alias]
+
+    def seed(self, alias, count):
+        # Only the tables the workload touches; migrations' data steps
+        # would run against the default database
+        with connections[alias].schema_editor() as editor:
+            for model in (User, Tag, Playlist, PlaylistView):
+                editor.create_model(model)
+
+        users = User.objects.using(alias).bulk_create([
+            User(email=f"bench{number}@example.com", username=f"bench{number}",
+                 first_name="Bench", last_name=str(number))
+            for number in range(50)
+        ])
+        playlists = Playlist.objects.using(alias).bulk_create([
+            Playlist(title=f"Playlist {number}", user=users[number % len(users)],
+                     is_public=number % 5 != 0, view_count=number % 97)
+            for number in range(count)
+        ])
+        connections[alias].close()
+        return [playlist.pk for playlist in playlists], [user.pk for user in users]
+
+    def run_workload(self, alias, ids, options):
+        playlist_ids, user_ids = ids
+        deadline = time.monotonic() + options['duration']
+        counts = Counter()
+        latencies = []
+        lock = threading.Lock()
+
+        def read(rng):
+            playlists = Playlist.objects.using(alias)
+            list(playlists.filter(is_public=True).order_by('-view_count').values(
+                'id', 'title', 'view_count'
+            )[:10])
+            playlists.filter(pk=rng.choice(playlist_ids)).values('id', 'title', 'like_count').first()
+
+        def write(rng):
+            # Read, then write in the same transaction, like the view and
+            # like handlers do
+            playlist_id = rng.choice(playlist_ids)
+            with transaction.atomic(using=alias):
+                Playlist.objects.using(alias).filter(pk=playlist_id).values('view_count').get()
+                adjust(Playlist.objects.using(alias).filter(pk=playlist_id), 'view_count', 1)
+                PlaylistView.objects.using(alias).update_or_create(
+                    user_id=rng.choice(user_ids), playlist_id=playlist_id,
+                    defaults={'viewed_at': timezone.now()}
+                )
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local_counts = Counter()
+            local_latencies = []
+            connection = connections[alias]
+            try:
+                while time.monotonic() < deadline:
+                    kind = 'writes' if rng.random() < options['write_ratio'] else 'reads'
+                    started = time.perf_counter()
+                    try:
+                        (write if kind == 'writes' else read)(rng)
+                    except OperationalError as error:
+                        local_counts['locked' if 'locked' in str(error) else 'errors'] += 1
+                    else:
+                        local_counts[kind] += 1
+                        local_latencies.append(time.perf_counter() - started)
+                    # What request_finished does at the end of each request
+                    connection.close_if_unusable_or_obsolete()
+            finally:
+                connection.close()
+                with lock:
+                    counts.update(local_counts)
+                    latencies.extend(local_latencies)
+
+        threads = [
+            threading.Thread(target=worker, args=(seed,))
+            for seed in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts, latencies
+
+    def report(self, profile, result, duration):
+        counts, latencies = result
+        done = counts['reads'] + counts['writes']
+        if len(latencies) >= 2:
+            quantiles = statistics.quantiles(latencies, n=100)
+            latency = f"p50 {quantiles[49] * 1000:.2f}ms, p95 {quantiles[94] * 1000:.2f}ms"
+        else:
+            latency = "no latency samples"
+        self.stdout.write(
+            f"{profile:>12}: {done / duration:9.0f} ops/s "
+            f"({counts['reads']} reads, {counts['writes']} writes), {latency}, "
+            f"{counts['locked']} locked, {counts['errors']} other errors"
+        )
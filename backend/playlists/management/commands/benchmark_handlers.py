@@ -0,0 +1,245 @@
+"""
+Management command that compares WSGI and ASGI throughput of the read API.
+"""
+import asyncio
+import io
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from playlists.models import Playlist
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import User
+
+# Paths under /api/v1/ (synchronous views) and /api/v1/async/ (async views)
+ENDPOINTS = {
+    'explore': 'playlists/explore/?page=1',
+    'search': 'playlists/search/?q={term}',
+    'detail': 'playlists/{playlist}/',
+    'profile': 'users/by-username/{username}/',
+    'follow_status': 'users/follow-status/{user}/',
+}
+
+# Which handler serves which views, in report order
+RUNS = (
+    ('wsgi', 'sync'),
+    ('asgi', 'sync'),
+    ('asgi', 'async'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the same read requests through Django's WSGI and ASGI handlers "
+        "from many concurrent clients and report throughput and latency. WSGI "
+        "runs the synchronous views on a fixed pool of worker threads, like a "
+        "threaded WSGI server; ASGI serves every client at once, running both "
+        "the synchronous views and their async versions under /api/v1/async/. "
+        "Requests go to the configured database, so run it against a copy: "
+        "the detail endpoint records views like real traffic does."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS),
+            help="Endpoints to request."
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=100, help="Clients sending requests at once."
+        )
+        parser.add_argument(
+            '--threads', type=int, default=16, help="Worker threads of the WSGI server."
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500, help="Requests per endpoint and run."
+        )
+        parser.add_argument(
+            '--user', default=None,
+            help="Username to authenticate as. Defaults to the first active user."
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        playlist = Playlist.objects.filter(is_public=True, video_count__gt=0).first()
+        other = User.objects.exclude(pk=getattr(user, 'pk', None)).order_by('pk').first()
+        if user is None or playlist is None or other is None:
+            raise CommandError(
+                "Needs an active user, another user and a public playlist with videos."
+            )
+
+        values = {
+            'term': playlist.title.split()[0],
+            'playlist': playlist.pk,
+            'username': other.username,
+            'user': other.pk,
+        }
+        headers = {
+            'Authorization': f"Bearer {AccessToken.for_user(user)}",
+            'Host': self.get_host(),
+        }
+
+        self.stdout.write(
+            f"{options['concurrency']} clients, {options['threads']} WSGI threads, "
+            f"{options['requests']} requests per endpoint"
+        )
+        for name in options['endpoints']:
+            path = ENDPOINTS[name].format(**values)
+            for handler, views in RUNS:
+                prefix = '/api/v1/async/' if views == 'async' else '/api/v1/'
+                run = self.run_wsgi if handler == 'wsgi' else self.run_asgi
+                started = time.perf_counter()
+                statuses, latencies = run(prefix + path, headers, options)
+                elapsed = time.perf_counter() - started
+                self.report(f"{name} {handler}/{views}", statuses, latencies, elapsed)
+
+    def get_host(self):
+        for host in settings.ALLOWED_HOSTS:
+            if host != '*':
+                return host.lstrip('.')
+        return 'localhost'
+
+    def run_wsgi(self, url, headers, options):
+        application = WSGIHandler()
+        url = urlsplit(url)
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': headers['Host'],
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            **{
+                f"HTTP_{name.upper().replace('-', '_')}": value
+                for name, value in headers.items()
+            },
+        }
+        # Clients queue for a free worker, as they would on a real server
+        workers = threading.BoundedSemaphore(options['threads'])
+
+        def request():
+            statuses = []
+
+            def start_response(status, response_headers, exc_info=None):
+                statuses.append(int(status.split()[0]))
+
+            with workers:
+                response = application({**environ, 'wsgi.input': io.BytesIO()}, start_response)
+                try:
+                    b''.join(response)
+                finally:
+                    # Sends request_finished, which closes the connection
+                    response.close()
+            return statuses[0]
+
+        return self.run_threads(request, options)
+
+    def run_threads(self, request, options):
+        statuses = Counter()
+        latencies = []
+        lock = threading.Lock()
+        remaining = iter(range(options['requests']))
+
+        def client():
+            local_statuses = Counter()
+            local_latencies = []
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        break
+                started = time.perf_counter()
+                local_statuses[request()] += 1
+                local_latencies.append(time.perf_counter() - started)
+            with lock:
+                statuses.update(local_statuses)
+                latencies.extend(local_latencies)
+
+        threads = [threading.Thread(target=client) for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses, latencies
+
+    def run_asgi(self, url, headers, options):
+        application = ASGIHandler()
+        url = urlsplit(url)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': url.path,
+            'raw_path': url.path.encode(),
+            'query_string': url.query.encode(),
+            'root_path': '',
+            'headers': [
+                (name.lower().encode(), value.encode()) for name, value in headers.items()
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': (headers['Host'], 80),
+        }
+
+        async def request():
+            statuses = []
+            received = False
+
+            async def receive():
+                nonlocal received
+                if received:
+                    # The client never disconnects early
+                    await asyncio.Event().wait()
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await application(scope, receive, send)
+            return statuses[0]
+
+        async def main():
+            statuses = Counter()
+            latencies = []
+            remaining = iter(range(options['requests']))
+
+            async def client():
+                for _ in remaining:
+                    started = time.perf_counter()
+                    statuses[await request()] += 1
+                    latencies.append(time.perf_counter() - started)
+
+            await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+            return statuses, latencies
+
+        return asyncio.run(main())
+
+    def report(self, label, statuses, latencies, elapsed):
+        if len(latencies) >= 2:
+            quantiles = statistics.quantiles(latencies, n=100)
+            latency = f"p50 {quantiles[49] * 1000:.1f}ms, p95 {quantiles[94] * 1000:.1f}ms"
+        else:
+            latency = "no latency samples"
+        codes = ', '.join(f"{count}x {status}" for status, count in sorted(statuses.items()))
+        self.stdout.write(
+            f"{label:>26}: {len(latencies) / elapsed:8.0f} req/s, {latency} ({codes})"
+        )
@@ -0,0 +1,48 @@
+"""
+Management command that builds missing resized variants of uploaded images.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from kalanisVault import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the IMAGE_PIPELINE variants of every upload that does not have "
+        "them yet, e.g. images uploaded before the pipeline existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help="Also retry uploads whose variants failed to build before.",
+        )
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for label in settings.IMAGE_PIPELINE['VARIANTS']:
+            app_label, model_name, field_name = label.split('.')
+            model = apps.get_model(app_label, model_name)
+            field = model._meta.get_field(field_name)
+
+            rows = model._default_manager.exclude(
+                **{f"{field_name}__in": ['', field.default]}
+            ).exclude(**{f"{field_name}__isnull": True}).values_list(
+                'pk', field_name, images.variants_field(field_name)
+            ).order_by('pk')
+            for pk, name, variants in rows.iterator():
+                variants = variants or {}
+                if variants.get('source') == name and not (
+                    options['retry_failed'] and 'error' in variants
+                ):
+                    continue
+                try:
+                    built += images.process(model, pk, field_name, name)
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Built variants for {built} images ({failed} failed)."
+        ))
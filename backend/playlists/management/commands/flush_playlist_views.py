@@ -0,0 +1,21 @@
+"""
+Management command that writes buffered playlist views to the database.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from playlists.view_buffer import replay_journals
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay playlist view journals left by failed flushes or exited "
+        "workers. Requires PLAYLIST_VIEW_BUFFER['JOURNAL_DIR']."
+    )
+
+    def handle(self, *args, **options):
+        directory = settings.PLAYLIST_VIEW_BUFFER['JOURNAL_DIR']
+        if not directory:
+            raise CommandError("PLAYLIST_VIEW_BUFFER['JOURNAL_DIR'] is not configured.")
+
+        total = replay_journals(directory)
+        self.stdout.write(self.style.SUCCESS(f"Flushed {total} playlist views."))
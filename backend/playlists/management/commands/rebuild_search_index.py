@@ -0,0 +1,19 @@
+"""
+Management command that rebuilds the playlist full-text search index.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from playlists.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the playlist search index from the playlist, tag and user tables."
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        with transaction.atomic():
+            backend.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt search index with {type(backend).__name__}."
+        ))
@@ -0,0 +1,21 @@
+"""
+Management command that rebuilds the denormalized counter columns.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users.models import User
+from playlists.counters import recount_playlists, recount_users
+from playlists.models import Playlist
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored like, video, playlist and follow counters in bulk."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            playlists = recount_playlists(Playlist.objects.all())
+            users = recount_users(User.objects.all())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recounted {playlists} playlists and {users} users."
+        ))
@@ -0,0 +1,95 @@
+"""
+Management command that refreshes the TikTok metadata of saved videos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from playlists import tiktok
+from playlists.models import Playlist, Video
+from playlists.response_cache import invalidate_responses
+
+
+class Command(BaseCommand):
+    help = (
+        "Look up the oEmbed metadata of TikTok videos not refreshed for a while, "
+        "in chunks, and update their thumbnail URLs. Titles and IDs are only "
+        "filled in where they are missing, so titles set by users are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.TIKTOK['REFRESH_CHUNK_SIZE'],
+            help="Videos looked up and updated together."
+        )
+        parser.add_argument(
+            '--older-than', type=float, default=settings.TIKTOK['REFRESH_AFTER_HOURS'],
+            help="Only refresh videos last refreshed this many hours ago or never."
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help="Stop after this many videos."
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than'])
+        stale = Video.objects.filter(tiktok_url__icontains='tiktok.com').filter(
+            Q(metadata_refreshed_at__isnull=True) | Q(metadata_refreshed_at__lt=cutoff)
+        ).only('id', 'playlist_id', 'tiktok_url', 'tiktok_id', 'title', 'thumbnail_url')
+
+        checked = updated = failed = 0
+        last_pk = 0
+        while options['limit'] is None or checked < options['limit']:
+            size = options['chunk_size']
+            if options['limit'] is not None:
+                size = min(size, options['limit'] - checked)
+            # Keyset pagination, so each chunk is one indexed range query
+            chunk = list(stale.filter(pk__gt=last_pk).order_by('pk')[:size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            checked += len(chunk)
+
+            results = tiktok.resolve_many([video.tiktok_url for video in chunk], refresh=True)
+            changed = self.apply(chunk, results)
+            failed += len(chunk) - len(changed)
+            updated += len(changed)
+            self.save(changed)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Checked {checked} videos, {updated} updated.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {updated} of {checked} videos ({failed} lookups failed)."
+        ))
+
+    def apply(self, videos, results):
+        """Copy resolved metadata onto the videos and return those resolved"""
+        now = timezone.now()
+        changed = []
+        for video in videos:
+            metadata = results.get(video.tiktok_url)
+            if not metadata:
+                continue
+            if metadata['thumbnail_url']:
+                video.thumbnail_url = metadata['thumbnail_url']
+            if metadata['title'] and not video.title:
+                video.title = metadata['title']
+            if metadata['tiktok_id'] and video.tiktok_id in ('', tiktok.UNKNOWN_ID):
+                video.tiktok_id = metadata['tiktok_id']
+            video.metadata_refreshed_at = now
+            changed.append(video)
+        return changed
+
+    def save(self, videos):
+        if not videos:
+            return
+        Video.objects.bulk_update(
+            videos, ['thumbnail_url', 'title', 'tiktok_id', 'metadata_refreshed_at']
+        )
+        # bulk_update sends no post_save, so do the handlers' work here
+        Playlist.objects.filter(
+            pk__in={video.playlist_id for video in videos}
+        ).update(updated_at=timezone.now())
+        invalidate_responses('playlists')
@@ -0,0 +1,49 @@
+"""
+Management command that removes uploaded files no row references.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from playlists.media import sweep_orphans
+
+
+class Command(BaseCommand):
+    help = (
+        "Scan playlist_covers/, video_thumbnails/ and profile_pics/ and delete "
+        "files that no playlist, video or user references."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="List orphaned files without deleting them."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.MEDIA_CLEANUP['SWEEP_BATCH_SIZE'],
+            help="File names checked against the database per query."
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=settings.MEDIA_CLEANUP['SWEEP_MIN_AGE'],
+            help="Skip files modified less than this many seconds ago."
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        totals = Counter()
+        for directory, orphans in sweep_orphans(
+            batch_size=options['batch_size'],
+            min_age=options['min_age'],
+            dry_run=dry_run
+        ):
+            totals[directory] += len(orphans)
+            if options['verbosity'] > 1 or dry_run:
+                for name in orphans:
+                    self.stdout.write(name)
+
+        verb = "Found" if dry_run else "Removed"
+        for directory, count in sorted(totals.items()):
+            self.stdout.write(f"{directory}/: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {sum(totals.values())} orphaned media files."
+        ))
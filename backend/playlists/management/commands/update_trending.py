@@ -0,0 +1,26 @@
+"""
+Management command that updates trending scores and publishes leaderboards.
+Meant to run periodically, e.g. every few minutes from cron.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from playlists import trending
+
+
+class Command(BaseCommand):
+    help = "Fold recent playlist activity into trending scores and refresh the cached leaderboards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not trending.cache_is_shared():
+            raise CommandError(
+                "The default cache is local to this process, so the web workers would "
+                "never see the published leaderboards. Set CACHE_URL to a shared cache."
+            )
+        updated = trending.update_scores(batch_size=options['batch_size'])
+        generation = trending.publish_leaderboards()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {updated} trending scores; published leaderboard generation {generation}."
+        ))
@@ -0,0 +1,43 @@
+"""
+This module defines custom querysets for the playlists app.
+They bundle the joins and prefetches needed to serialize playlists in a
+constant number of queries.
+"""
+from django.db import models
+
+
+class PlaylistQuerySet(models.QuerySet):
+    """
+    QuerySet for the Playlist model.
+    """
+
+    def in_order(self, ids):
+        """Fetch the playlists with the given IDs as a list in that order"""
+        playlists = self.in_bulk(ids)
+        return [playlists[pk] for pk in ids if pk in playlists]
+
+    async def ain_order(self, ids):
+        """Async version of in_order"""
+        playlists = await self.ain_bulk(ids)
+        return [playlists[pk] for pk in ids if pk in playlists]
+
+    def with_details(self):
+        """Fetch everything PlaylistSerializer renders"""
+        return self.select_related('user').prefetch_related('videos', 'tags')
+
+    def with_summary(self, fields=(), expand=()):
+        """
+        Fetch only what PlaylistSummarySerializer renders for the given
+        sparse fieldset and expansions.
+        """
+        def wanted(name):
+            return not fields or name in fields or name in expand
+
+        queryset = self
+        if wanted('user'):
+            queryset = queryset.select_related('user')
+        if wanted('tags'):
+            queryset = queryset.prefetch_related('tags')
+        if 'videos' in expand:
+            queryset = queryset.prefetch_related('videos')
+        return queryset
@@ -0,0 +1,218 @@
+"""
+This module removes uploaded media files that are no longer referenced.
+
+Deleting a playlist, video or user queues its files for deletion once the
+transaction commits, and a background thread deletes them through the
+default storage, so requests never wait on the filesystem. Because the
+handlers hang off post_delete they also run for queryset and cascade
+deletes.
+
+Replacing an upload queues the previous file, and its variants, the same
+way once the save commits. Files orphaned any other way (crashes before
+the queue drained, rows removed with raw SQL) are found by sweep_orphans,
+used by the sweep_media command.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+
+from kalanisVault import images
+from users.models import User
+from .models import Playlist, Video
+from .storage import TEMP_DIR
+
+logger = logging.getLogger('playlists')
+
+# Every file field holding uploads; each uploads to its own directory
+MEDIA_FIELDS = (
+    (Playlist, 'cover_image'),
+    (Video, 'custom_thumbnail'),
+    (User, 'profile_picture'),
+)
+
+
+def file_names(instance):
+    """
+    Return the stored file names of an instance's uploads and their resized
+    variants, except defaults.
+    """
+    names = []
+    for field in instance._meta.fields:
+        if isinstance(field, models.FileField):
+            name = getattr(instance, field.attname).name
+            if name and name != field.default:
+                names.append(name)
+            names.extend(images.variant_names(
+                getattr(instance, images.variants_field(field.name), None)
+            ))
+    return names
+
+
+def replaced_file_names(instance, update_fields=None):
+    """
+    Return the stored names of the uploads a save of instance replaces, and
+    their variants, going by the names the row was loaded or saved with.
+    """
+    names = []
+    deferred = instance.get_deferred_fields()
+    for field in instance._meta.fields:
+        if not isinstance(field, models.FileField):
+            continue
+        if update_fields is not None and field.name not in update_fields:
+            continue
+        stored = getattr(instance, f"_loaded_{field.name}", None)
+        file = getattr(instance, field.attname)
+        if not stored or stored == field.default:
+            continue
+        # An upload saved again, even under the same name, adds a reference
+        if file.name == stored and file._committed:
+            continue
+        names.append(stored)
+        variants_name = images.variants_field(field.name)
+        if variants_name not in deferred:
+            variants = getattr(instance, variants_name, None) or {}
+            if variants.get('source') == stored:
+                names.extend(images.variant_names(variants))
+    return names
+
+
+def remember_file_names(instance):
+    """Record the names of instance's uploads as the stored ones"""
+    for field in instance._meta.fields:
+        if isinstance(field, models.FileField):
+            setattr(instance, f"_loaded_{field.name}", getattr(instance, field.attname).name)
+
+
+class MediaCleanupQueue:
+    """
+    Queue of storage names deleted by a background thread after commit.
+    """
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def delete_on_commit(self, names, using=None):
+        """Delete the files once the current transaction commits"""
+        if names:
+            transaction.on_commit(partial(self._enqueue, list(names)), using=using)
+
+    def _enqueue(self, names):
+        if not settings.MEDIA_CLEANUP['ASYNC']:
+            self._delete(names)
+            return
+        for name in names:
+            self._queue.put(name)
+        self._ensure_thread()
+
+    def _delete(self, names):
+        for name in names:
+            try:
+                default_storage.delete(name)
+            except OSError:
+                # Left for the sweep_media command
+                logger.exception("Failed to delete media file %s", name)
+
+    def drain(self):
+        """Delete everything still queued in the calling thread"""
+        names = []
+        while True:
+            try:
+                names.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._delete(names)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='media-cleanup', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._delete([self._queue.get()])
+
+
+def _scan(path):
+    """Yield (name relative to path, DirEntry) for every file below path"""
+    stack = ['']
+    while stack:
+        prefix = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(path, prefix))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(f"{name}/")
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry
+
+
+def _orphans(model, field_name, names):
+    """
+    Return the names in a batch that no row of model references. Variants
+    count as referenced while their original is.
+    """
+    sources = {name: images.source_name(name) for name in names}
+    referenced = set(model._default_manager.filter(
+        **{f"{field_name}__in": set(sources.values())}
+    ).values_list(field_name, flat=True))
+    return [name for name in names if sources[name] not in referenced]
+
+
+def sweep_orphans(batch_size=500, min_age=3600, dry_run=False):
+    """
+    Stream through the upload directories of MEDIA_FIELDS and delete the
+    files no row references, checking batch_size names per query. Files
+    younger than min_age seconds are skipped, since their row may not be
+    committed yet. Yields (directory, orphaned names) for every batch.
+    """
+    cutoff = time.time() - min_age
+    for model, field_name in MEDIA_FIELDS:
+        field = model._meta.get_field(field_name)
+        directory = field.upload_to.strip('/')
+
+        batch = []
+        for name, entry in _scan(default_storage.path(directory)):
+            name = f"{directory}/{name}"
+            if name != field.default and entry.stat().st_mtime <= cutoff:
+                batch.append(name)
+            if len(batch) >= batch_size:
+                yield directory, _sweep_batch(model, field_name, batch, dry_run)
+                batch = []
+        if batch:
+            yield directory, _sweep_batch(model, field_name, batch, dry_run)
+
+    # Temporary files of uploads rolled back before they were stored
+    clear_incoming = getattr(default_storage, 'clear_incoming', None)
+    if clear_incoming is not None:
+        yield TEMP_DIR, clear_incoming(min_age, dry_run=dry_run)
+
+
+def _sweep_batch(model, field_name, names, dry_run):
+    orphans = _orphans(model, field_name, names)
+    if not dry_run:
+        # No row references these, so reference counts kept by the
+        # storage (see playlists.storage) no longer matter
+        purge = getattr(default_storage, 'purge', default_storage.delete)
+        for name in orphans:
+            purge(name)
+    return orphans
+
+
+media_cleanup = MediaCleanupQueue()
+atexit.register(media_cleanup.drain)
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:19
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+# The recount is written against the historical models, so later changes to
+# the app's counter code cannot change what this migration does
+def count_subquery(model, field):
+    counts = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def populate_counters(apps, schema_editor):
+    Playlist = apps.get_model('playlists', 'Playlist')
+    Video = apps.get_model('playlists', 'Video')
+    User = apps.get_model('users', 'User')
+    UserFollow = apps.get_model('users', 'UserFollow')
+    Likes = Playlist._meta.get_field('likes').remote_field.through
+
+    Playlist.objects.update(
+        video_count=count_subquery(Video, 'playlist'),
+        like_count=count_subquery(Likes, 'playlist'),
+    )
+    User.objects.update(
+        playlist_count=count_subquery(Playlist, 'user'),
+        liked_playlist_count=count_subquery(Likes, 'user'),
+        follower_count=count_subquery(UserFollow, 'followed'),
+        following_count=count_subquery(UserFollow, 'follower'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0004_delete_userfollow'),
+        ('users', '0008_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Like Count'),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Video Count'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
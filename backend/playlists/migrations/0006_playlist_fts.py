@@ -0,0 +1,55 @@
+import sqlite3
+
+from django.db import migrations
+
+
+# The table name and SQL are spelled out rather than imported from
+# playlists.search, so the migration keeps doing what it did when written
+def fts5_available():
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(body)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite' or not fts5_available():
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS playlists_playlist_fts USING fts5("
+        "title, description, tags, username, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        """
+        INSERT INTO playlists_playlist_fts(rowid, title, description, tags, username)
+        SELECT p.id, p.title, COALESCE(p.description, ''),
+               COALESCE((
+                   SELECT group_concat(t.name, ' ')
+                   FROM playlists_playlist_tags pt
+                   JOIN playlists_tag t ON t.id = pt.tag_id
+                   WHERE pt.playlist_id = p.id
+               ), ''),
+               u.username
+        FROM playlists_playlist p
+        JOIN users_user u ON u.id = p.user_id
+        """
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS playlists_playlist_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0005_playlist_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
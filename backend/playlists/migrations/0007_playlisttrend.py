@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0006_playlist_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaylistTrend',
+            fields=[
+                ('playlist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='playlists.playlist')),
+                ('log_score', models.FloatField(blank=True, db_index=True, null=True, verbose_name='Log Score')),
+                ('view_count_seen', models.PositiveIntegerField(default=0)),
+                ('like_count_seen', models.PositiveIntegerField(default=0)),
+                ('share_count_seen', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Playlist Trend',
+                'verbose_name_plural': 'Playlist Trends',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0007_playlisttrend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='likes_changed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Likes Changed At'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+ORDER_STEP = 1024
+
+
+def spread_video_order(apps, schema_editor):
+    """Renumber each playlist's videos ORDER_STEP apart, keeping their order"""
+    Video = apps.get_model('playlists', 'Video')
+    videos = Video.objects.order_by('playlist_id', 'order', 'added_at', 'id').only(
+        'id', 'playlist_id', 'order'
+    )
+
+    changed = []
+    playlist_id, position = None, 0
+    for video in videos.iterator(chunk_size=2000):
+        if video.playlist_id != playlist_id:
+            playlist_id, position = video.playlist_id, 0
+        position += 1
+        if video.order != position * ORDER_STEP:
+            video.order = position * ORDER_STEP
+            changed.append(video)
+    Video.objects.bulk_update(changed, ['order'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0008_playlist_likes_changed_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(spread_video_order, migrations.RunPython.noop),
+    ]
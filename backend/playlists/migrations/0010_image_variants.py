@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0009_sparse_video_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='cover_image_variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Cover Image Variants'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='custom_thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Custom Thumbnail Variants'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0011_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='metadata_refreshed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Metadata Refreshed At'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0012_video_metadata_refreshed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playlist',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-created_at'], name='playlist_public_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playlist',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-view_count', '-id'], name='playlist_public_views_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playlistview',
+            index=models.Index(fields=['user', '-viewed_at'], name='playlistview_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['playlist', 'order', 'added_at'], name='video_playlist_order_idx'),
+        ),
+    ]
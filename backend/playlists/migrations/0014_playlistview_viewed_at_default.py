@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playlists', '0013_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='playlistview',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,8 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from users.models import User
-import os
-from django.conf import settings
+from .managers import PlaylistQuerySet
 
 class Tag(models.Model):
     """
@@ -10,6 +10,7 @@ class Tag(models.Model):
     """
     name = models.CharField(_("Name"), max_length=50, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = _("Tag")
@@ -32,59 +33,71 @@ class Playlist(models.Model):
         blank=True,
         null=True
     )
+    cover_image_variants = models.JSONField(_("Cover Image Variants"), default=dict, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="playlists")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_public = models.BooleanField(_("Public"), default=True)
     view_count = models.PositiveIntegerField(_("View Count"), default=0)
     share_count = models.PositiveIntegerField(_("Share Count"), default=0)
+    like_count = models.PositiveIntegerField(_("Like Count"), default=0)
+    video_count = models.PositiveIntegerField(_("Video Count"), default=0)
+    likes_changed_at = models.DateTimeField(_("Likes Changed At"), blank=True, null=True)
     
     likes = models.ManyToManyField(User, related_name="liked_playlists", blank=True)
     tags = models.ManyToManyField(Tag, related_name="playlists", blank=True)
     
+    objects = PlaylistQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _("Playlist")
         verbose_name_plural = _("Playlists")
         ordering = ['-created_at']
+        indexes = [
+            # Public listings in the default order and the popular
+            # leaderboard. Partial rather than leading with is_public,
+            # because is_public=True compiles to a bare "WHERE is_public"
+            # that SQLite cannot seek a composite index with.
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_public=True),
+                name='playlist_public_created_idx'
+            ),
+            models.Index(
+                fields=['-view_count', '-id'], condition=models.Q(is_public=True),
+                name='playlist_public_views_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} by {self.user.username}"
     
-    @property
-    def video_count(self):
-        """Returns the number of videos in this playlist"""
-        return self.videos.count()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored visibility, so a save can tell it changed
+        if 'is_public' in field_names:
+            instance._loaded_is_public = instance.is_public
+        # and the stored cover, so a replaced one can be released
+        if 'cover_image' in field_names:
+            instance._loaded_cover_image = instance.cover_image.name
+        return instance
     
-    @property
-    def like_count(self):
-        """Returns the number of likes for this playlist"""
-        return self.likes.count()
+    def save(self, *args, **kwargs):
+        """
+        Save inside a transaction so the owner's playlist_count, maintained
+        by a post_save handler, commits together with the playlist.
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
         """
-        Override delete method to handle cleanup of associated resources:
-        - Delete cover image file (if not default)
-        - Delete videos and their custom thumbnails
-        - Remove tag associations (but don't delete the tags themselves)
+        Override delete method to remove tag associations (but not the tags
+        themselves) with m2m signals. Files are removed by the post_delete
+        handlers once the deletion commits.
         """
-        # Delete cover image file if it exists and is not the default
-        if self.cover_image and not self.cover_image.name.endswith('default.png'):
-            image_path = os.path.join(settings.MEDIA_ROOT, self.cover_image.name)
-            if os.path.isfile(image_path):
-                os.remove(image_path)
-        
-        # Get all videos to delete their custom thumbnails
-        videos = self.videos.all()
-        for video in videos:
-            if video.custom_thumbnail:
-                thumbnail_path = os.path.join(settings.MEDIA_ROOT, video.custom_thumbnail.name)
-                if os.path.isfile(thumbnail_path):
-                    os.remove(thumbnail_path)
-        
-        # Clear tag associations (don't delete the tags themselves)
         self.tags.clear()
         
-        # Call the parent delete() method to handle the actual deletion
         super().delete(*args, **kwargs)
 
 
@@ -102,28 +115,41 @@ class Video(models.Model):
         blank=True,
         null=True
     )
+    custom_thumbnail_variants = models.JSONField(
+        _("Custom Thumbnail Variants"), default=dict, blank=True
+    )
     playlist = models.ForeignKey(Playlist, on_delete=models.CASCADE, related_name="videos")
     added_at = models.DateTimeField(auto_now_add=True)
     order = models.PositiveIntegerField(_("Order"), default=0)
+    metadata_refreshed_at = models.DateTimeField(_("Metadata Refreshed At"), blank=True, null=True)
     
     class Meta:
         verbose_name = _("Video")
         verbose_name_plural = _("Videos")
         ordering = ['order', 'added_at']
+        indexes = [
+            # A playlist's videos in their default order
+            models.Index(fields=['playlist', 'order', 'added_at'], name='video_playlist_order_idx'),
+        ]
     
     def __str__(self):
         return f"Video {self.tiktok_id} in {self.playlist.title}"
     
-    def delete(self, *args, **kwargs):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored thumbnail, so a replaced one can be released
+        if 'custom_thumbnail' in field_names:
+            instance._loaded_custom_thumbnail = instance.custom_thumbnail.name
+        return instance
+    
+    def save(self, *args, **kwargs):
         """
-        Override delete method to clean up custom thumbnail if it exists
+        Save inside a transaction so the playlist's video_count, maintained
+        by a post_save handler, commits together with the video.
         """
-        if self.custom_thumbnail:
-            thumbnail_path = os.path.join(settings.MEDIA_ROOT, self.custom_thumbnail.name)
-            if os.path.isfile(thumbnail_path):
-                os.remove(thumbnail_path)
-                
-        super().delete(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
     
 class PlaylistView(models.Model):
     """
@@ -131,13 +157,65 @@ class PlaylistView(models.Model):
     """
     user = models.ForeignKey(User, related_name="playlist_views", on_delete=models.CASCADE)
     playlist = models.ForeignKey(Playlist, related_name="user_views", on_delete=models.CASCADE)
-    viewed_at = models.DateTimeField(auto_now=True)
+    viewed_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = _("Playlist View")
         verbose_name_plural = _("Playlist Views")
         ordering = ['-viewed_at']
         unique_together = ['user', 'playlist']
+        indexes = [
+            # recent_playlists
+            models.Index(fields=['user', '-viewed_at'], name='playlistview_user_recent_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} viewed {self.playlist.title}"
+
+class PlaylistTrend(models.Model):
+    """
+    Model holding a playlist's time-decayed trending score.
+    
+    The score is stored as log2 of a forward-decayed sum, so playlists
+    can be ranked by it without ever re-decaying rows that saw no new
+    activity. The *_seen counters snapshot the playlist at the last
+    update and are used to compute activity deltas.
+    """
+    playlist = models.OneToOneField(
+        Playlist,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trend"
+    )
+    log_score = models.FloatField(_("Log Score"), null=True, blank=True, db_index=True)
+    view_count_seen = models.PositiveIntegerField(default=0)
+    like_count_seen = models.PositiveIntegerField(default=0)
+    share_count_seen = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _("Playlist Trend")
+        verbose_name_plural = _("Playlist Trends")
+    
+    def __str__(self):
+        return f"Trend for {self.playlist_id}"
+
+class MediaBlob(models.Model):
+    """
+    Model counting the references to a content-addressed media file.
+    
+    Rows are maintained by playlists.storage.ContentAddressedStorage: each
+    save of identical content adds a reference instead of a new file, and
+    the file is only removed when its last reference is deleted.
+    """
+    name = models.CharField(_("Name"), max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField(_("Reference Count"), default=1)
+    size = models.PositiveBigIntegerField(_("Size"), default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _("Media Blob")
+        verbose_name_plural = _("Media Blobs")
     
     def __str__(self):
-        return f"{self.user.username} viewed {self.playlist.title}"
\ No newline at end of file
+        return f"{self.name} ({self.refcount} references)"
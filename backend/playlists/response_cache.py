@@ -0,0 +1,146 @@
+"""
+This module caches the serialized bodies of public read endpoints.
+
+Entries live in the Django cache named by RESPONSE_CACHE['ALIAS'], so any
+configured backend works (local memory, file based or Redis). Keys are
+built from a namespace generation, the endpoint name and the query
+parameters the response depends on. Signal handlers invalidate a whole
+namespace by bumping its generation; stale entries are never read again
+and simply expire. Counter-only changes such as likes and shares do not
+invalidate, so cached counts may lag by up to RESPONSE_CACHE['TIMEOUT'].
+
+Cached bodies must not contain per-user data: views leave such fields out
+when serializing and patch them in after each cache lookup.
+
+With the local-memory backend every process has its own cache, so changes
+made in another worker are only picked up after RESPONSE_CACHE['TIMEOUT'].
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+KEY_PREFIX = 'response'
+
+
+class ResponseCache:
+    """
+    Generation-keyed cache of response bodies with hit/miss counters.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+        self._invalidations = defaultdict(int)
+
+    @property
+    def config(self):
+        return settings.RESPONSE_CACHE
+
+    @property
+    def cache(self):
+        return caches[self.config['ALIAS']]
+
+    def _generation_key(self, namespace):
+        return f"{KEY_PREFIX}:{namespace}:generation"
+
+    def generation(self, namespace):
+        # Start from the clock so a generation key that was evicted can
+        # never come back with a value older entries were stored under
+        return self.cache.get_or_set(
+            self._generation_key(namespace), time.time_ns() // 1000, None
+        )
+
+    async def ageneration(self, namespace):
+        return await self.cache.aget_or_set(
+            self._generation_key(namespace), time.time_ns() // 1000, None
+        )
+
+    def make_key(self, namespace, name, params, generation=None):
+        if generation is None:
+            generation = self.generation(namespace)
+        digest = hashlib.blake2b(repr(params).encode(), digest_size=16).hexdigest()
+        return f"{KEY_PREFIX}:{namespace}:{generation}:{name}:{digest}"
+
+    def get_or_set(self, namespace, name, params, compute):
+        """
+        Return the cached value for an endpoint and its parameters, calling
+        ``compute`` and storing its result on a miss.
+        """
+        if not self.config['ENABLED']:
+            return compute()
+
+        key = self.make_key(namespace, name, params)
+        value = self.cache.get(key)
+        self._count(name, value)
+        if value is None:
+            value = compute()
+            self.cache.set(key, value, self.config['TIMEOUT'])
+        return value
+
+    async def aget_or_set(self, namespace, name, params, compute):
+        """Async version of get_or_set, awaiting ``compute()`` on a miss"""
+        if not self.config['ENABLED']:
+            return await compute()
+
+        key = self.make_key(namespace, name, params, await self.ageneration(namespace))
+        value = await self.cache.aget(key)
+        self._count(name, value)
+        if value is None:
+            value = await compute()
+            await self.cache.aset(key, value, self.config['TIMEOUT'])
+        return value
+
+    def _count(self, name, value):
+        with self._lock:
+            if value is None:
+                self._misses[name] += 1
+            else:
+                self._hits[name] += 1
+
+    def invalidate(self, namespace):
+        """Drop every entry of a namespace by moving to a new generation"""
+        key = self._generation_key(namespace)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, time.time_ns() // 1000, None)
+        with self._lock:
+            self._invalidations[namespace] += 1
+
+    def stats(self):
+        """Return per-endpoint hit ratios for this process"""
+        with self._lock:
+            endpoints = {}
+            for name in self._hits.keys() | self._misses.keys():
+                hits, misses = self._hits[name], self._misses[name]
+                endpoints[name] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_ratio': hits / (hits + misses),
+                }
+            return {
+                'enabled': self.config['ENABLED'],
+                'backend': self.cache.__class__.__name__,
+                'endpoints': endpoints,
+                'invalidations': dict(self._invalidations),
+            }
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_responses(*namespaces):
+    """
+    Invalidate cached responses now, so this process stops serving them,
+    and again on commit, so entries cached from reads made before the
+    commit are dropped too.
+    """
+    for namespace in namespaces:
+        response_cache.invalidate(namespace)
+        transaction.on_commit(partial(response_cache.invalidate, namespace))
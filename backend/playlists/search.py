@@ -0,0 +1,196 @@
+"""
+This module implements full-text playlist search.
+On SQLite builds with FTS5 the playlists are indexed in a virtual table
+ranked with BM25; other databases fall back to a portable ORM query.
+The virtual table is created by a migration, or on first use when that
+migration ran against a SQLite build without FTS5.
+"""
+import re
+import sqlite3
+from functools import lru_cache, partial
+
+from django.db import connection, transaction
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+
+from .models import Playlist, Tag
+
+FTS_TABLE = 'playlists_playlist_fts'
+
+# BM25 column weights for title, description, tags and username
+FTS_WEIGHTS = (10.0, 2.0, 5.0, 3.0)
+
+FTS_CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, description, tags, username, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+
+@lru_cache(maxsize=None)
+def fts5_available():
+    """Return whether the linked SQLite library was built with FTS5"""
+    try:
+        sqlite3.connect(':memory:').execute(
+            'CREATE VIRTUAL TABLE fts5_probe USING fts5(body)'
+        )
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def get_terms(query):
+    """Split a search query into lower-cased word terms"""
+    return re.findall(r'\w+', query.lower())
+
+
+class FallbackSearchBackend:
+    """
+    Portable search that works on any database.
+    Matches every term against title, description, tag names or username,
+    using EXISTS for tags so the results never need DISTINCT.
+    """
+    def index(self, playlist_ids):
+        pass
+
+    def remove(self, playlist_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, user, offset, limit):
+        terms = get_terms(query)
+        if not terms:
+            return []
+
+        queryset = Playlist.objects.filter(Q(is_public=True) | Q(user=user))
+        for term in terms:
+            tagged = Exists(Tag.objects.filter(playlists=OuterRef('pk'), name__icontains=term))
+            queryset = queryset.filter(
+                Q(title__icontains=term) |
+                Q(description__icontains=term) |
+                Q(user__username__icontains=term) |
+                tagged
+            )
+
+        queryset = queryset.annotate(
+            title_match=Case(
+                When(title__icontains=query, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        ).order_by('-title_match', '-created_at')
+
+        return list(queryset.values_list('id', flat=True)[offset:offset + limit])
+
+
+class SQLiteFTSBackend:
+    """
+    Search backed by an FTS5 virtual table whose rowid is the playlist ID.
+    Rows are rebuilt from the playlist, tag and user tables with a single
+    INSERT ... SELECT per change.
+    """
+    # Names of the databases whose FTS table is known to exist
+    ready_databases = set()
+
+    def ensure_table(self):
+        """Create and fill the FTS table if the database does not have it yet"""
+        name = connection.settings_dict['NAME']
+        if name in self.ready_databases:
+            return
+        if FTS_TABLE in connection.introspection.table_names():
+            self.ready_databases.add(name)
+            return
+        self.rebuild()
+        # Only once committed, as a rollback drops the table again
+        transaction.on_commit(partial(self.ready_databases.add, name))
+
+    def _source_sql(self):
+        playlist_table = Playlist._meta.db_table
+        user_table = Playlist._meta.get_field('user').related_model._meta.db_table
+        tags_through = Playlist.tags.through._meta.db_table
+        tag_table = Tag._meta.db_table
+        return f"""
+            SELECT p.id, p.title, COALESCE(p.description, ''),
+                   COALESCE((
+                       SELECT group_concat(t.name, ' ')
+                       FROM {tags_through} pt
+                       JOIN {tag_table} t ON t.id = pt.tag_id
+                       WHERE pt.playlist_id = p.id
+                   ), ''),
+                   u.username
+            FROM {playlist_table} p
+            JOIN {user_table} u ON u.id = p.user_id
+        """
+
+    def index(self, playlist_ids):
+        """Re-index the given playlists, dropping any that no longer exist"""
+        playlist_ids = list(playlist_ids)
+        if not playlist_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(playlist_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+                playlist_ids
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description, tags, username) "
+                f"{self._source_sql()} WHERE p.id IN ({placeholders})",
+                playlist_ids
+            )
+
+    def remove(self, playlist_ids):
+        playlist_ids = list(playlist_ids)
+        if not playlist_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(playlist_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+                playlist_ids
+            )
+
+    def rebuild(self):
+        """Rebuild the whole index from the source tables"""
+        with connection.cursor() as cursor:
+            cursor.execute(FTS_CREATE_SQL)
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description, tags, username) "
+                f"{self._source_sql()}"
+            )
+
+    def search(self, query, user, offset, limit):
+        """
+        Return the IDs of visible playlists matching every term as a
+        prefix, best BM25 rank first.
+        """
+        terms = get_terms(query)
+        if not terms:
+            return []
+
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT p.id
+                FROM {FTS_TABLE} f
+                JOIN {Playlist._meta.db_table} p ON p.id = f.rowid
+                WHERE {FTS_TABLE} MATCH %s AND (p.is_public OR p.user_id = %s)
+                ORDER BY bm25({FTS_TABLE}, {weights})
+                LIMIT %s OFFSET %s
+                """,
+                [match, user.pk, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_backend():
+    """Return the search backend for the default database"""
+    if connection.vendor == 'sqlite' and fts5_available():
+        backend = SQLiteFTSBackend()
+        backend.ensure_table()
+        return backend
+    return FallbackSearchBackend()
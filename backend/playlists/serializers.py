@@ -1,6 +1,14 @@
+from django.conf import settings
+from django.db import models, transaction
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
+from kalanisVault.images import ImageVariantsField
 from .models import Playlist, Video, Tag, PlaylistView
-from users.serializers import CreateUserSerializer
+from .response_cache import invalidate_responses
+from .thumbnails import is_allowed, url_version
+from . import tiktok
+from users.serializers import CreateUserSerializer, UserSummarySerializer
 
 class TagSerializer(serializers.ModelSerializer):
     """
@@ -10,16 +18,111 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ['id', 'name']
 
+def complete_video_metadata(attrs, require_id=True, resolved_metadata=None):
+    """
+    Fill in the tiktok_id, title and thumbnail_url a client left out from
+    the TikTok URL and its oEmbed metadata. Fields the client sent are kept.
+    
+    This runs during validation, so an oEmbed lookup blocks the request for
+    at most TIKTOK['SAVE_TIMEOUT'] seconds. A video saved without its
+    metadata keeps metadata_refreshed_at empty and refresh_video_metadata
+    fills it in later. ``resolved_metadata`` is a {url: metadata} result of
+    tiktok.resolve_many to use instead of looking the URL up again.
+    """
+    if tiktok.needs_metadata(attrs):
+        parsed_id = tiktok.parse_video_id(attrs['tiktok_url'])
+        if parsed_id and attrs.get('title') and attrs.get('thumbnail_url'):
+            metadata = {'tiktok_id': parsed_id}
+        else:
+            if resolved_metadata is not None:
+                resolved = resolved_metadata.get(attrs['tiktok_url'])
+            else:
+                resolved = tiktok.resolve(
+                    attrs['tiktok_url'], timeout=settings.TIKTOK['SAVE_TIMEOUT']
+                )
+            metadata = resolved or {'tiktok_id': parsed_id}
+            if resolved:
+                attrs['metadata_refreshed_at'] = timezone.now()
+        
+        for field in ('tiktok_id', 'title', 'thumbnail_url'):
+            value = metadata.get(field)
+            if value and (not attrs.get(field) or attrs[field] == tiktok.UNKNOWN_ID):
+                attrs[field] = value
+    
+    if require_id and not attrs.get('tiktok_id'):
+        raise serializers.ValidationError({
+            'tiktok_id': "This field is required unless it can be read from the TikTok URL."
+        })
+    return attrs
+
 class VideoSerializer(serializers.ModelSerializer):
     """
     Serializer for the Video model.
     """
+    custom_thumbnail_variants = ImageVariantsField('custom_thumbnail')
+    thumbnail_proxy_url = serializers.SerializerMethodField()
+    
     class Meta:
         model = Video
-        fields = ['id', 'title', 'tiktok_url', 'tiktok_id', 'thumbnail_url', 
-                 'custom_thumbnail', 'playlist', 'added_at', 'order']
+        fields = ['id', 'title', 'tiktok_url', 'tiktok_id', 'thumbnail_url', 'thumbnail_proxy_url',
+                 'custom_thumbnail', 'custom_thumbnail_variants', 'playlist', 'added_at', 'order']
         read_only_fields = ['added_at']
+        extra_kwargs = {'tiktok_id': {'required': False}}
+    
+    def validate(self, attrs):
+        if 'tiktok_url' not in attrs:
+            return attrs
+        return complete_video_metadata(attrs, require_id=self.instance is None)
+    
+    def get_thumbnail_proxy_url(self, obj):
+        """
+        Link to the cached copy of thumbnail_url served by the API. It
+        carries a digest of the remote URL so it changes along with it.
+        """
+        if not obj.thumbnail_url or not is_allowed(obj.thumbnail_url):
+            return None
+        url = f"{reverse('video-thumbnail', args=[obj.pk])}?v={url_version(obj.thumbnail_url)}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+def get_liked_ids(request, playlist_ids):
+    """
+    Return the IDs among ``playlist_ids`` that the requesting user has liked,
+    using a single query on the likes table.
+    """
+    if not (request and request.user.is_authenticated):
+        return set()
+    
+    return set(Playlist.likes.through.objects.filter(
+        user_id=request.user.pk,
+        playlist_id__in=playlist_ids
+    ).values_list('playlist_id', flat=True))
 
+async def aget_liked_ids(request, playlist_ids):
+    """Async version of get_liked_ids"""
+    if not (request and request.user.is_authenticated):
+        return set()
+    
+    return {
+        playlist_id async for playlist_id in Playlist.likes.through.objects.filter(
+            user_id=request.user.pk,
+            playlist_id__in=playlist_ids
+        ).values_list('playlist_id', flat=True)
+    }
+
+class PlaylistListSerializer(serializers.ListSerializer):
+    """
+    List serializer that resolves is_liked for a whole page at once,
+    unless the view already put the liked IDs in the context.
+    """
+    def to_representation(self, data):
+        playlists = list(data.all() if isinstance(data, models.Manager) else data)
+        if 'is_liked' in self.child.fields and 'liked_ids' not in self.context:
+            self.child.context['liked_ids'] = get_liked_ids(
+                self.context.get('request'), [playlist.pk for playlist in playlists]
+            )
+        return super().to_representation(playlists)
 
 class PlaylistSerializer(serializers.ModelSerializer):
     """
@@ -27,26 +130,69 @@ class PlaylistSerializer(serializers.ModelSerializer):
     """
     videos = VideoSerializer(many=True, read_only=True)
     user = CreateUserSerializer(read_only=True)
-    like_count = serializers.IntegerField(read_only=True)
-    video_count = serializers.IntegerField(read_only=True)
     is_liked = serializers.SerializerMethodField()
     tags = TagSerializer(many=True, read_only=True)
+    cover_image_variants = ImageVariantsField('cover_image')
     
     class Meta:
         model = Playlist
-        fields = ['id', 'title', 'description', 'cover_image', 
+        fields = ['id', 'title', 'description', 'cover_image', 'cover_image_variants',
                  'user', 'created_at', 'updated_at', 'is_public', 'videos', 
                  'like_count', 'video_count', 'is_liked', 'view_count', 'share_count',
                  'tags']
-        read_only_fields = ['created_at', 'updated_at', 'user', 'view_count', 'share_count']
+        read_only_fields = ['created_at', 'updated_at', 'user', 'view_count', 'share_count',
+                            'like_count', 'video_count']
+        list_serializer_class = PlaylistListSerializer
     
     def get_is_liked(self, obj):
         """Check if the current user has liked this playlist"""
+        liked_ids = self.context.get('liked_ids')
+        if liked_ids is not None:
+            return obj.pk in liked_ids
+        
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return request.user in obj.likes.all()
+            return obj.likes.filter(pk=request.user.pk).exists()
         return False
 
+class PlaylistSummarySerializer(PlaylistSerializer):
+    """
+    Compact playlist representation used by list endpoints.
+    
+    Nests only a summary of the owner and leaves out videos. The view passes
+    'fields' (names to keep) and 'expand' (names of expandable_fields to
+    add) through the serializer context, and sets 'shared' to leave out the
+    per_user_fields when the output is cached for every user.
+    """
+    user = UserSummarySerializer(read_only=True)
+    per_user_fields = ('is_liked',)
+    
+    expandable_fields = {
+        'videos': lambda: VideoSerializer(many=True, read_only=True),
+        'user': lambda: CreateUserSerializer(read_only=True),
+    }
+    
+    class Meta(PlaylistSerializer.Meta):
+        fields = [name for name in PlaylistSerializer.Meta.fields if name != 'videos']
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get('expand', set())
+        only = self.context.get('fields', set())
+        
+        for name in expand & self.expandable_fields.keys():
+            fields[name] = self.expandable_fields[name]()
+        
+        if only:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in only or name in expand
+            }
+        if self.context.get('shared'):
+            for name in self.per_user_fields:
+                fields.pop(name, None)
+        return fields
+
 class PlaylistCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating playlists.
@@ -66,9 +212,9 @@ class PlaylistCreateSerializer(serializers.ModelSerializer):
         tags_data = validated_data.pop('tags', [])
         
         user = self.context['request'].user
-        playlist = Playlist.objects.create(user=user, **validated_data)
-        
-        self._add_tags_to_playlist(playlist, tags_data)
+        with transaction.atomic():
+            playlist = Playlist.objects.create(user=user, **validated_data)
+            self._set_playlist_tags(playlist, tags_data, created=True)
         
         return playlist
 
@@ -78,23 +224,112 @@ class PlaylistCreateSerializer(serializers.ModelSerializer):
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
-        
-        if tags_data is not None:
-            instance.tags.clear()
-            self._add_tags_to_playlist(instance, tags_data)
+        with transaction.atomic():
+            instance.save()
+            if tags_data is not None:
+                self._set_playlist_tags(instance, tags_data)
         
         return instance
     
-    def _add_tags_to_playlist(self, playlist, tags_data):
-        """Helper method to add tags to a playlist"""
-        if not tags_data:
-            return
-            
-        for tag_name in tags_data:
-            if isinstance(tag_name, str):
-                tag, created = Tag.objects.get_or_create(name=tag_name.strip().lower())
-                playlist.tags.add(tag)
+    @staticmethod
+    def _normalize_tag_names(tags_data):
+        """Strip and lowercase tag names, dropping blanks and repeats"""
+        names = (name.strip().lower() for name in tags_data if isinstance(name, str))
+        return list(dict.fromkeys(name for name in names if name))
+    
+    @staticmethod
+    def _resolve_tags(names):
+        """
+        Return {name: tag id} for the names, creating the missing tags with
+        one INSERT. Conflicts from concurrent creates are ignored and the
+        new tags are read back by name.
+        """
+        if not names:
+            return {}
+        tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = [name for name in names if name not in tag_ids]
+        if missing:
+            # bulk_create sends no post_save; the tag index notices unknown
+            # IDs when their usage changes, the cached tag list does not
+            Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+            tag_ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+            invalidate_responses('tags')
+        return tag_ids
+    
+    def _set_playlist_tags(self, playlist, tags_data, created=False):
+        """
+        Make the playlist's tags match tags_data, adding and removing only
+        the difference so an unchanged tag set costs no writes.
+        """
+        wanted = set(self._resolve_tags(self._normalize_tag_names(tags_data)).values())
+        current = set() if created else set(playlist.tags.values_list('id', flat=True))
+        
+        if current - wanted:
+            playlist.tags.remove(*(current - wanted))
+        if wanted - current:
+            playlist.tags.add(*(wanted - current))
+
+class BulkLikeSerializer(serializers.Serializer):
+    """
+    Serializer for liking or unliking many playlists in one request.
+    """
+    playlist_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500
+    )
+    liked = serializers.BooleanField()
+
+class BulkVideoItemSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one video of a bulk add.
+    """
+    class Meta:
+        model = Video
+        fields = ['title', 'tiktok_url', 'tiktok_id', 'thumbnail_url']
+        extra_kwargs = {'tiktok_id': {'required': False}}
+    
+    def validate(self, attrs):
+        return complete_video_metadata(
+            attrs, resolved_metadata=self.context.get('tiktok_metadata')
+        )
+
+class BulkVideoSerializer(serializers.Serializer):
+    """
+    Serializer for adding many videos to a playlist in one request.
+    Items are validated one by one with BulkVideoItemSerializer so a bad
+    item does not reject the whole batch.
+    """
+    playlist = serializers.IntegerField(min_value=1)
+    videos = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=500
+    )
+    allow_duplicates = serializers.BooleanField(default=False)
+
+class MoveVideoSerializer(serializers.Serializer):
+    """
+    Serializer for moving a video next to another video of its playlist.
+    """
+    after = serializers.IntegerField(min_value=1, required=False)
+    before = serializers.IntegerField(min_value=1, required=False)
+    
+    def validate(self, data):
+        if len(data) != 1:
+            raise serializers.ValidationError("Provide exactly one of 'after' or 'before'.")
+        return data
+
+class ReorderVideosSerializer(serializers.Serializer):
+    """
+    Serializer for setting the full video order of a playlist.
+    """
+    playlist = serializers.IntegerField(min_value=1)
+    videos = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=5000
+    )
 
 class PlaylistViewSerializer(serializers.ModelSerializer):
     """
@@ -0,0 +1,309 @@
+"""
+This module registers the signal handlers for the playlists app.
+They keep the denormalized counters on Playlist and User in step with
+videos, playlists and likes as they are added and removed, keep the
+search index in step with playlist titles, tags and owner usernames,
+keep the tag autocomplete index in step with tags and their usage,
+refresh the explore feed when playlists join it, invalidate cached public
+responses, queue the files of deleted rows for removal, and schedule
+resized variants of new uploads.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from kalanisVault import images
+from kalanisVault.counters import adjust
+from users.models import User
+from . import explore
+from .media import file_names, media_cleanup, remember_file_names, replaced_file_names
+from .models import Playlist, Tag, Video
+from .response_cache import invalidate_responses
+from .search import get_backend
+from .tag_index import tag_index
+
+SEARCHABLE_PLAYLIST_FIELDS = {'title', 'description', 'user'}
+# Counters that cached responses may show stale until they expire
+COUNTER_PLAYLIST_FIELDS = {'view_count', 'like_count', 'share_count', 'likes_changed_at'}
+
+
+@receiver(post_save, sender=Video)
+def video_saved(sender, instance, created, **kwargs):
+    """
+    Increment the playlist's video_count when a video is added, and bump
+    its updated_at on any change so conditional GETs see new content.
+    """
+    playlist = Playlist.objects.filter(pk=instance.playlist_id)
+    if created:
+        adjust(playlist, 'video_count', 1, updated_at=timezone.now())
+        explore.videos_added(instance.playlist_id, 1)
+    else:
+        playlist.update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Video)
+def video_deleted(sender, instance, **kwargs):
+    """Decrement the playlist's video_count when a video is removed"""
+    adjust(
+        Playlist.objects.filter(pk=instance.playlist_id), 'video_count', -1,
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Playlist)
+def playlist_created(sender, instance, created, **kwargs):
+    """Increment the owner's playlist_count when a playlist is created"""
+    if created:
+        adjust(User.objects.filter(pk=instance.user_id), 'playlist_count', 1)
+
+
+@receiver(post_save, sender=Playlist)
+def playlist_made_public(sender, instance, created, **kwargs):
+    """Put a playlist with videos into the explore feed once it is made public"""
+    was_public = getattr(instance, '_loaded_is_public', None)
+    if not created and was_public is False and instance.is_public and instance.video_count:
+        explore.invalidate()
+    instance._loaded_is_public = instance.is_public
+
+
+@receiver(pre_delete, sender=Playlist)
+def playlist_deleting(sender, instance, **kwargs):
+    """
+    Decrement liked_playlist_count for everyone who liked the playlist.
+    The cascade removes the like rows without sending m2m_changed.
+    """
+    adjust(User.objects.filter(liked_playlists=instance), 'liked_playlist_count', -1)
+
+
+@receiver(post_delete, sender=Playlist)
+def playlist_deleted(sender, instance, **kwargs):
+    """Decrement the owner's playlist_count when a playlist is deleted"""
+    adjust(User.objects.filter(pk=instance.user_id), 'playlist_count', -1)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """
+    Decrement like_count on every playlist the user liked.
+    The cascade removes the like rows without sending m2m_changed.
+    """
+    adjust(Playlist.objects.filter(likes=instance), 'like_count', -1)
+
+
+@receiver(m2m_changed, sender=Playlist.likes.through)
+def likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Playlist.like_count and User.liked_playlist_count in step with the
+    likes table, whichever side of the relation was changed, and stamp the
+    playlists' likes_changed_at.
+    """
+    if action == 'pre_clear':
+        # Remember what is about to be cleared; post_clear has no pk_set
+        related = instance.liked_playlists if reverse else instance.likes
+        instance._cleared_like_ids = set(related.values_list('pk', flat=True))
+        return
+    
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_like_ids', set())
+        delta = -1
+    elif action == 'post_add':
+        delta = 1
+    elif action == 'post_remove':
+        delta = -1
+    else:
+        return
+    
+    if not pk_set:
+        return
+    
+    now = timezone.now()
+    if reverse:
+        # The user's side changed: pk_set holds playlist IDs
+        adjust(Playlist.objects.filter(pk__in=pk_set), 'like_count', delta, likes_changed_at=now)
+        adjust(User.objects.filter(pk=instance.pk), 'liked_playlist_count', delta * len(pk_set))
+    else:
+        # The playlist's side changed: pk_set holds user IDs
+        adjust(Playlist.objects.filter(pk=instance.pk), 'like_count', delta * len(pk_set), likes_changed_at=now)
+        adjust(User.objects.filter(pk__in=pk_set), 'liked_playlist_count', delta)
+
+
+@receiver(post_save, sender=Playlist)
+def index_playlist(sender, instance, update_fields=None, **kwargs):
+    """Re-index a playlist when a searchable field may have changed"""
+    if update_fields is not None and not SEARCHABLE_PLAYLIST_FIELDS & set(update_fields):
+        return
+    get_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Playlist)
+def unindex_playlist(sender, instance, **kwargs):
+    get_backend().remove([instance.pk])
+
+
+def touch_playlists(playlist_ids):
+    """Bump updated_at so conditional GETs see a change to related rows"""
+    Playlist.objects.filter(pk__in=playlist_ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Playlist.tags.through)
+def index_playlist_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Re-index the playlists whose tags changed and bump their updated_at"""
+    if action == 'pre_clear' and reverse:
+        # Remember which playlists lose the tag; post_clear has no pk_set
+        instance._cleared_playlist_ids = set(instance.playlists.values_list('pk', flat=True))
+        return
+    
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    
+    if not reverse:
+        playlist_ids = [instance.pk]
+    elif action == 'post_clear':
+        playlist_ids = instance.__dict__.pop('_cleared_playlist_ids', set())
+    else:
+        playlist_ids = pk_set
+    get_backend().index(playlist_ids)
+    touch_playlists(playlist_ids)
+
+
+@receiver(post_save, sender=Tag)
+def index_renamed_tag(sender, instance, created, **kwargs):
+    """Re-index a tag's playlists when it is renamed"""
+    if not created:
+        get_backend().index(instance.playlists.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    """Remember a tag's playlists; the cascade sends no m2m_changed"""
+    instance._deleted_playlist_ids = list(instance.playlists.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def index_deleted_tag(sender, instance, **kwargs):
+    playlist_ids = getattr(instance, '_deleted_playlist_ids', [])
+    get_backend().index(playlist_ids)
+    touch_playlists(playlist_ids)
+
+
+@receiver(post_save, sender=User)
+def index_renamed_user(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Re-index a user's playlists when their username changes. Users not
+    loaded from the database have no stored username to compare with and
+    are always re-indexed.
+    """
+    loaded_username = getattr(instance, '_loaded_username', None)
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    instance._loaded_username = instance.username
+    if created or loaded_username == instance.username:
+        return
+    get_backend().index(instance.playlists.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+def update_tag_index(sender, instance, created, **kwargs):
+    """Add or rename the tag in the autocomplete index once committed"""
+    if created:
+        transaction.on_commit(partial(tag_index.add, instance.pk, instance.name))
+    else:
+        transaction.on_commit(partial(tag_index.rename, instance.pk, instance.name))
+
+
+@receiver(post_delete, sender=Tag)
+def remove_from_tag_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(tag_index.remove, instance.pk))
+
+
+@receiver(m2m_changed, sender=Playlist.tags.through)
+def update_tag_usage(sender, instance, action, reverse, pk_set, **kwargs):
+    """Adjust autocomplete usage counts as tags are applied and removed"""
+    if action == 'pre_clear' and not reverse:
+        # Remember which tags the playlist loses; post_clear has no pk_set
+        instance._cleared_tag_ids = set(instance.tags.values_list('pk', flat=True))
+        return
+    
+    if action == 'post_add':
+        delta = 1
+    elif action in ('post_remove', 'post_clear'):
+        delta = -1
+    else:
+        return
+    
+    if reverse and action == 'post_clear':
+        update = tag_index.invalidate
+    elif reverse:
+        update = partial(tag_index.adjust_usage, [instance.pk], delta * len(pk_set))
+    elif action == 'post_clear':
+        update = partial(tag_index.adjust_usage, instance.__dict__.pop('_cleared_tag_ids', set()), delta)
+    else:
+        update = partial(tag_index.adjust_usage, set(pk_set), delta)
+    transaction.on_commit(update)
+
+
+@receiver([post_save, post_delete], sender=Playlist)
+@receiver([post_save, post_delete], sender=Video)
+def playlist_content_changed(sender, update_fields=None, **kwargs):
+    # Counter-only changes such as shares may show stale counts until
+    # cached responses expire, rather than emptying the whole namespace
+    if update_fields is not None and set(update_fields) <= COUNTER_PLAYLIST_FIELDS:
+        return
+    invalidate_responses('playlists')
+
+
+@receiver(m2m_changed, sender=Playlist.tags.through)
+def playlist_relations_changed(sender, action, **kwargs):
+    # Not connected to likes: they only change like_count, which may be
+    # stale until cached responses expire, and is_liked, patched in per user
+    if action.startswith('post_'):
+        invalidate_responses('playlists')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tag_changed(sender, **kwargs):
+    invalidate_responses('playlists', 'tags')
+
+
+@receiver(post_delete, sender=Playlist)
+@receiver(post_delete, sender=Video)
+@receiver(post_delete, sender=User)
+def delete_media_files(sender, instance, using, **kwargs):
+    """Remove the deleted row's uploads in the background after commit"""
+    media_cleanup.delete_on_commit(file_names(instance), using=using)
+
+
+@receiver(pre_save, sender=Playlist)
+@receiver(pre_save, sender=Video)
+@receiver(pre_save, sender=User)
+def find_replaced_media(sender, instance, update_fields=None, **kwargs):
+    """Note the uploads this save replaces, before the new ones are stored"""
+    instance._replaced_files = replaced_file_names(instance, update_fields)
+
+
+@receiver(post_save, sender=Playlist)
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender=User)
+def release_replaced_media(sender, instance, using, **kwargs):
+    """Remove the uploads the save replaced in the background after commit"""
+    media_cleanup.delete_on_commit(instance.__dict__.pop('_replaced_files', ()), using=using)
+    remember_file_names(instance)
+
+
+@receiver(post_save, sender=Playlist)
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender=User)
+def process_uploaded_images(sender, instance, using, update_fields=None, **kwargs):
+    """Build variants of newly uploaded images after commit"""
+    for field in instance._meta.fields:
+        if images.get_config(sender, field.name):
+            images.process_on_commit(
+                instance, field.name, using=using, update_fields=update_fields
+            )
+
+
+@receiver(images.variants_ready)
+def variants_recorded(sender, **kwargs):
+    invalidate_responses('playlists')
@@ -0,0 +1,147 @@
+"""
+This module provides content-addressed, deduplicated media storage.
+
+Uploads are hashed with SHA-256 while they stream to a temporary file and
+stored as ``<upload dir>/<first two hex digits>/<digest><ext>``. Saving
+content that already exists only adds a reference to it, so repeated
+uploads of the same cover or avatar share one file, and every name is
+immutable: its content can never change, so it can be cached forever.
+
+References are counted in MediaBlob, in the transaction of the row that
+holds the name, and the file only changes once that transaction commits:
+a save moves the upload into place, and delete() drops one reference and
+removes the file with the last one. purge() removes it regardless, for the
+orphan sweeper, which checks references against the rows themselves. A
+rolled back save leaves only its temporary file, which clear_incoming()
+removes.
+
+The storage is opt-in through the MEDIA_STORAGE setting.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from functools import partial
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+TEMP_DIR = '.incoming'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files by the SHA-256 of their content.
+    """
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from the content in _save, and identical
+        # content is meant to end up under the same name
+        return name
+
+    def content_name(self, name, digest):
+        directory, file_name = os.path.split(name)
+        extension = os.path.splitext(file_name)[1].lower()
+        return os.path.join(directory, digest[:2], f"{digest}{extension}").replace(os.sep, '/')
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        incoming = self.path(TEMP_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=incoming, delete=False) as temp:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                temp.close()
+                os.remove(temp.name)
+                raise
+
+        name = self.content_name(name, digest.hexdigest())
+        # The reference commits or rolls back with the caller's transaction,
+        # and the file is only put in place once it has committed
+        with transaction.atomic():
+            blob = MediaBlob.objects.filter(name=name)
+            if not blob.update(refcount=F('refcount') + 1):
+                try:
+                    with transaction.atomic():
+                        MediaBlob.objects.create(name=name, size=size)
+                except IntegrityError:
+                    # Created by a concurrent upload of the same content
+                    blob.update(refcount=F('refcount') + 1)
+        transaction.on_commit(partial(self._store, temp.name, name))
+        return name
+
+    def _store(self, temp_name, name):
+        """Move a committed upload into place, or reuse the stored copy"""
+        path = self.path(name)
+        try:
+            if os.path.exists(path):
+                os.remove(temp_name)
+                # Reused content counts as fresh for the orphan sweeper
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                file_move_safe(temp_name, path, allow_overwrite=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            self.delete(name)
+            raise
+
+    def _remove(self, name):
+        # Unless a save has referenced the content again since
+        from .models import MediaBlob
+
+        if not MediaBlob.objects.filter(name=name).exists():
+            super().delete(name)
+
+    def delete(self, name):
+        """
+        Drop one reference, removing the file with the last one once the
+        transaction commits
+        """
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            if MediaBlob.objects.filter(name=name, refcount__gt=1).update(
+                refcount=F('refcount') - 1
+            ):
+                return
+            MediaBlob.objects.filter(name=name).delete()
+            transaction.on_commit(partial(self._remove, name))
+
+    def purge(self, name):
+        """Remove a file and its reference count outright"""
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            MediaBlob.objects.filter(name=name).delete()
+            transaction.on_commit(partial(self._remove, name))
+
+    def clear_incoming(self, min_age, dry_run=False):
+        """
+        Remove the temporary files of uploads whose transaction never
+        committed, if older than min_age seconds. Returns their names.
+        """
+        cutoff = time.time() - min_age
+        names = []
+        try:
+            entries = os.scandir(self.path(TEMP_DIR))
+        except FileNotFoundError:
+            return names
+        with entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime <= cutoff:
+                    names.append(f"{TEMP_DIR}/{entry.name}")
+                    if not dry_run:
+                        os.remove(entry.path)
+        return names
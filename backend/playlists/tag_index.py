@@ -0,0 +1,164 @@
+"""
+This module holds a process-local prefix index of tag names for
+autocomplete. Names live in a sorted array searched with bisect and are
+ranked by how many playlists use them. Signal handlers keep the index up
+to date incrementally; it is rebuilt from the database on first use, when
+marked stale, and after TAG_INDEX_MAX_AGE seconds so changes made by
+other worker processes are eventually picked up.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import Tag
+
+
+class TagPrefixIndex:
+    """
+    Sorted-array prefix index over tag names with usage counts.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held while loading from the database, so only one thread does it
+        self._rebuild_lock = threading.Lock()
+        # Bumped by every change, so a rebuild can tell one raced its load
+        self._version = 0
+        self._names = []
+        self._tags = {}
+        self._built_at = None
+        self._stale = True
+        self._hits = 0
+        self._misses = 0
+        self._rebuilds = 0
+        self._updates = 0
+        self._last_rebuild_ms = None
+
+    def rebuild(self):
+        """
+        Reload every tag and its usage count from the database. The query
+        runs without holding the lock; the loaded data is swapped in under
+        it. If the index changed meanwhile it stays stale, since the load
+        may have missed the change or already counted it.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            version = self._version
+        rows = Tag.objects.annotate(usage=Count('playlists')).values_list('id', 'name', 'usage')
+        tags = {tag_id: [name.lower(), usage] for tag_id, name, usage in rows}
+        names = sorted((name, tag_id) for tag_id, (name, _) in tags.items())
+
+        with self._lock:
+            self._tags = tags
+            self._names = names
+            self._built_at = time.monotonic()
+            self._stale = self._version != version
+            self._rebuilds += 1
+            self._last_rebuild_ms = (time.perf_counter() - started) * 1000
+
+    def invalidate(self):
+        """Mark the index stale so the next lookup rebuilds it"""
+        with self._lock:
+            self._stale = True
+            self._version += 1
+
+    def _needs_rebuild(self):
+        with self._lock:
+            max_age = settings.TAG_INDEX_MAX_AGE
+            expired = self._built_at is not None and time.monotonic() - self._built_at > max_age
+            return self._stale or expired
+
+    def _ensure_fresh(self):
+        if not self._needs_rebuild():
+            return
+        with self._rebuild_lock:
+            # Another thread may have rebuilt it while this one waited
+            if self._needs_rebuild():
+                self.rebuild()
+
+    def _prefix_matches(self, prefix):
+        """Yield the (name, tag_id) entries whose name starts with ``prefix``"""
+        names = self._names
+        for index in range(bisect_left(names, (prefix,)), len(names)):
+            name, tag_id = names[index]
+            if not name.startswith(prefix):
+                return
+            yield name, tag_id
+
+    def lookup(self, prefix, limit=10):
+        """
+        Return up to ``limit`` tags whose name starts with ``prefix`` as
+        {'id', 'name'} dicts, most used first.
+        """
+        prefix = prefix.lower()
+        self._ensure_fresh()
+        with self._lock:
+            best = heapq.nsmallest(limit, (
+                (-self._tags[tag_id][1], name, tag_id)
+                for name, tag_id in self._prefix_matches(prefix)
+            ))
+            if best:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return [{'id': tag_id, 'name': name} for _, name, tag_id in best]
+
+    def add(self, tag_id, name, usage=0):
+        with self._lock:
+            self._version += 1
+            if self._stale:
+                return
+            self.remove(tag_id)
+            name = name.lower()
+            self._tags[tag_id] = [name, usage]
+            insort(self._names, (name, tag_id))
+            self._updates += 1
+
+    def remove(self, tag_id):
+        with self._lock:
+            self._version += 1
+            if self._stale or tag_id not in self._tags:
+                return
+            name, _ = self._tags.pop(tag_id)
+            del self._names[bisect_left(self._names, (name, tag_id))]
+            self._updates += 1
+
+    def rename(self, tag_id, name):
+        with self._lock:
+            usage = self._tags[tag_id][1] if tag_id in self._tags else 0
+            self.add(tag_id, name, usage)
+
+    def adjust_usage(self, tag_ids, delta):
+        """Change the usage count of the given tags by ``delta``"""
+        with self._lock:
+            self._version += 1
+            if self._stale:
+                return
+            for tag_id in tag_ids:
+                if tag_id not in self._tags:
+                    # Created without a post_save signal, e.g. bulk_create
+                    self.invalidate()
+                    return
+                self._tags[tag_id][1] = max(self._tags[tag_id][1] + delta, 0)
+            self._updates += 1
+
+    def stats(self):
+        """Return hit, rebuild and size metrics for monitoring"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._names),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else None,
+                'rebuilds': self._rebuilds,
+                'incremental_updates': self._updates,
+                'last_rebuild_ms': self._last_rebuild_ms,
+                'stale': self._stale,
+            }
+
+
+tag_index = TagPrefixIndex()
@@ -0,0 +1,84 @@
+from django.test import AsyncClient
+
+from kalanisVault.testing import AsyncEndpointTestCase, bearer, create_user
+from .. import search
+from ..models import Playlist, Tag, Video
+
+
+class PlaylistAsyncEndpointTests(AsyncEndpointTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(number) for number in range(3)]
+        tag = Tag.objects.create(name="music")
+        for number in range(12):
+            playlist = Playlist.objects.create(
+                title=f"Playlist {number}",
+                user=cls.users[number % 3],
+                is_public=number % 4 != 0,
+            )
+            playlist.tags.add(tag)
+            Video.objects.create(
+                playlist=playlist, tiktok_url=f"https://example.com/{number}", tiktok_id=str(number)
+            )
+            if number % 2:
+                playlist.likes.add(cls.users[0])
+        cls.playlist = Playlist.objects.filter(user=cls.users[0]).first()
+        cls.private = Playlist.objects.get(title="Playlist 0")
+
+    async def test_list_matches_sync(self):
+        response = await self.assertSameResponse(self.users[0], 'playlists/?ordering=title')
+        self.assertEqual(len(response.json()), 10)
+        await self.assertSameResponse(self.users[0], 'playlists/?search=music&fields=id,is_liked')
+
+    async def test_detail_matches_sync(self):
+        response = await self.assertSameResponse(self.users[0], f'playlists/{self.playlist.pk}/')
+        self.assertEqual(len(response.json()['videos']), 1)
+        # Private playlists of other users are not found
+        await self.assertSameResponse(self.users[1], f'playlists/{self.private.pk}/')
+
+    async def test_detail_answers_conditional_requests(self):
+        path = f'/api/v1/async/playlists/{self.playlist.pk}/'
+        headers = {'Authorization': bearer(self.users[0])}
+        response = await AsyncClient().get(path, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        headers['If-None-Match'] = response['ETag']
+        response = await AsyncClient().get(path, headers=headers)
+        self.assertEqual(response.status_code, 304)
+
+    async def test_explore_and_search_match_sync(self):
+        response = await self.assertSameResponse(self.users[1], 'playlists/explore/?page=1&limit=4')
+        generation = response['X-Explore-Generation']
+        await self.assertSameResponse(
+            self.users[1], f'playlists/explore/?page=2&limit=4&generation={generation}'
+        )
+        await self.assertSameResponse(self.users[1], 'playlists/explore/?page=1&limit=4&fields=id')
+        response = await self.assertSameResponse(self.users[0], 'playlists/search/?q=playlist')
+        self.assertTrue(response.json())
+        await self.assertSameResponse(self.users[0], 'playlists/search/')
+
+    async def test_first_search_checks_the_index_off_the_event_loop(self):
+        # Forget the FTS table, as a fresh worker would, so the backend is
+        # introspected during the async request itself
+        search.SQLiteFTSBackend.ready_databases.clear()
+        response = await AsyncClient().get(
+            '/api/v1/async/playlists/search/?q=playlist',
+            headers={'Authorization': bearer(self.users[0])},
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json())
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get('/api/v1/async/playlists/explore/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        response = await AsyncClient().get(
+            '/api/v1/async/playlists/', headers={'Authorization': 'Bearer invalid'}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_rejects_writes(self):
+        response = await AsyncClient().post(
+            '/api/v1/async/playlists/', headers={'Authorization': bearer(self.users[0])}
+        )
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, HEAD')
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from kalanisVault.testing import create_user
+from users.models import User
+from ..models import Playlist, Tag, Video
+
+
+@override_settings(PLAYLIST_VIEW_BUFFER={
+    **settings.PLAYLIST_VIEW_BUFFER, 'FLUSH_INTERVAL': 0, 'JOURNAL_DIR': None
+})
+class PlaylistConditionalGetTests(TestCase):
+    """
+    The validators of the playlist detail endpoint follow everything its
+    response shows: the playlist, its videos, tags and owner.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user(0)
+        cls.tag = Tag.objects.create(name="music")
+        cls.playlist = Playlist.objects.create(title="Mix", user=cls.owner)
+        cls.playlist.tags.add(cls.tag)
+        Video.objects.create(playlist=cls.playlist, tiktok_url="https://example.com/1", tiktok_id="1")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.path = f'/api/v1/playlists/{self.playlist.pk}/'
+
+    def get_aged(self):
+        """
+        Answer a GET after moving every stamp an hour back, so the next
+        change lands in a later second of Last-Modified
+        """
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Playlist.objects.update(updated_at=hour_ago)
+        Video.objects.update(added_at=hour_ago)
+        Tag.objects.update(updated_at=hour_ago)
+        User.objects.update(updated_at=hour_ago)
+        return self.get()
+
+    def get(self, **headers):
+        return self.client.get(self.path, headers=headers)
+
+    def assertChanged(self, response):
+        """Fail unless neither of response's validators still matches"""
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 200)
+        self.assertEqual(self.get(if_modified_since=response['Last-Modified']).status_code, 200)
+
+    def test_headers(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_unchanged_playlist_is_not_modified(self):
+        response = self.get()
+        for headers in ({'if_none_match': response['ETag']},
+                        {'if_modified_since': response['Last-Modified']}):
+            with self.subTest(headers=headers):
+                not_modified = self.get(**headers)
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified.content, b'')
+                self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_failed_precondition(self):
+        response = self.get()
+        self.assertEqual(self.get(if_match=response['ETag']).status_code, 200)
+        self.assertEqual(self.get(if_match='"stale"').status_code, 412)
+
+    def test_validators_are_per_user(self):
+        response = self.get()
+        self.client.force_authenticate(create_user(1))
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 200)
+
+    def test_edits_change_the_validators(self):
+        response = self.get_aged()
+        self.client.patch(self.path, {'title': "Renamed"}, format='json')
+        self.assertChanged(response)
+
+    def test_video_changes_change_the_validators(self):
+        response = self.get_aged()
+        video = Video.objects.get()
+        video.title = "Retitled"
+        video.save()
+        self.assertChanged(response)
+
+    def test_tag_changes_change_the_validators(self):
+        response = self.get_aged()
+        tag = Tag.objects.get(pk=self.tag.pk)
+        tag.name = "songs"
+        tag.save()
+        self.assertChanged(response)
+
+        response = self.get_aged()
+        self.playlist.tags.add(Tag.objects.create(name="new"))
+        self.assertChanged(response)
+
+        response = self.get_aged()
+        Tag.objects.filter(name="new").delete()
+        self.assertChanged(response)
+
+    def test_owner_changes_change_the_validators(self):
+        response = self.get_aged()
+        owner = User.objects.get(pk=self.owner.pk)
+        owner.username = "renamed"
+        owner.save()
+        self.assertChanged(response)
+
+        # last_login saves only that field and do not touch updated_at
+        response = self.get_aged()
+        owner.last_login = timezone.now()
+        owner.save(update_fields=['last_login'])
+        self.assertEqual(self.get(if_modified_since=response['Last-Modified']).status_code, 304)
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from kalanisVault.testing import create_user
+from .. import explore
+from ..models import Playlist, Video
+
+
+@override_settings(EXPLORE_CHUNK_SIZE=4, READ_REPLICAS={**settings.READ_REPLICAS, 'ALIASES': []})
+class ExploreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        for number in range(10):
+            playlist = Playlist.objects.create(title=f"Playlist {number}", user=cls.user)
+            Video.objects.create(
+                playlist=playlist, tiktok_url=f"https://example.com/{number}", tiktok_id=str(number)
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_feed(self, limit=3, generation=''):
+        ids = []
+        for page in range(1, 10):
+            response = self.client.get(
+                f'/api/v1/playlists/explore/?page={page}&limit={limit}&generation={generation}'
+            )
+            self.assertEqual(response.status_code, 200)
+            if not response.data:
+                break
+            ids.extend(item['id'] for item in response.data)
+        return ids
+
+    def test_pages_cover_the_feed_across_chunks(self):
+        ids = self.get_feed()
+        self.assertCountEqual(ids, Playlist.objects.values_list('id', flat=True))
+        # Served from the cached chunks the second time
+        with self.assertNumQueries(0):
+            self.assertEqual(explore.get_page_ids(self.user.id, 2, 3), ids[3:6])
+
+    def test_page_is_rebuilt_when_a_chunk_is_evicted(self):
+        ids = self.get_feed()
+        cache.delete(f"{explore.get_permutation_key(self.user.id)}:1")
+        self.assertEqual(explore.get_page_ids(self.user.id, 2, 3), ids[3:6])
+
+    def test_new_public_playlists_join_the_feed(self):
+        self.get_feed()
+        private = Playlist.objects.create(title="Private", user=self.user, is_public=False)
+        Video.objects.create(playlist=private, tiktok_url="https://example.com/p", tiktok_id="p")
+        fresh = Playlist.objects.create(title="Fresh", user=self.user)
+        self.assertNotIn(private.pk, self.get_feed())
+        Video.objects.create(playlist=fresh, tiktok_url="https://example.com/f", tiktok_id="f")
+        self.assertIn(fresh.pk, self.get_feed())
+
+        private = Playlist.objects.get(pk=private.pk)
+        private.is_public = True
+        private.save()
+        self.assertIn(private.pk, self.get_feed())
+
+    def test_pinned_generation_survives_invalidation_between_pages(self):
+        feed = self.get_feed()
+        first = self.client.get('/api/v1/playlists/explore/?page=1&limit=3')
+        generation = first['X-Explore-Generation']
+
+        # A playlist joins the feed after the first page was served
+        fresh = Playlist.objects.create(title="Fresh", user=self.user)
+        Video.objects.create(playlist=fresh, tiktok_url="https://example.com/f", tiktok_id="f")
+
+        second = self.client.get(f'/api/v1/playlists/explore/?page=2&limit=3&generation={generation}')
+        self.assertEqual(second['X-Explore-Generation'], generation)
+        self.assertEqual([item['id'] for item in second.data], feed[3:6])
+        self.assertEqual(self.get_feed(generation=generation), feed)
+
+        # A fresh scroll gets the new generation, which has the playlist
+        response = self.client.get('/api/v1/playlists/explore/?page=1&limit=3')
+        self.assertNotEqual(response['X-Explore-Generation'], generation)
+        self.assertIn(fresh.pk, self.get_feed())
+
+    def test_unknown_generation_falls_back_to_the_current_one(self):
+        current = self.client.get('/api/v1/playlists/explore/')['X-Explore-Generation']
+        for generation in ('1', 'abc'):
+            with self.subTest(generation=generation):
+                response = self.client.get(f'/api/v1/playlists/explore/?generation={generation}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['X-Explore-Generation'], current)
+
+    def test_page_parameters_are_validated(self):
+        response = self.client.get('/api/v1/playlists/explore/?page=abc')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/v1/playlists/explore/?limit=100000')
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(self.client.get('/api/v1/playlists/explore/?limit=-5').status_code, 200)
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from kalanisVault.testing import PlaylistDataMixin
+from ..models import Playlist
+from ..serializers import PlaylistSerializer, PlaylistSummarySerializer
+
+
+@override_settings(PLAYLIST_VIEW_BUFFER={
+    **settings.PLAYLIST_VIEW_BUFFER, 'FLUSH_INTERVAL': 0, 'JOURNAL_DIR': None
+})
+class SparseFieldsetTests(PlaylistDataMixin, TestCase):
+    """
+    Tests for ?fields= and ?expand= on list endpoints, which render
+    PlaylistSummarySerializer.
+    """
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_summary_by_default(self):
+        item = self.get('/api/v1/playlists/')[0]
+        self.assertEqual(set(item), set(PlaylistSummarySerializer.Meta.fields))
+        self.assertNotIn('videos', item)
+        self.assertEqual(
+            set(item['user']), {'id', 'username', 'profile_picture', 'profile_picture_variants'}
+        )
+        # The detail endpoint keeps the full representation
+        detail = self.get(f'/api/v1/playlists/{self.playlist.pk}/')
+        self.assertEqual(set(detail), set(PlaylistSerializer.Meta.fields))
+        self.assertEqual(len(detail['videos']), 5)
+
+    def test_fields_select_keys(self):
+        for path in ['/api/v1/playlists/', '/api/v1/playlists/popular/', '/api/v1/playlists/my_playlists/']:
+            with self.subTest(path=path):
+                items = self.get(f'{path}?fields=id,title,is_liked')
+                self.assertTrue(items)
+                for item in items:
+                    self.assertEqual(set(item), {'id', 'title', 'is_liked'})
+
+        # Cached lists leave is_liked out unless it is asked for
+        items = self.get('/api/v1/playlists/popular/?fields=id')
+        self.assertEqual({key for item in items for key in item}, {'id'})
+
+    def test_expand(self):
+        items = self.get('/api/v1/playlists/?expand=videos,user')
+        self.assertEqual(len(items[0]['videos']), 5)
+        self.assertIn('email', items[0]['user'])
+
+        # Expanded relations are kept under a sparse fieldset
+        items = self.get('/api/v1/playlists/?fields=id&expand=videos')
+        self.assertEqual(set(items[0]), {'id', 'videos'})
+
+    def test_unknown_names_are_rejected(self):
+        for path, name in [
+            ('/api/v1/playlists/?fields=id,bogus', 'fields'),
+            ('/api/v1/playlists/popular/?fields=bogus', 'fields'),
+            ('/api/v1/playlists/?expand=tags', 'expand'),
+        ]:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(name, response.json())
+
+    def test_summary_list_query_count_is_constant(self):
+        def count_queries(path):
+            with CaptureQueriesContext(connection) as queries:
+                self.get(path)
+            return len(queries)
+
+        paths = [
+            '/api/v1/playlists/', '/api/v1/playlists/?fields=id,title',
+            '/api/v1/playlists/?expand=videos,user',
+        ]
+        counts = [count_queries(path) for path in paths]
+        Playlist.objects.filter(pk__gt=self.playlist.pk + 5).delete()
+        self.assertEqual([count_queries(path) for path in paths], counts)
+        # A sparse fieldset skips the tag prefetch and the likes lookup
+        self.assertLess(counts[1], counts[0])
@@ -0,0 +1,151 @@
+import base64
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from kalanisVault import images
+from kalanisVault.testing import create_user
+from users.models import User
+from ..models import Playlist
+from ..serializers import PlaylistSerializer
+
+
+def image_file(mode='RGB', color='red'):
+    buffer = BytesIO()
+    Image.new(mode, (1000, 600), color).save(buffer, format='PNG')
+    return ContentFile(buffer.getvalue(), name='cover.png')
+
+
+class ImagePipelineTests(TestCase):
+    """
+    Tests for the variants built from uploaded images after commit.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storages = {**settings.STORAGES, 'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        }}
+        overrides = override_settings(
+            MEDIA_ROOT=directory.name,
+            STORAGES=storages,
+            MEDIA_CLEANUP={**settings.MEDIA_CLEANUP, 'ASYNC': False},
+            IMAGE_PIPELINE={**settings.IMAGE_PIPELINE, 'ASYNC': False},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = create_user(0)
+
+    def create_playlist(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            playlist = Playlist.objects.create(title="Covered", user=self.user, **kwargs)
+        playlist.refresh_from_db()
+        return playlist
+
+    def test_sizes_and_formats(self):
+        playlist = self.create_playlist(cover_image=image_file())
+        variants = playlist.cover_image_variants
+        self.assertEqual(variants['source'], playlist.cover_image.name)
+
+        config = settings.IMAGE_PIPELINE['VARIANTS']['playlists.Playlist.cover_image']
+        self.assertEqual(set(variants['sizes']), set(config['sizes']))
+        for size_name, size in config['sizes'].items():
+            entry = variants['sizes'][size_name]
+            # The longest edge is scaled to the size, keeping the aspect ratio
+            self.assertEqual((entry['width'], entry['height']), (size, size * 3 // 5))
+            for image_format in settings.IMAGE_PIPELINE['FORMATS']:
+                name = entry[image_format]
+                self.assertEqual(name, images.variant_name(playlist.cover_image.name, size_name, image_format))
+                self.assertEqual(images.source_name(name), playlist.cover_image.name)
+                with default_storage.open(name) as file, Image.open(file) as image:
+                    self.assertEqual(image.format, image_format.upper())
+                    self.assertEqual(image.size, (entry['width'], entry['height']))
+
+    def test_profile_pictures_are_cropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile_picture = image_file()
+            self.user.save()
+        self.user.refresh_from_db()
+        sizes = self.user.profile_picture_variants['sizes']
+        self.assertEqual((sizes['sm']['width'], sizes['sm']['height']), (64, 64))
+        self.assertEqual((sizes['lg']['width'], sizes['lg']['height']), (256, 256))
+
+    def test_transparent_images_keep_alpha_in_webp(self):
+        playlist = self.create_playlist(cover_image=image_file(mode='RGBA', color=(255, 0, 0, 128)))
+        entry = playlist.cover_image_variants['sizes']['sm']
+        with default_storage.open(entry['webp']) as file, Image.open(file) as image:
+            self.assertIn('A', image.getbands())
+        with default_storage.open(entry['jpeg']) as file, Image.open(file) as image:
+            self.assertEqual(image.mode, 'RGB')
+
+    def test_lqip(self):
+        playlist = self.create_playlist(cover_image=image_file())
+        prefix, _, encoded = playlist.cover_image_variants['lqip'].partition(',')
+        self.assertEqual(prefix, 'data:image/webp;base64')
+        with Image.open(BytesIO(base64.b64decode(encoded))) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertLessEqual(max(image.size), settings.IMAGE_PIPELINE['LQIP_SIZE'])
+
+    def test_serialized_with_urls(self):
+        playlist = self.create_playlist(cover_image=image_file())
+        data = PlaylistSerializer(playlist).data['cover_image_variants']
+        self.assertTrue(data['lqip'].startswith('data:image/webp'))
+        self.assertEqual(
+            data['sizes']['sm']['webp'],
+            default_storage.url(playlist.cover_image_variants['sizes']['sm']['webp'])
+        )
+
+    def test_default_image_is_skipped(self):
+        with mock.patch.object(images, 'build_variants') as build_variants:
+            playlist = self.create_playlist()
+        build_variants.assert_not_called()
+        self.assertEqual(playlist.cover_image.name, Playlist._meta.get_field('cover_image').default)
+        self.assertEqual(playlist.cover_image_variants, {})
+        self.assertIsNone(PlaylistSerializer(playlist).data['cover_image_variants'])
+
+    def test_saves_of_other_fields_are_skipped(self):
+        # An upload without variants, e.g. from before the pipeline existed
+        User.objects.filter(pk=self.user.pk).update(profile_picture='profile_pictures/old.png')
+        user = User.objects.get(pk=self.user.pk)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.save(update_fields=['profile_picture', 'profile_picture_variants'])
+        self.assertEqual(len(callbacks), 1)
+
+    def test_failures_are_recorded_once(self):
+        with mock.patch.object(images, 'build_variants', side_effect=OSError("unreadable")):
+            with self.assertLogs('kalanisVault', 'ERROR'):
+                playlist = self.create_playlist(cover_image=image_file())
+        self.assertEqual(playlist.cover_image_variants, {
+            'source': playlist.cover_image.name, 'error': "unreadable",
+        })
+        self.assertIsNone(PlaylistSerializer(playlist).data['cover_image_variants'])
+
+        # Later full saves of the row do not schedule the upload again
+        with mock.patch.object(images, 'build_variants') as build_variants:
+            with self.captureOnCommitCallbacks(execute=True):
+                playlist.title = "Renamed"
+                playlist.save()
+        build_variants.assert_not_called()
+
+        # Until they are retried explicitly
+        call_command('build_image_variants', stdout=StringIO(), stderr=StringIO())
+        playlist.refresh_from_db()
+        self.assertIn('error', playlist.cover_image_variants)
+        call_command('build_image_variants', '--retry-failed', stdout=StringIO())
+        playlist.refresh_from_db()
+        self.assertNotIn('error', playlist.cover_image_variants)
+        self.assertEqual(set(playlist.cover_image_variants['sizes']), {'sm', 'md', 'lg'})
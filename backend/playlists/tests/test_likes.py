@@ -0,0 +1,112 @@
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from kalanisVault.testing import create_user
+from .. import likes, videos
+from ..models import Playlist, Tag
+from ..serializers import PlaylistSerializer
+
+
+class LikeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        owner = create_user(1)
+        cls.playlists = [
+            Playlist.objects.create(title=f"Playlist {number}", user=owner) for number in range(3)
+        ]
+        cls.ids = {playlist.pk for playlist in cls.playlists}
+
+    def assertCounts(self, like_counts, liked_playlist_count):
+        self.assertEqual(
+            list(Playlist.objects.order_by('pk').values_list('like_count', flat=True)), like_counts
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.liked_playlist_count, liked_playlist_count)
+
+    def test_like_and_unlike_maintain_counters(self):
+        playlist = self.playlists[0]
+        self.assertTrue(likes.like(playlist, self.user))
+        self.assertFalse(likes.like(playlist, self.user))
+        self.assertCounts([1, 0, 0], 1)
+        self.assertTrue(likes.unlike(playlist, self.user))
+        self.assertFalse(likes.unlike(playlist, self.user))
+        self.assertCounts([0, 0, 0], 0)
+
+    def test_set_liked_is_idempotent(self):
+        likes.like(self.playlists[0], self.user)
+        self.assertEqual(likes.set_liked(self.ids, self.user, True), self.ids - {self.playlists[0].pk})
+        self.assertEqual(likes.set_liked(self.ids, self.user, True), set())
+        self.assertCounts([1, 1, 1], 3)
+        self.assertEqual(likes.set_liked(self.ids, self.user, False), self.ids)
+        self.assertEqual(likes.set_liked(self.ids, self.user, False), set())
+        self.assertCounts([0, 0, 0], 0)
+
+    def test_bulk_writes_report_only_their_own_rows(self):
+        # Rows changed by another request after set_liked read the likes
+        first, second = self.playlists[0].pk, self.playlists[1].pk
+        likes.Like.objects.create(playlist_id=first, user_id=self.user.pk)
+        self.assertEqual(likes._insert_likes({first, second}, self.user), {second})
+        likes.Like.objects.filter(playlist_id=first).delete()
+        self.assertEqual(likes._delete_likes({first, second}, self.user), {second})
+        self.assertFalse(likes.Like.objects.exists())
+
+
+class PlaylistSerializerTests(TestCase):
+    """
+    PlaylistSerializer renders counts from the counter columns and looks
+    up is_liked for a whole list with one query.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user(0)
+        owner = create_user(1)
+        tag = Tag.objects.create(name="music")
+        for number in range(6):
+            playlist = Playlist.objects.create(title=f"Playlist {number}", user=owner)
+            playlist.tags.add(tag)
+            videos.add_videos(playlist, [
+                {'tiktok_url': f"https://example.com/{number}/{position}",
+                 'tiktok_id': f"{number}{position}"}
+                for position in range(number)
+            ])
+            if number % 2:
+                likes.like(playlist, cls.viewer)
+            if number % 3 == 0:
+                likes.like(playlist, owner)
+
+    def serialize(self, playlists, user, **kwargs):
+        request = RequestFactory().get('/')
+        request.user = user
+        with CaptureQueriesContext(connection) as queries:
+            data = PlaylistSerializer(playlists, context={'request': request}, **kwargs).data
+        return data, queries
+
+    def test_counts_and_liked_flags(self):
+        data, _ = self.serialize(Playlist.objects.with_details().order_by('pk'), self.viewer, many=True)
+        self.assertEqual([item['video_count'] for item in data], [0, 1, 2, 3, 4, 5])
+        self.assertEqual([len(item['videos']) for item in data], [0, 1, 2, 3, 4, 5])
+        self.assertEqual([item['like_count'] for item in data], [1, 1, 0, 2, 0, 1])
+        self.assertEqual([item['is_liked'] for item in data], [False, True, False, True, False, True])
+
+    def test_list_query_count_is_constant(self):
+        counts = []
+        for limit in (2, 6):
+            playlists = Playlist.objects.with_details().order_by('pk')[:limit]
+            data, queries = self.serialize(playlists, self.viewer, many=True)
+            self.assertEqual(len(data), limit)
+            liked_queries = [
+                query for query in queries if 'playlists_playlist_likes' in query['sql']
+            ]
+            self.assertEqual(len(liked_queries), 1)
+            counts.append(len(queries))
+        # Playlists with owners, videos, tags and the liked set
+        self.assertEqual(counts, [4, 4])
+
+    def test_single_playlist(self):
+        playlist = Playlist.objects.with_details().order_by('pk')[1]
+        data, _ = self.serialize(playlist, self.viewer)
+        self.assertTrue(data['is_liked'])
+        data, _ = self.serialize(playlist, create_user(2))
+        self.assertFalse(data['is_liked'])
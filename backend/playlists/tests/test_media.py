@@ -0,0 +1,161 @@
+import os
+import tempfile
+import time
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from kalanisVault import images
+from kalanisVault.testing import create_user
+from ..media import media_cleanup, sweep_orphans
+from ..models import Playlist, Video
+
+
+def png(name='cover.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (200, 120), 'red').save(buffer, format='PNG')
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+class MediaTestCase(TestCase):
+    """Uploads go to a temporary MEDIA_ROOT and are cleaned up inline"""
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storages = {**settings.STORAGES, 'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        }}
+        overrides = override_settings(
+            MEDIA_ROOT=directory.name,
+            STORAGES=storages,
+            MEDIA_CLEANUP={**settings.MEDIA_CLEANUP, 'ASYNC': False},
+            IMAGE_PIPELINE={**settings.IMAGE_PIPELINE, 'ASYNC': False},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = create_user(0)
+
+    def create_playlist(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            playlist = Playlist.objects.create(title="Covered", user=self.user, cover_image=png())
+        playlist.refresh_from_db()
+        return playlist
+
+    def stored_names(self, playlist):
+        names = [playlist.cover_image.name, *images.variant_names(playlist.cover_image_variants)]
+        self.assertEqual(len(names), 7)
+        return names
+
+    def assertStored(self, names, stored=True):
+        for name in names:
+            self.assertEqual(default_storage.exists(name), stored, name)
+
+
+class MediaCleanupTests(MediaTestCase):
+    def test_files_are_deleted_after_commit(self):
+        playlist = self.create_playlist()
+        names = self.stored_names(playlist)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            playlist.delete()
+        self.assertStored(names)
+        for callback in callbacks:
+            callback()
+        self.assertStored(names, stored=False)
+
+    def test_rolled_back_delete_keeps_files(self):
+        playlist = self.create_playlist()
+        names = self.stored_names(playlist)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Playlist.objects.filter(pk=playlist.pk).delete()
+                raise RuntimeError
+        self.assertTrue(Playlist.objects.filter(pk=playlist.pk).exists())
+        self.assertStored(names)
+
+    def test_cascades_delete_files(self):
+        playlist = self.create_playlist()
+        with self.captureOnCommitCallbacks(execute=True):
+            video = Video.objects.create(
+                playlist=playlist, tiktok_url="https://example.com/1", tiktok_id="1",
+                custom_thumbnail=png('thumb.png'),
+            )
+        video.refresh_from_db()
+        names = [
+            *self.stored_names(playlist), video.custom_thumbnail.name,
+            *images.variant_names(video.custom_thumbnail_variants),
+        ]
+        self.assertStored(names)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertStored(names, stored=False)
+
+    def test_queued_deletes_are_drained(self):
+        playlist = self.create_playlist()
+        names = self.stored_names(playlist)
+        media_cleanup._queue.queue.extend(names)
+        media_cleanup.drain()
+        self.assertStored(names, stored=False)
+        self.assertTrue(media_cleanup._queue.empty())
+
+
+class SweepOrphansTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.playlist = self.create_playlist()
+        self.referenced = self.stored_names(self.playlist)
+        orphan = Playlist.objects.create(title="Orphan", user=self.user, cover_image=png())
+        # Forget the row without its delete signals, as a crash or raw SQL would
+        Playlist.objects.filter(pk=orphan.pk)._raw_delete(orphan._state.db)
+        self.orphan = orphan.cover_image.name
+        self.orphan_variant = images.variant_name(self.orphan, 'sm', 'webp')
+        default_storage.save(self.orphan_variant, ContentFile(b'variant'))
+        self.age(*self.referenced, self.orphan, self.orphan_variant)
+
+    def age(self, *names):
+        hour_ago = time.time() - 2 * 3600
+        for name in names:
+            os.utime(default_storage.path(name), (hour_ago, hour_ago))
+
+    def sweep(self, **kwargs):
+        return sorted(name for _, names in sweep_orphans(**kwargs) for name in names)
+
+    def test_unreferenced_files_are_removed(self):
+        self.assertEqual(self.sweep(), sorted([self.orphan, self.orphan_variant]))
+        self.assertStored([self.orphan, self.orphan_variant], stored=False)
+        # Variants count as referenced while their original is
+        self.assertStored(self.referenced)
+
+    def test_recent_files_are_kept(self):
+        recent = default_storage.save('playlist_covers/recent.png', png())
+        self.assertNotIn(recent, self.sweep())
+        self.assertStored([recent])
+        self.assertIn(recent, self.sweep(min_age=0))
+
+    def test_small_batches(self):
+        self.assertEqual(self.sweep(batch_size=1), sorted([self.orphan, self.orphan_variant]))
+        self.assertStored(self.referenced)
+
+    def test_dry_run_keeps_files(self):
+        self.assertEqual(self.sweep(dry_run=True), sorted([self.orphan, self.orphan_variant]))
+        self.assertStored([self.orphan, self.orphan_variant])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('sweep_media', '--dry-run', stdout=out)
+        self.assertIn(self.orphan, out.getvalue())
+        self.assertIn("Found 2 orphaned media files.", out.getvalue())
+
+        out = StringIO()
+        call_command('sweep_media', stdout=out)
+        self.assertIn("playlist_covers/: 2", out.getvalue())
+        self.assertIn("Removed 2 orphaned media files.", out.getvalue())
+        self.assertStored([self.orphan], stored=False)
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.test import override_settings
+
+from kalanisVault.testing import PlaylistDataMixin, QueryPlanTestCase
+from ..models import Playlist
+
+
+# The view buffer writes synchronously so no flush thread runs during tests
+@override_settings(PLAYLIST_VIEW_BUFFER={
+    **settings.PLAYLIST_VIEW_BUFFER, 'FLUSH_INTERVAL': 0, 'JOURNAL_DIR': None
+})
+class PlaylistQueryPlanTests(PlaylistDataMixin, QueryPlanTestCase):
+    """
+    Regression tests for the indexes behind the hot playlist endpoints.
+    """
+    def test_popular_reads_playlists_in_index_order(self):
+        for plan in self.get_plans(
+            self.client, '/api/v1/playlists/popular/', 'playlists_playlist',
+            contains='ORDER BY "playlists_playlist"."view_count" DESC'
+        ):
+            self.assertUsesIndex(plan, 'playlists_playlist', ordered=True)
+
+    def test_recent_playlists_reads_views_in_index_order(self):
+        for plan in self.get_plans(
+            self.client, '/api/v1/playlists/recent_playlists/', 'playlists_playlistview'
+        ):
+            self.assertUsesIndex(plan, 'playlists_playlistview', ordered=True)
+
+    def test_retrieve_reads_videos_in_index_order(self):
+        for plan in self.get_plans(
+            self.client, f'/api/v1/playlists/{self.playlist.pk}/', 'playlists_video'
+        ):
+            self.assertUsesIndex(plan, 'playlists_video', ordered=True)
+
+    def test_my_playlists_uses_owner_index(self):
+        for plan in self.get_plans(self.client, '/api/v1/playlists/my_playlists/', 'playlists_playlist'):
+            self.assertUsesIndex(plan, 'playlists_playlist')
+
+    def test_public_playlists_in_default_order(self):
+        queryset = Playlist.objects.filter(is_public=True).values('id')[:20]
+        self.assertUsesIndex(
+            self.query_plan(str(queryset.query)), 'playlists_playlist', ordered=True
+        )
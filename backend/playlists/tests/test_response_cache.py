@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase
+
+from kalanisVault.testing import create_user
+from .. import likes
+from ..models import Playlist, Tag, Video
+from ..response_cache import response_cache
+
+
+class ResponseCacheInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        cls.playlist = Playlist.objects.create(title="Cached", user=create_user(1))
+
+    def setUp(self):
+        cache.clear()
+
+    def assertInvalidates(self, expected, change):
+        generation = response_cache.generation('playlists')
+        change()
+        changed = response_cache.generation('playlists') != generation
+        self.assertEqual(changed, expected)
+
+    def test_content_changes_invalidate(self):
+        self.playlist.title = "Renamed"
+        self.assertInvalidates(True, self.playlist.save)
+        self.assertInvalidates(True, lambda: Video.objects.create(
+            playlist=self.playlist, tiktok_url="https://example.com/1", tiktok_id="1"
+        ))
+        tag = Tag.objects.create(name="music")
+        self.assertInvalidates(True, lambda: self.playlist.tags.add(tag))
+
+    def test_counter_changes_do_not_invalidate(self):
+        self.assertInvalidates(False, lambda: likes.like(self.playlist, self.user))
+        self.assertInvalidates(False, lambda: likes.set_liked([self.playlist.pk], self.user, False))
+        self.playlist.share_count = F('share_count') + 1
+        self.assertInvalidates(False, lambda: self.playlist.save(update_fields=['share_count']))
@@ -0,0 +1,42 @@
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from kalanisVault.testing import create_user
+from users.models import User
+from .. import search
+from ..models import Playlist
+
+
+@unittest.skipUnless(
+    connection.vendor == 'sqlite' and search.fts5_available(), "Needs SQLite with FTS5"
+)
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        cls.playlist = Playlist.objects.create(title="Road trip", user=cls.user)
+
+    def search(self, query):
+        return search.get_backend().search(query, self.user, 0, 10)
+
+    def test_username_change_reindexes_playlists(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.username = "renamed"
+        user.save()
+        self.assertEqual(self.search("renamed"), [self.playlist.pk])
+
+    def test_save_without_rename_skips_reindex(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Changed"
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertFalse(any(search.FTS_TABLE in query['sql'] for query in queries))
+
+    def test_missing_table_is_created(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {search.FTS_TABLE}")
+        search.SQLiteFTSBackend.ready_databases.clear()
+        self.assertEqual(self.search("road"), [self.playlist.pk])
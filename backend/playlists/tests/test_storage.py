@@ -0,0 +1,122 @@
+import os
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from kalanisVault import images
+from kalanisVault.testing import create_user
+from ..models import MediaBlob, Playlist
+from ..storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = ContentAddressedStorage(location=directory.name)
+
+    def save(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.storage.save(name, ContentFile(content))
+
+    def delete(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+
+    def test_identical_content_shares_one_file(self):
+        first = self.save('covers/a.PNG', b'cover')
+        second = self.save('covers/b.png', b'cover')
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('covers/') and first.endswith('.png'))
+        self.assertEqual(MediaBlob.objects.get(name=first).refcount, 2)
+        self.assertEqual(os.listdir(self.storage.path('.incoming')), [])
+
+        self.delete(first)
+        self.assertTrue(self.storage.exists(first))
+        self.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_failed_file_write_drops_the_reference(self):
+        with mock.patch('playlists.storage.file_move_safe', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.save('covers/a.png', b'cover')
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertEqual(os.listdir(self.storage.path('.incoming')), [])
+
+    def test_rolled_back_save_stores_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                name = self.storage.save('covers/a.png', ContentFile(b'cover'))
+                raise RuntimeError
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(MediaBlob.objects.exists())
+
+        # Only the temporary file is left, for the sweep to clear
+        self.assertEqual(self.storage.clear_incoming(3600), [])
+        self.assertEqual(len(self.storage.clear_incoming(0)), 1)
+        self.assertEqual(os.listdir(self.storage.path('.incoming')), [])
+
+    def test_rolled_back_delete_keeps_the_file(self):
+        name = self.save('covers/a.png', b'cover')
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.storage.delete(name)
+                raise RuntimeError
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+
+def png(color):
+    buffer = BytesIO()
+    Image.new('RGB', (1000, 600), color).save(buffer, format='PNG')
+    return ContentFile(buffer.getvalue(), name='cover.png')
+
+
+class ReplacedUploadTests(TestCase):
+    """
+    Replacing an upload releases the previous file and its variants.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storages = {**settings.STORAGES, 'default': {
+            'BACKEND': 'playlists.storage.ContentAddressedStorage',
+        }}
+        overrides = override_settings(
+            MEDIA_ROOT=directory.name,
+            STORAGES=storages,
+            MEDIA_CLEANUP={**settings.MEDIA_CLEANUP, 'ASYNC': False},
+            IMAGE_PIPELINE={**settings.IMAGE_PIPELINE, 'ASYNC': False},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = create_user(0)
+
+    def test_replaced_cover_and_variants_are_released(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            playlist = Playlist.objects.create(title="Covered", user=self.user, cover_image=png('red'))
+        playlist.refresh_from_db()
+        first = {playlist.cover_image.name, *images.variant_names(playlist.cover_image_variants)}
+        self.assertEqual(len(first), 7)
+        self.assertEqual(set(MediaBlob.objects.values_list('name', flat=True)), first)
+
+        playlist = Playlist.objects.get(pk=playlist.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            playlist.cover_image = png('blue')
+            playlist.save()
+        names = set(MediaBlob.objects.values_list('name', flat=True))
+        self.assertEqual(len(names), 7)
+        self.assertFalse(names & first)
+
+        # Saving other fields, or the same row again, releases nothing
+        with self.captureOnCommitCallbacks(execute=True):
+            playlist.title = "Renamed"
+            playlist.save()
+        self.assertEqual(set(MediaBlob.objects.values_list('name', flat=True)), names)
@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from kalanisVault.testing import create_user
+from ..models import Playlist, Tag
+from ..tag_index import TagPrefixIndex
+
+
+class TagIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = create_user(0)
+        cls.tags = {name: Tag.objects.create(name=name) for name in ("rock", "Rockabilly", "rap", "roll")}
+        for number in range(3):
+            playlist = Playlist.objects.create(title=f"Playlist {number}", user=user)
+            playlist.tags.add(cls.tags["Rockabilly"], *([cls.tags["roll"]] if number else []))
+
+    def test_lookup_ranks_prefix_matches_by_usage(self):
+        index = TagPrefixIndex()
+        names = [tag['name'] for tag in index.lookup("RO")]
+        self.assertEqual(names, ["rockabilly", "roll", "rock"])
+        self.assertEqual([tag['name'] for tag in index.lookup("ro", limit=1)], ["rockabilly"])
+        self.assertEqual(index.lookup("x"), [])
+
+    def test_change_during_rebuild_keeps_index_stale(self):
+        index = TagPrefixIndex()
+        original = Tag.objects.annotate
+
+        def annotate(*args, **kwargs):
+            # A tag committed by another thread while the rebuild loads
+            index.add(self.tags["rap"].pk, "rap", 0)
+            return original(*args, **kwargs)
+
+        with mock.patch.object(Tag.objects, 'annotate', annotate):
+            index.rebuild()
+        self.assertTrue(index.stats()['stale'])
+        index.lookup("r")
+        self.assertFalse(index.stats()['stale'])
@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from kalanisVault.testing import create_user
+from ..models import Playlist, Tag
+from ..serializers import PlaylistCreateSerializer
+
+
+@override_settings(PLAYLIST_VIEW_BUFFER={
+    **settings.PLAYLIST_VIEW_BUFFER, 'FLUSH_INTERVAL': 0, 'JOURNAL_DIR': None
+})
+class PlaylistTagWriteTests(TestCase):
+    """
+    Tests for how PlaylistCreateSerializer resolves and applies tag names.
+    """
+    def setUp(self):
+        self.user = create_user(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.changes = []
+        m2m_changed.connect(self.record_change, sender=Playlist.tags.through)
+        self.addCleanup(m2m_changed.disconnect, self.record_change, sender=Playlist.tags.through)
+
+    def record_change(self, action, pk_set, **kwargs):
+        if action.startswith('post_'):
+            self.changes.append((action, {Tag.objects.get(pk=pk).name for pk in pk_set or ()}))
+
+    def tag_names(self, playlist_id):
+        return set(Playlist.objects.get(pk=playlist_id).tags.values_list('name', flat=True))
+
+    def test_names_are_normalized(self):
+        response = self.client.post('/api/v1/playlists/', {
+            'title': "Mix", 'tags': ["  Rock ", "rock", "JAZZ"],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.tag_names(response.json()['id']), {"rock", "jazz"})
+        self.assertEqual(set(Tag.objects.values_list('name', flat=True)), {"rock", "jazz"})
+        self.assertEqual(self.changes, [('post_add', {"rock", "jazz"})])
+        self.assertEqual(
+            PlaylistCreateSerializer._normalize_tag_names([" Pop", "", "  ", "POP", "indie "]),
+            ["pop", "indie"]
+        )
+
+    def test_update_applies_only_the_difference(self):
+        playlist = Playlist.objects.create(title="Mix", user=self.user)
+        playlist.tags.add(Tag.objects.create(name="rock"), Tag.objects.create(name="jazz"))
+        path = f'/api/v1/playlists/{playlist.pk}/'
+
+        self.changes.clear()
+        response = self.client.patch(path, {'tags': ["Jazz", "pop"]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.tag_names(playlist.pk), {"jazz", "pop"})
+        self.assertEqual(self.changes, [('post_remove', {"rock"}), ('post_add', {"pop"})])
+
+        # An unchanged tag set, or an update without tags, writes no tags
+        self.changes.clear()
+        self.client.patch(path, {'tags': ["pop", "jazz"]}, format='json')
+        self.client.patch(path, {'title': "Renamed"}, format='json')
+        self.assertEqual(self.changes, [])
+        self.assertEqual(self.tag_names(playlist.pk), {"jazz", "pop"})
+
+        self.client.patch(path, {'tags': []}, format='json')
+        self.assertEqual(self.tag_names(playlist.pk), set())
+
+    def test_concurrently_created_tags_are_read_back(self):
+        existing = Tag.objects.create(name="jazz")
+        original = Tag.objects.bulk_create
+        concurrent = {}
+
+        def bulk_create(tags, **kwargs):
+            # Another request creates "rock" after this one looked it up
+            concurrent['rock'] = Tag.objects.create(name="rock").pk
+            return original(tags, **kwargs)
+
+        with mock.patch.object(Tag.objects, 'bulk_create', bulk_create):
+            tag_ids = PlaylistCreateSerializer._resolve_tags(["jazz", "rock", "pop"])
+        self.assertEqual(tag_ids['jazz'], existing.pk)
+        self.assertEqual(tag_ids['rock'], concurrent['rock'])
+        self.assertEqual(tag_ids['pop'], Tag.objects.get(name="pop").pk)
+        self.assertEqual(Tag.objects.count(), 3)
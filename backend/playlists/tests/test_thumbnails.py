@@ -0,0 +1,107 @@
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from kalanisVault.testing import StubServer
+from ..thumbnails import ThumbnailCache, ThumbnailUnavailable
+
+
+class ThumbnailCacheTests(SimpleTestCase):
+    """
+    The thumbnail cache against a local server standing in for the CDN.
+    """
+    def setUp(self):
+        self.server = StubServer({
+            '/image.png': lambda request: (200, {'Content-Type': 'image/png'}, b'png'),
+            '/moved.png': lambda request: (302, {'Location': self.server.url('/image.png')}, b''),
+        })
+        self.addCleanup(self.server.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(THUMBNAIL_PROXY={
+            **settings.THUMBNAIL_PROXY,
+            'CACHE_DIR': directory.name,
+            'ALLOWED_HOSTS': ['127.0.0.1'],
+        })
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.cache = ThumbnailCache()
+
+    def test_second_get_is_a_hit(self):
+        path, content_type = self.cache.get(self.server.url('/image.png'))
+        self.assertEqual(content_type, 'image/png')
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(), b'png')
+
+        self.assertEqual(self.cache.get(self.server.url('/image.png')), (path, content_type))
+        self.assertEqual(len(self.server.requests), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['files']), (1, 1, 1))
+
+    def test_concurrent_misses_share_one_fetch(self):
+        release = threading.Event()
+
+        def slow(request):
+            release.wait(5)
+            return 200, {'Content-Type': 'image/png'}, b'png'
+
+        self.server.routes['/slow.png'] = slow
+        url = self.server.url('/slow.png')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get(url))) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while self.cache.stats()['coalesced'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.server.requests, ['/slow.png'])
+        self.assertEqual(self.cache.stats()['coalesced'], 2)
+
+    def test_hosts_outside_the_allowlist_are_not_fetched(self):
+        for url in [
+            self.server.url('/image.png').replace('127.0.0.1', 'localhost'),
+            'file:///etc/passwd',
+        ]:
+            with self.subTest(url=url), self.assertRaisesMessage(ThumbnailUnavailable, 'not allowed'):
+                self.cache.get(url)
+        self.assertEqual(self.server.requests, [])
+
+    def test_redirects_are_not_followed(self):
+        with self.assertRaisesMessage(ThumbnailUnavailable, 'answered 302'):
+            self.cache.get(self.server.url('/moved.png'))
+        self.assertEqual(self.server.requests, ['/moved.png'])
+
+    def test_failures_are_not_retried_until_they_expire(self):
+        url = self.server.url('/missing.png')
+        for _ in range(2):
+            with self.assertRaises(ThumbnailUnavailable):
+                self.cache.get(url)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.cache.stats()['failures_cached'], 1)
+
+        later = time.monotonic() + settings.THUMBNAIL_PROXY['FAILURE_TTL'] + 1
+        with mock.patch('playlists.thumbnails.time.monotonic', return_value=later):
+            with self.assertRaises(ThumbnailUnavailable):
+                self.cache.get(url)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_remembered_failures_are_bounded(self):
+        with override_settings(THUMBNAIL_PROXY={**settings.THUMBNAIL_PROXY, 'MAX_FAILURES': 2}):
+            for number in range(5):
+                with self.assertRaises(ThumbnailUnavailable):
+                    self.cache.get(self.server.url(f'/missing/{number}.png'))
+            self.assertEqual(len(self.cache._failures), 2)
+            # The most recent failures are the ones kept
+            with self.assertRaises(ThumbnailUnavailable):
+                self.cache.get(self.server.url('/missing/4.png'))
+            self.assertEqual(len(self.server.requests), 5)
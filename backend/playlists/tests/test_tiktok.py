@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+from io import StringIO
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from kalanisVault.testing import StubServer, create_user
+from .. import http, tiktok
+from ..models import Playlist, Video
+
+VIDEO_URL = "https://www.tiktok.com/@someone/video/{}"
+
+
+class TikTokTestCase(TestCase):
+    """
+    Base class running the resolver against a local oEmbed upstream.
+    ``upstream`` maps a TikTok URL to the (status, JSON body) it answers.
+    """
+    def setUp(self):
+        cache.clear()
+        self.upstream = {}
+        self.server = StubServer({'/oembed': self.oembed})
+        self.addCleanup(self.server.stop)
+        overrides = override_settings(
+            TIKTOK={**settings.TIKTOK, 'OEMBED_URL': self.server.url('/oembed'), 'SAVE_TIMEOUT': 1},
+            HTTP_CLIENT={**settings.HTTP_CLIENT, 'RETRIES': 2, 'BACKOFF': 0},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # A session for this server, pooled from scratch
+        http.reset_session()
+        self.addCleanup(http.reset_session)
+
+    def oembed(self, request):
+        url = parse_qs(urlsplit(request.path).query)['url'][0]
+        status, body = self.upstream.get(url, (404, {}))
+        if callable(body):
+            body = body()
+        return status, {'Content-Type': 'application/json'}, json.dumps(body).encode()
+
+    def answer(self, number, **data):
+        url = VIDEO_URL.format(number)
+        self.upstream[url] = (200, {
+            'title': f"Video {number}",
+            'thumbnail_url': f"https://p16.tiktokcdn.com/{number}.jpg",
+            'author_name': "someone",
+            **data,
+        })
+        return url
+
+
+class ResolverTests(TikTokTestCase):
+    def test_results_are_cached(self):
+        url = self.answer(1)
+        metadata = tiktok.resolve(url)
+        self.assertEqual(metadata['tiktok_id'], '1')
+        self.assertEqual(metadata['title'], "Video 1")
+        self.assertEqual(tiktok.resolve(url), metadata)
+        self.assertEqual(len(self.server.requests), 1)
+
+        # refresh bypasses the cache
+        tiktok.resolve(url, refresh=True)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_failures_are_cached(self):
+        url = VIDEO_URL.format(404)
+        self.assertIsNone(tiktok.resolve(url))
+        self.assertIsNone(tiktok.resolve(url))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_short_links_get_the_id_from_the_upstream(self):
+        self.upstream["https://vm.tiktok.com/ZMabc/"] = (200, {'embed_product_id': 42})
+        self.assertEqual(tiktok.resolve("https://vm.tiktok.com/ZMabc/")['tiktok_id'], '42')
+        self.assertEqual(tiktok.resolve_many(["https://example.com/video/1"]), {})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_many_urls_are_fetched_over_pooled_connections(self):
+        urls = [self.answer(number) for number in range(6)]
+        results = tiktok.resolve_many(urls + urls[:2])
+        self.assertEqual(set(results), set(urls))
+        self.assertTrue(all(results.values()))
+        self.assertEqual(len(self.server.requests), 6)
+
+        # Sequential lookups reuse one connection
+        self.server.ports.clear()
+        for number in range(6, 9):
+            tiktok.resolve(self.answer(number))
+        self.assertEqual(len(set(self.server.ports)), 1)
+
+    def test_server_errors_are_retried(self):
+        url = self.answer(1)
+        answers = iter([(503, {}), self.upstream[url]])
+
+        def oembed(request):
+            status, body = next(answers)
+            return status, {'Content-Type': 'application/json'}, json.dumps(body).encode()
+
+        self.server.routes['/oembed'] = oembed
+        self.assertEqual(tiktok.resolve(url)['title'], "Video 1")
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_timeout_bounds_the_wait_and_the_result_is_cached_later(self):
+        release = threading.Event()
+        url = VIDEO_URL.format(1)
+        body = {'title': "Slow", 'thumbnail_url': "https://p16.tiktokcdn.com/1.jpg"}
+        self.upstream[url] = (200, lambda: release.wait(5) and body)
+
+        started = time.monotonic()
+        self.assertIsNone(tiktok.resolve(url, timeout=0.2))
+        self.assertLess(time.monotonic() - started, 2)
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while cache.get(tiktok.cache_key(url)) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(tiktok.resolve(url)['title'], "Slow")
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class VideoMetadataTests(TikTokTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(0)
+        self.playlist = Playlist.objects.create(title="Playlist", user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_save_fills_in_missing_fields(self):
+        url = self.answer(1)
+        response = self.client.post('/api/v1/videos/', {
+            'playlist': self.playlist.pk, 'tiktok_url': url, 'title': "Mine",
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        video = Video.objects.get()
+        self.assertEqual((video.tiktok_id, video.title), ('1', "Mine"))
+        self.assertEqual(video.thumbnail_url, "https://p16.tiktokcdn.com/1.jpg")
+        self.assertIsNotNone(video.metadata_refreshed_at)
+
+    def test_bulk_add_looks_each_url_up_once(self):
+        urls = [self.answer(number) for number in range(3)]
+        response = self.client.post('/api/v1/videos/bulk/', {
+            'playlist': self.playlist.pk, 'videos': [{'tiktok_url': url} for url in urls],
+        }, format='json')
+        self.assertEqual(response.data['created'], 3, response.data)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_refresh_command_updates_stale_videos(self):
+        fresh = self.answer(1, title="New title")
+        missing = VIDEO_URL.format(2)
+        Video.objects.bulk_create([
+            Video(playlist=self.playlist, tiktok_url=fresh, tiktok_id='1', title="Kept"),
+            Video(playlist=self.playlist, tiktok_url=fresh.replace('/1', '/3'), tiktok_id='3'),
+            Video(playlist=self.playlist, tiktok_url=missing, tiktok_id='2'),
+        ])
+        self.answer(3)
+
+        out = StringIO()
+        call_command('refresh_video_metadata', '--chunk-size', '2', stdout=out)
+        self.assertIn("Refreshed 2 of 3 videos (1 lookups failed)", out.getvalue())
+        videos = {video.tiktok_id: video for video in Video.objects.all()}
+        self.assertEqual(videos['1'].title, "Kept")
+        self.assertEqual(videos['1'].thumbnail_url, "https://p16.tiktokcdn.com/1.jpg")
+        self.assertEqual(videos['3'].title, "Video 3")
+        self.assertIsNone(videos['2'].metadata_refreshed_at)
+
+        # Refreshed videos are skipped until they are stale again
+        self.server.requests.clear()
+        call_command('refresh_video_metadata', stdout=StringIO())
+        self.assertEqual(len(self.server.requests), 1)
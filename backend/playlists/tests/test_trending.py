@@ -0,0 +1,59 @@
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from kalanisVault.testing import create_user
+from .. import trending
+from ..models import Playlist, PlaylistTrend
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = create_user(0)
+        cls.playlist = Playlist.objects.create(title="Old hit", user=user, view_count=500)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_sighting_only_snapshots_counters(self):
+        self.assertEqual(trending.update_scores(), 1)
+        trend = PlaylistTrend.objects.get(pk=self.playlist.pk)
+        self.assertIsNone(trend.log_score)
+        self.assertEqual(trend.view_count_seen, 500)
+        self.assertEqual(trending.compute_leaderboard('trending'), [])
+
+        # Unchanged counters are skipped; new activity is scored
+        self.assertEqual(trending.update_scores(), 0)
+        Playlist.objects.filter(pk=self.playlist.pk).update(view_count=F('view_count') + 3)
+        self.assertEqual(trending.update_scores(), 1)
+        trend.refresh_from_db()
+        self.assertEqual(trend.view_count_seen, 503)
+        self.assertAlmostEqual(trend.log_score, trending.activity_log_score(
+            {'view_count': 3, 'like_count': 0, 'share_count': 0}, PlaylistTrend(), trend.updated_at
+        ))
+        self.assertEqual(trending.compute_leaderboard('trending'), [self.playlist.pk])
+
+    def test_publishing_bumps_the_generation(self):
+        first = trending.publish_leaderboards()
+        self.assertEqual(trending.publish_leaderboards(), first + 1)
+        self.assertEqual(trending.get_leaderboard('popular'), [self.playlist.pk])
+
+    def test_command_needs_a_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, 'CACHE_URL'):
+            call_command('update_trending', stdout=StringIO())
+        self.assertFalse(PlaylistTrend.objects.exists())
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory,
+            }}):
+                out = StringIO()
+                call_command('update_trending', stdout=out)
+                self.assertIn("Updated 1 trending scores", out.getvalue())
+                self.assertEqual(trending.get_leaderboard('popular'), [self.playlist.pk])
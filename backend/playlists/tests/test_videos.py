@@ -0,0 +1,63 @@
+from django.test import TestCase
+
+from kalanisVault.testing import create_user
+from .. import videos
+from ..models import Playlist, Video
+
+
+class VideoOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.playlist = Playlist.objects.create(title="Ordered", user=create_user(0))
+
+    def create_videos(self, *orders):
+        return [
+            Video.objects.create(
+                playlist=self.playlist, tiktok_url=f"https://example.com/{number}",
+                tiktok_id=str(number), order=order
+            )
+            for number, order in enumerate(orders)
+        ]
+
+    def orders(self):
+        return list(Video.objects.filter(playlist=self.playlist).order_by(
+            'order'
+        ).values_list('tiktok_id', 'order'))
+
+    def test_add_videos_appends_after_the_last_video(self):
+        self.create_videos(5000)
+        items = [
+            {'tiktok_url': f"https://example.com/new/{tiktok_id}", 'tiktok_id': tiktok_id}
+            for tiktok_id in ("0", "a", "b", "a")
+        ]
+        results = videos.add_videos(self.playlist, items)
+        self.assertEqual(
+            [status for status, _ in results], ['duplicate', 'created', 'created', 'duplicate']
+        )
+        self.assertEqual(self.orders(), [("0", 5000), ("a", 6024), ("b", 7048)])
+        self.playlist.refresh_from_db()
+        self.assertEqual(self.playlist.video_count, 3)
+
+    def test_appending_past_max_order_rebalances(self):
+        self.create_videos(videos.MAX_ORDER - 10, videos.MAX_ORDER - 5)
+        self.assertEqual(videos.next_order(self.playlist.pk, 2), 3 * videos.ORDER_STEP)
+        self.assertEqual(self.orders(), [("0", 1024), ("1", 2048)])
+        with self.assertRaises(ValueError):
+            videos.next_order(self.playlist.pk, videos.MAX_ORDER // videos.ORDER_STEP)
+
+    def test_move_uses_the_gap_between_neighbours(self):
+        first, second, third = self.create_videos(1024, 2048, 3072)
+        self.assertEqual(videos.move_video(third, after=first), (1536, False))
+        self.assertEqual(self.orders(), [("0", 1024), ("2", 1536), ("1", 2048)])
+
+    def test_move_rebalances_when_no_gap_is_left(self):
+        first, second, third = self.create_videos(1024, 1025, 4096)
+        self.assertEqual(videos.move_video(third, after=first), (1536, True))
+        self.assertEqual(self.orders(), [("0", 1024), ("2", 1536), ("1", 2048)])
+
+    def test_reorder_writes_only_changed_rows(self):
+        first, second, third = self.create_videos(1024, 2048, 3072)
+        self.assertEqual(videos.reorder_videos(self.playlist, [first.pk, third.pk, second.pk]), 2)
+        self.assertEqual(self.orders(), [("0", 1024), ("2", 2048), ("1", 3072)])
+        with self.assertRaises(ValueError):
+            videos.reorder_videos(self.playlist, [first.pk, second.pk])
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from kalanisVault.testing import create_user
+from ..models import Playlist, PlaylistView
+from ..view_buffer import PlaylistViewBuffer, apply_views, replay_journals
+
+
+class ViewBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.viewer = create_user(0), create_user(1)
+        cls.playlist = Playlist.objects.create(title="Viewed", user=cls.owner)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = override_settings(PLAYLIST_VIEW_BUFFER={
+            **settings.PLAYLIST_VIEW_BUFFER, 'FLUSH_INTERVAL': 0, 'JOURNAL_DIR': self.directory
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.buffer = PlaylistViewBuffer()
+        self.addCleanup(self.close_journal)
+
+    def close_journal(self):
+        if self.buffer._journal is not None:
+            self.buffer._journal.close()
+
+    def view_count(self):
+        return Playlist.objects.values_list('view_count', flat=True).get(pk=self.playlist.pk)
+
+    def test_first_view_by_another_user_counts_once(self):
+        for _ in range(2):
+            self.buffer.record(self.viewer.pk, self.playlist.pk, self.owner.pk)
+        self.buffer.record(self.owner.pk, self.playlist.pk, self.owner.pk)
+        self.assertEqual(self.view_count(), 1)
+        self.assertEqual(PlaylistView.objects.filter(playlist=self.playlist).count(), 2)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_flush_keeps_recorded_view_times(self):
+        viewed_at = timezone.now() - timedelta(hours=2)
+        apply_views({(self.viewer.pk, self.playlist.pk): (viewed_at, True)})
+        view = PlaylistView.objects.get(user=self.viewer, playlist=self.playlist)
+        self.assertEqual(view.viewed_at, viewed_at)
+
+        # Replaying an older view neither counts nor moves viewed_at back
+        apply_views({(self.viewer.pk, self.playlist.pk): (viewed_at - timedelta(hours=1), True)})
+        view.refresh_from_db()
+        self.assertEqual(view.viewed_at, viewed_at)
+        self.assertEqual(self.view_count(), 1)
+
+    def test_failed_flush_keeps_views_for_the_next_one(self):
+        with mock.patch('playlists.view_buffer.apply_views', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.buffer.record(self.viewer.pk, self.playlist.pk, self.owner.pk)
+        self.assertIn(self.playlist.pk, self.buffer.pending_for_user(self.viewer.pk))
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+        self.buffer.flush()
+        self.assertEqual(self.buffer.pending_for_user(self.viewer.pk), {})
+        self.assertEqual(self.view_count(), 1)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_replay_is_idempotent(self):
+        viewed_at = timezone.now().isoformat()
+        line = json.dumps({
+            'user': self.viewer.pk, 'playlist': self.playlist.pk,
+            'viewed_at': viewed_at, 'counts': True,
+        })
+        for name in ('views-1-1.flushing', 'views-1-2.flushing'):
+            with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as journal:
+                # A torn final line from a crash mid-write is skipped
+                journal.write(f"{line}\n{line}\n{line[:10]}")
+
+        self.assertEqual(replay_journals(self.directory), 2)
+        self.assertEqual(self.view_count(), 1)
+        self.assertEqual(os.listdir(self.directory), [])
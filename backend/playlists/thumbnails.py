@@ -0,0 +1,306 @@
+"""
+This module proxies and caches remote video thumbnails.
+
+Video.thumbnail_url points at TikTok's CDN, which is slow, rate-limited
+and hands out URLs that expire. ThumbnailCache fetches each URL once
+through the pooled session in playlists.http and keeps the image in a
+disk cache bounded to THUMBNAIL_PROXY['MAX_BYTES'], evicting the least
+recently used files first. Files are named by the SHA-256 of their URL,
+so a URL's cached image never changes and can be served with long-lived
+cache headers.
+
+Concurrent misses for the same URL are coalesced: one thread fetches
+while the others wait for its result. Failed fetches are remembered for
+THUMBNAIL_PROXY['FAILURE_TTL'] seconds so a dead URL is not retried by
+every client, up to THUMBNAIL_PROXY['MAX_FAILURES'] URLs at a time.
+
+Only hosts in THUMBNAIL_PROXY['ALLOWED_HOSTS'] (and their subdomains)
+are fetched and redirects are not followed, since thumbnail URLs are
+supplied by users.
+
+The recency index is kept per process and rebuilt from file times on
+first use; another process evicting a file only turns it into a miss.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+
+from .http import get_session
+
+TEMP_DIR = '.incoming'
+
+# Content types served, and the extension their files are stored with
+CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+    'image/avif': 'avif',
+}
+EXTENSION_TYPES = {extension: content_type for content_type, extension in CONTENT_TYPES.items()}
+
+
+class ThumbnailUnavailable(Exception):
+    """Raised when a thumbnail cannot be fetched or is not allowed"""
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def url_version(url):
+    """Short digest of a URL, added to proxy links so they change with it"""
+    return url_key(url)[:16]
+
+
+def is_allowed(url):
+    """Return whether a URL may be fetched by the proxy"""
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        return False
+    return any(
+        host == allowed or host.endswith(f".{allowed}")
+        for allowed in settings.THUMBNAIL_PROXY['ALLOWED_HOSTS']
+    )
+
+
+class ThumbnailCache:
+    """
+    Size-bounded LRU disk cache of remote images with coalesced misses.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = None
+        self._size = 0
+        self._inflight = {}
+        self._failures = {}
+        self._counts = defaultdict(int)
+
+    @property
+    def config(self):
+        return settings.THUMBNAIL_PROXY
+
+    @property
+    def directory(self):
+        return self.config['CACHE_DIR']
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key[:2], f"{key}.{extension}")
+
+    def _load(self):
+        """Rebuild the recency index from the files on disk, oldest first"""
+        files = []
+        try:
+            shards = os.scandir(self.directory)
+        except FileNotFoundError:
+            shards = None
+        if shards is not None:
+            with shards:
+                for shard in shards:
+                    if shard.name == TEMP_DIR or not shard.is_dir(follow_symlinks=False):
+                        continue
+                    with os.scandir(shard.path) as entries:
+                        for entry in entries:
+                            key, _, extension = entry.name.partition('.')
+                            if extension in EXTENSION_TYPES and entry.is_file(follow_symlinks=False):
+                                stat = entry.stat()
+                                files.append((stat.st_mtime, key, extension, stat.st_size))
+
+        self._entries = OrderedDict()
+        self._size = 0
+        for _, key, extension, size in sorted(files):
+            self._entries[key] = (extension, size)
+            self._size += size
+
+    def _lookup(self, key):
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+
+        extension = entry[0]
+        path = self._path(key, extension)
+        try:
+            # Keeps the recency across restarts
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self._size -= entry[1]
+            return None
+        return path, EXTENSION_TYPES[extension]
+
+    def get(self, url):
+        """
+        Return (path, content type) of the cached image for a URL, fetching
+        it on a miss. Raises ThumbnailUnavailable if it cannot be fetched.
+        """
+        key = url_key(url)
+        hit = self._lookup(key)
+        if hit is not None:
+            self._count('hits')
+            return hit
+
+        with self._lock:
+            retry_at = self._failures.get(key)
+            if retry_at is not None:
+                if retry_at > time.monotonic():
+                    self._counts['failures_cached'] += 1
+                    raise ThumbnailUnavailable("The thumbnail failed to load recently.")
+                del self._failures[key]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self._counts['misses'] += 1
+            else:
+                self._counts['coalesced'] += 1
+
+        if not leader:
+            connect_timeout, read_timeout = self.config['TIMEOUT']
+            try:
+                return future.result(timeout=connect_timeout + read_timeout + 1)
+            except TimeoutError as error:
+                raise ThumbnailUnavailable("The thumbnail is still loading.") from error
+
+        try:
+            result = self._fetch(url, key)
+        except ThumbnailUnavailable as error:
+            self._remember_failure(key)
+            future.set_exception(error)
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _remember_failure(self, key):
+        now = time.monotonic()
+        with self._lock:
+            self._failures.pop(key, None)
+            self._failures[key] = now + self.config['FAILURE_TTL']
+            if len(self._failures) > self.config['MAX_FAILURES']:
+                # Entries are in expiry order, as the TTL is the same for all
+                while self._failures and (
+                    len(self._failures) > self.config['MAX_FAILURES']
+                    or next(iter(self._failures.values())) <= now
+                ):
+                    del self._failures[next(iter(self._failures))]
+
+    def _fetch(self, url, key):
+        if not is_allowed(url):
+            raise ThumbnailUnavailable("The thumbnail host is not allowed.")
+
+        config = self.config
+        try:
+            response = get_session().get(
+                url, stream=True, timeout=config['TIMEOUT'], allow_redirects=False
+            )
+        except requests.RequestException as error:
+            raise ThumbnailUnavailable(f"The thumbnail could not be fetched: {error}") from error
+
+        with response:
+            if response.status_code != 200:
+                raise ThumbnailUnavailable(
+                    f"The thumbnail host answered {response.status_code}."
+                )
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            extension = CONTENT_TYPES.get(content_type)
+            if extension is None:
+                raise ThumbnailUnavailable("The thumbnail is not a supported image.")
+            if int(response.headers.get('Content-Length') or 0) > config['MAX_IMAGE_BYTES']:
+                raise ThumbnailUnavailable("The thumbnail is too large.")
+
+            incoming = os.path.join(self.directory, TEMP_DIR)
+            os.makedirs(incoming, exist_ok=True)
+            size = 0
+            with tempfile.NamedTemporaryFile(dir=incoming, delete=False) as temp:
+                try:
+                    for chunk in response.iter_content(64 * 1024):
+                        size += len(chunk)
+                        if size > config['MAX_IMAGE_BYTES']:
+                            raise ThumbnailUnavailable("The thumbnail is too large.")
+                        temp.write(chunk)
+                except BaseException as error:
+                    temp.close()
+                    os.remove(temp.name)
+                    if isinstance(error, requests.RequestException):
+                        raise ThumbnailUnavailable(
+                            f"The thumbnail could not be fetched: {error}"
+                        ) from error
+                    raise
+
+        path = self._path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp.name, path)
+        self._store(key, extension, size)
+        return path, content_type
+
+    def _store(self, key, extension, size):
+        evicted = []
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (extension, size)
+            self._size += size
+            # Evict the least recently used, but never the file just stored
+            while self._size > self.config['MAX_BYTES'] and len(self._entries) > 1:
+                old_key, (old_extension, old_size) = self._entries.popitem(last=False)
+                self._size -= old_size
+                evicted.append(self._path(old_key, old_extension))
+            self._counts['evictions'] += len(evicted)
+
+        for path in evicted:
+            try:
+                # Open responses keep reading an unlinked file
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def stats(self):
+        """Return the size of the cache and this process's counters"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            return {
+                'files': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.config['MAX_BYTES'],
+                **{name: self._counts[name] for name in (
+                    'hits', 'misses', 'coalesced', 'failures_cached', 'evictions'
+                )},
+            }
+
+    def reset(self):
+        """Forget the in-memory index and failures, e.g. after the directory changed"""
+        with self._lock:
+            self._entries = None
+            self._size = 0
+            self._failures.clear()
+
+
+thumbnail_cache = ThumbnailCache()
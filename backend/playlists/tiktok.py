@@ -0,0 +1,165 @@
+"""
+This module resolves TikTok video metadata on the server.
+
+parse_video_id reads the numeric ID out of a TikTok URL without any
+request. resolve_many looks up oEmbed metadata (title, thumbnail and the
+video ID of short links) for many URLs at once: results are cached by
+tiktok_id in the default cache, and misses are fetched concurrently by a
+bounded thread pool through the pooled session in playlists.http, so
+connections to the upstream are reused.
+
+Each lookup caches its own result, so a caller can stop waiting after a
+deadline (as saves do, see TIKTOK['SAVE_TIMEOUT']) while slow lookups
+finish in the pool and are ready for the next request.
+
+The upstream is TIKTOK['OEMBED_URL'], so a local stub server can stand in
+for it in tests and benchmarks. Failed lookups are cached for a shorter
+time, so a dead URL is not fetched again by every request.
+"""
+import hashlib
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .http import get_session
+
+logger = logging.getLogger('playlists')
+
+KEY_PREFIX = 'tiktok:oembed'
+VIDEO_ID_PATTERN = re.compile(r'/(?:video|photo)/(\d+)')
+# What the frontend sends as tiktok_id when it cannot parse a short link
+UNKNOWN_ID = 'unknown'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_tiktok_url(url):
+    if not isinstance(url, str):
+        return False
+    host = (urlsplit(url).hostname or '').lower()
+    return host == 'tiktok.com' or host.endswith('.tiktok.com')
+
+
+def parse_video_id(url):
+    """Return the video ID in a TikTok URL, or None (e.g. for short links)"""
+    if not is_tiktok_url(url):
+        return None
+    match = VIDEO_ID_PATTERN.search(urlsplit(url).path)
+    return match.group(1) if match else None
+
+
+def needs_metadata(attrs):
+    """
+    Return whether a video's fields leave out anything the oEmbed
+    metadata of its TikTok URL would fill in.
+    """
+    if not settings.TIKTOK['RESOLVE_ON_SAVE'] or not is_tiktok_url(attrs.get('tiktok_url')):
+        return False
+    tiktok_id = attrs.get('tiktok_id')
+    return (
+        not tiktok_id or tiktok_id == UNKNOWN_ID
+        or not attrs.get('title') or not attrs.get('thumbnail_url')
+    )
+
+
+def cache_key(url):
+    video_id = parse_video_id(url)
+    if video_id:
+        return f"{KEY_PREFIX}:{video_id}"
+    return f"{KEY_PREFIX}:url:{hashlib.blake2b(url.encode(), digest_size=16).hexdigest()}"
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.TIKTOK['WORKERS'],
+                    thread_name_prefix='tiktok-metadata'
+                )
+    return _executor
+
+
+def fetch_metadata(url):
+    """
+    Fetch the metadata of one TikTok URL from the upstream, bypassing the
+    cache. Returns None if the upstream has none or cannot be reached.
+    """
+    config = settings.TIKTOK
+    try:
+        response = get_session().get(
+            config['OEMBED_URL'], params={'url': url}, timeout=config['TIMEOUT']
+        )
+        if response.status_code != 200:
+            logger.info("oEmbed lookup of %s answered %s", url, response.status_code)
+            return None
+        data = response.json()
+    except (requests.RequestException, ValueError) as error:
+        logger.warning("oEmbed lookup of %s failed: %s", url, error)
+        return None
+
+    video_id = parse_video_id(url) or str(data.get('embed_product_id') or '')
+    return {
+        'tiktok_id': video_id or None,
+        'title': (data.get('title') or '')[:200] or None,
+        'thumbnail_url': data.get('thumbnail_url') or None,
+        'author_name': data.get('author_name') or None,
+    }
+
+
+def _lookup(url, key):
+    """Fetch the metadata of one URL and cache the result, even a failure"""
+    metadata = fetch_metadata(url)
+    if metadata:
+        cache.set(key, metadata, settings.TIKTOK['CACHE_TIMEOUT'])
+    else:
+        # Failures are cached as an empty dict
+        cache.set(key, {}, settings.TIKTOK['FAILURE_TIMEOUT'])
+    return metadata
+
+
+def resolve_many(urls, refresh=False, timeout=None):
+    """
+    Return {url: metadata or None} for TikTok URLs, reading the cache
+    unless ``refresh`` is set and fetching the rest concurrently.
+
+    With ``timeout``, waits at most that many seconds for the fetches;
+    URLs still loading map to None and are cached once they finish.
+    """
+    keys = {url: cache_key(url) for url in dict.fromkeys(urls) if is_tiktok_url(url)}
+    cached = {} if refresh or not keys else cache.get_many(keys.values())
+
+    results = {}
+    missing = []
+    for url, key in keys.items():
+        if key in cached:
+            results[url] = cached[key] or None
+        else:
+            missing.append(url)
+
+    if len(missing) == 1 and timeout is None:
+        results[missing[0]] = _lookup(missing[0], keys[missing[0]])
+    elif missing:
+        executor = _get_executor()
+        futures = {url: executor.submit(_lookup, url, keys[url]) for url in missing}
+        wait(futures.values(), timeout=timeout)
+        for url, future in futures.items():
+            if future.done():
+                results[url] = future.result()
+            else:
+                logger.info("oEmbed lookup of %s is still running after %ss", url, timeout)
+                results[url] = None
+    return results
+
+
+def resolve(url, refresh=False, timeout=None):
+    """Return the metadata of one TikTok URL, or None"""
+    return resolve_many([url], refresh=refresh, timeout=timeout).get(url)
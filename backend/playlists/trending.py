@@ -0,0 +1,180 @@
+"""
+This module computes the trending and popular playlist leaderboards.
+
+Trending scores use forward decay: an event at time t adds
+weight * 2 ** ((t - EPOCH) / half_life) to a playlist's score. Every score
+then decays at the same rate, so ranking by the stored value equals
+ranking by the decayed value, and only playlists with new activity ever
+need updating. Scores are stored as log2 so they never overflow.
+
+The periodic update_trending command applies activity deltas taken from
+the view, like and share counters and publishes fresh leaderboards to the
+cache. Endpoints then read a leaderboard as a single cache get, so the
+cache must be shared with the web workers (see cache_is_shared). A playlist
+seen for the first time only has its counters snapshotted, so activity
+from before it was tracked never lands in its score at today's weight.
+"""
+import math
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Playlist, PlaylistTrend
+from .response_cache import response_cache
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+GENERATION_KEY = 'trending:generation'
+LEADERBOARDS = ('trending', 'popular')
+
+
+def log_add(a, b):
+    """Return log2(2 ** a + 2 ** b) without overflowing"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def activity_log_score(playlist, trend, now):
+    """
+    Return the log2 forward-decayed score of the activity since the trend
+    snapshot, or None when there was none. Decreases (e.g. unlikes) are
+    ignored.
+    """
+    config = settings.TRENDING
+    activity = (
+        config['VIEW_WEIGHT'] * max(playlist['view_count'] - trend.view_count_seen, 0) +
+        config['LIKE_WEIGHT'] * max(playlist['like_count'] - trend.like_count_seen, 0) +
+        config['SHARE_WEIGHT'] * max(playlist['share_count'] - trend.share_count_seen, 0)
+    )
+    if activity <= 0:
+        return None
+    age_hours = (now - EPOCH).total_seconds() / 3600
+    return math.log2(activity) + age_hours / config['HALF_LIFE_HOURS']
+
+
+def update_scores(batch_size=1000):
+    """
+    Fold the activity since the last run into the trending scores.
+    Only public playlists whose counters changed are touched. Returns the
+    number of playlists updated.
+    """
+    now = timezone.now()
+    changed = Playlist.objects.filter(is_public=True).filter(
+        Q(trend__isnull=True) |
+        ~Q(view_count=F('trend__view_count_seen')) |
+        ~Q(like_count=F('trend__like_count_seen')) |
+        ~Q(share_count=F('trend__share_count_seen'))
+    ).values('id', 'view_count', 'like_count', 'share_count').order_by('id')
+
+    updated = 0
+    last_id = 0
+    while True:
+        # Keyset pagination, since the batches write to the joined table
+        batch = list(changed.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return updated
+        updated += _update_batch(batch, now)
+        last_id = batch[-1]['id']
+
+
+def _update_batch(playlists, now):
+    trends = PlaylistTrend.objects.in_bulk([playlist['id'] for playlist in playlists])
+
+    created, updated = [], []
+    for playlist in playlists:
+        trend = trends.get(playlist['id'])
+        if trend is None:
+            # First sighting: scoring starts from this snapshot
+            trend = PlaylistTrend(playlist_id=playlist['id'], log_score=None)
+            created.append(trend)
+        else:
+            trend.log_score = log_add(trend.log_score, activity_log_score(playlist, trend, now))
+            updated.append(trend)
+
+        trend.view_count_seen = playlist['view_count']
+        trend.like_count_seen = playlist['like_count']
+        trend.share_count_seen = playlist['share_count']
+        trend.updated_at = now
+
+    with transaction.atomic():
+        PlaylistTrend.objects.bulk_create(created)
+        PlaylistTrend.objects.bulk_update(updated, [
+            'log_score', 'view_count_seen', 'like_count_seen',
+            'share_count_seen', 'updated_at'
+        ])
+    return len(playlists)
+
+
+def compute_leaderboard(kind, tag=None):
+    """Query the top playlist IDs for a leaderboard, optionally per tag"""
+    size = settings.TRENDING['LEADERBOARD_SIZE']
+    if kind == 'trending':
+        queryset = PlaylistTrend.objects.filter(
+            log_score__isnull=False,
+            playlist__is_public=True
+        ).order_by('-log_score').values_list('playlist_id', flat=True)
+        tag_lookup = 'playlist__tags__name'
+    else:
+        queryset = Playlist.objects.filter(
+            is_public=True
+        ).order_by('-view_count', '-id').values_list('id', flat=True)
+        tag_lookup = 'tags__name'
+
+    if tag:
+        queryset = queryset.filter(**{tag_lookup: tag})
+    return list(queryset[:size])
+
+
+def _leaderboard_key(generation, kind, tag):
+    return f"trending:{generation}:{kind}:{tag or ''}"
+
+
+def get_leaderboard(kind, tag=None):
+    """
+    Return the playlist IDs of a leaderboard from the cache.
+    Per-tag leaderboards are computed on first request and cached until
+    the next update_trending run publishes a new generation.
+    """
+    # Start from the clock so an evicted generation never comes back with
+    # a value older leaderboards were stored under
+    generation = cache.get_or_set(GENERATION_KEY, time.time_ns() // 1000, None)
+    key = _leaderboard_key(generation, kind, tag)
+    ids = cache.get(key)
+    if ids is None:
+        ids = compute_leaderboard(kind, tag)
+        cache.set(key, ids, settings.TRENDING['CACHE_TIMEOUT'])
+    return ids
+
+
+def cache_is_shared():
+    """
+    Return whether other processes can read what is published to the
+    default cache. Local-memory and dummy caches are private to a process.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def publish_leaderboards():
+    """Precompute the global leaderboards under a new cache generation"""
+    leaderboards = {kind: compute_leaderboard(kind) for kind in LEADERBOARDS}
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = time.time_ns() // 1000
+        cache.set(GENERATION_KEY, generation, None)
+    for kind, ids in leaderboards.items():
+        cache.set(
+            _leaderboard_key(generation, kind, None), ids, settings.TRENDING['CACHE_TIMEOUT']
+        )
+    response_cache.invalidate('playlists')
+    return generation
@@ -0,0 +1,190 @@
+"""
+This module adds and orders videos in playlists.
+
+Video.order holds sparse keys ORDER_STEP apart, so a video can be moved
+between two neighbours by giving it the midpoint of their keys, which
+writes only the moved row. When two neighbours have no gap left, or
+appended keys would pass MAX_ORDER, the playlist's keys are spread out
+again in one bulk_update.
+
+Writes take the playlist's write lock first, by updating its row before
+anything is read, so concurrent changes to the same playlist queue up
+instead of reading the same keys.
+"""
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from kalanisVault.counters import adjust
+from . import explore
+from .models import Playlist, Video
+from .response_cache import invalidate_responses
+
+ORDER_STEP = 1024
+# Video.order is a PositiveIntegerField, which is 32-bit on most databases
+MAX_ORDER = 2 ** 31 - 1
+
+
+def lock_playlist(playlist_id):
+    """
+    Take the playlist's write lock until the surrounding transaction ends.
+    Touching updated_at is the write, which conditional GETs also rely on.
+    """
+    Playlist.objects.filter(pk=playlist_id).update(updated_at=timezone.now())
+
+
+def _last_order(playlist_id):
+    return Video.objects.filter(playlist_id=playlist_id).aggregate(last=Max('order'))['last'] or 0
+
+
+def next_order(playlist_id, count=1):
+    """
+    Return the key of the first of ``count`` videos appended ORDER_STEP
+    apart after the playlist's last video. The playlist's keys are
+    rebalanced first when the new keys would pass MAX_ORDER. Raises
+    ValueError when even rebalanced keys leave no room for them.
+    """
+    first = _last_order(playlist_id) + ORDER_STEP
+    if first + (count - 1) * ORDER_STEP <= MAX_ORDER:
+        return first
+
+    rebalance(playlist_id)
+    first = _last_order(playlist_id) + ORDER_STEP
+    if first + (count - 1) * ORDER_STEP > MAX_ORDER:
+        raise ValueError("The playlist has no room for more videos.")
+    return first
+
+
+def key_between(low, high):
+    """
+    Return a key strictly between two neighbouring keys, or None when there
+    is no gap left. None for ``low`` means the start of the playlist and
+    None for ``high`` its end.
+    """
+    if high is None:
+        key = ORDER_STEP if low is None else low + ORDER_STEP
+        return key if key <= MAX_ORDER else None
+    if low is None:
+        low = -1
+    if high - low < 2:
+        return None
+    return (low + high) // 2
+
+
+def rebalance(playlist_id):
+    """Spread a playlist's keys ORDER_STEP apart, writing only changed rows"""
+    videos = list(Video.objects.filter(playlist_id=playlist_id).order_by(
+        'order', 'added_at', 'id'
+    ).only('id', 'order'))
+    changed = []
+    for position, video in enumerate(videos, start=1):
+        if video.order != position * ORDER_STEP:
+            video.order = position * ORDER_STEP
+            changed.append(video)
+    Video.objects.bulk_update(changed, ['order'], batch_size=500)
+    return len(changed)
+
+
+def _neighbour_keys(video, after=None, before=None):
+    """Return the keys of the two videos the moved video goes between"""
+    others = Video.objects.filter(playlist_id=video.playlist_id).exclude(pk=video.pk)
+    if after is not None:
+        high = others.filter(order__gt=after.order).order_by('order').values_list(
+            'order', flat=True
+        ).first()
+        return after.order, high
+    low = others.filter(order__lt=before.order).order_by('-order').values_list(
+        'order', flat=True
+    ).first()
+    return low, before.order
+
+
+def move_video(video, after=None, before=None):
+    """
+    Move a video to just after ``after`` or just before ``before``, videos
+    of the same playlist. Only the moved row is written unless the keys
+    around the target have to be rebalanced first. Returns the new key and
+    whether a rebalance happened.
+    """
+    with transaction.atomic():
+        lock_playlist(video.playlist_id)
+        neighbour = after or before
+        neighbour.refresh_from_db(fields=['order'])
+        key = key_between(*_neighbour_keys(video, after, before))
+
+        rebalanced = key is None
+        if rebalanced:
+            rebalance(video.playlist_id)
+            neighbour.refresh_from_db(fields=['order'])
+            key = key_between(*_neighbour_keys(video, after, before))
+
+        Video.objects.filter(pk=video.pk).update(order=key)
+        video.order = key
+        invalidate_responses('playlists')
+    return key, rebalanced
+
+
+def reorder_videos(playlist, video_ids):
+    """
+    Apply a full ordering of a playlist's videos in one bulk_update,
+    writing only the rows whose key changes. Raises ValueError unless
+    ``video_ids`` lists each of the playlist's videos exactly once.
+    """
+    with transaction.atomic():
+        lock_playlist(playlist.pk)
+        videos = Video.objects.filter(playlist_id=playlist.pk).only('id', 'order').in_bulk()
+        if len(video_ids) != len(videos) or set(video_ids) != videos.keys():
+            raise ValueError("The ordering must list every video of the playlist once.")
+
+        changed = []
+        for position, video_id in enumerate(video_ids, start=1):
+            video = videos[video_id]
+            if video.order != position * ORDER_STEP:
+                video.order = position * ORDER_STEP
+                changed.append(video)
+        Video.objects.bulk_update(changed, ['order'], batch_size=500)
+        if changed:
+            invalidate_responses('playlists')
+    return len(changed)
+
+
+def add_videos(playlist, items, allow_duplicates=False):
+    """
+    Append videos to a playlist with one INSERT.
+
+    ``items`` are validated field dicts. Unless ``allow_duplicates`` is set,
+    items whose tiktok_id is already in the playlist, or earlier in
+    ``items``, are skipped. Returns one (status, video) pair per item, where
+    status is 'created' or 'duplicate' and video is None for duplicates.
+    Raises ValueError when the playlist has no room for the new videos.
+    """
+    results = []
+    with transaction.atomic():
+        lock_playlist(playlist.pk)
+        seen = set()
+        if not allow_duplicates:
+            seen.update(Video.objects.filter(
+                playlist_id=playlist.pk,
+                tiktok_id__in={item['tiktok_id'] for item in items}
+            ).values_list('tiktok_id', flat=True))
+
+        order = next_order(playlist.pk, len(items))
+        videos = []
+        for item in items:
+            if item['tiktok_id'] in seen:
+                results.append(('duplicate', None))
+                continue
+            if not allow_duplicates:
+                seen.add(item['tiktok_id'])
+            video = Video(playlist=playlist, order=order, **item)
+            order += ORDER_STEP
+            videos.append(video)
+            results.append(('created', video))
+
+        # bulk_create sends no post_save, so do the handlers' work here
+        Video.objects.bulk_create(videos)
+        adjust(Playlist.objects.filter(pk=playlist.pk), 'video_count', len(videos))
+        if videos:
+            explore.videos_added(playlist.pk, len(videos))
+            invalidate_responses('playlists')
+    return results
@@ -0,0 +1,294 @@
+"""
+This module buffers playlist view tracking off the request path.
+PlaylistViewSet.retrieve records each view in memory (and optionally in an
+append-only journal file), and a background thread flushes the buffer in
+batches: one bulk_update of PlaylistView.viewed_at, one bulk_create of new
+views and one UPDATE per distinct view_count delta.
+
+Flushing is idempotent: a view only increments view_count when its
+PlaylistView row does not exist yet, and viewed_at never moves backwards,
+so journal files can safely be replayed after a crash.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from kalanisVault.counters import adjust
+from users.models import User
+
+from .models import Playlist, PlaylistView
+
+logger = logging.getLogger('playlists')
+
+JOURNAL_SUFFIX = '.log'
+FLUSHING_SUFFIX = '.flushing'
+
+
+def merge(pending, user_id, playlist_id, viewed_at, counts):
+    """Merge one view into a pending dict, keeping the latest view time"""
+    key = (user_id, playlist_id)
+    if key in pending:
+        previous_at, previous_counts = pending[key]
+        viewed_at = max(viewed_at, previous_at)
+        counts = counts or previous_counts
+    pending[key] = (viewed_at, counts)
+
+
+def apply_views(pending):
+    """
+    Write a batch of buffered views to the database.
+
+    ``pending`` maps (user_id, playlist_id) to (viewed_at, counts), where
+    counts is whether the view may increment the playlist's view_count
+    (the viewer is not the owner).
+    """
+    if not pending:
+        return
+
+    user_ids = {user_id for user_id, _ in pending}
+    playlist_ids = {playlist_id for _, playlist_id in pending}
+
+    with transaction.atomic():
+        # Lock the playlists before reading their views, so a concurrent
+        # flush cannot insert the same views between the read and the insert
+        live_playlists = set(Playlist.objects.select_for_update().filter(
+            id__in=playlist_ids
+        ).order_by('id').values_list('id', flat=True))
+        live_users = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        existing = {
+            (view.user_id, view.playlist_id): view
+            for view in PlaylistView.objects.filter(
+                user_id__in=user_ids,
+                playlist_id__in=playlist_ids
+            ).only('id', 'user_id', 'playlist_id', 'viewed_at')
+        }
+
+        updated, created = [], []
+        for (user_id, playlist_id), (viewed_at, counts) in pending.items():
+            view = existing.get((user_id, playlist_id))
+            if view is not None:
+                if view.viewed_at < viewed_at:
+                    view.viewed_at = viewed_at
+                    updated.append(view)
+            elif playlist_id in live_playlists and user_id in live_users:
+                created.append(PlaylistView(
+                    user_id=user_id,
+                    playlist_id=playlist_id,
+                    viewed_at=viewed_at
+                ))
+
+        PlaylistView.objects.bulk_update(updated, ['viewed_at'], batch_size=500)
+        PlaylistView.objects.bulk_create(created, batch_size=500, ignore_conflicts=True)
+
+        # Only views this flush inserted count. bulk_create does not say
+        # which rows it skipped as conflicts, so read the new keys back;
+        # with the playlists locked, those missing from the read above
+        # were inserted here
+        created_keys = {(view.user_id, view.playlist_id) for view in created}
+        inserted = created_keys.intersection(PlaylistView.objects.filter(
+            user_id__in={user_id for user_id, _ in created_keys},
+            playlist_id__in={playlist_id for _, playlist_id in created_keys}
+        ).values_list('user_id', 'playlist_id'))
+
+        view_deltas = defaultdict(int)
+        for user_id, playlist_id in inserted:
+            if pending[user_id, playlist_id][1]:
+                view_deltas[playlist_id] += 1
+
+        playlists_by_delta = defaultdict(list)
+        for playlist_id, delta in view_deltas.items():
+            playlists_by_delta[delta].append(playlist_id)
+        for delta, ids in playlists_by_delta.items():
+            adjust(Playlist.objects.filter(id__in=ids), 'view_count', delta)
+
+
+class PlaylistViewBuffer:
+    """
+    Thread-safe in-memory buffer of playlist views with a background flusher.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        # Journal writes and fsyncs take their own lock, so recording and
+        # reading views never waits on the disk
+        self._journal_lock = threading.Lock()
+        self._journal = None
+        # Journals of failed flushes, removed once their views are written
+        self._failed_journals = []
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def config(self):
+        return settings.PLAYLIST_VIEW_BUFFER
+
+    def record(self, user_id, playlist_id, owner_id):
+        """Buffer a view of a playlist by a user"""
+        viewed_at = timezone.now()
+        counts = user_id != owner_id
+
+        with self._lock:
+            merge(self._pending, user_id, playlist_id, viewed_at, counts)
+            full = len(self._pending) >= self.config['MAX_PENDING']
+        # After the merge, so a journal a flush rotates out only holds
+        # views that flush writes
+        self._write_journal(user_id, playlist_id, viewed_at, counts)
+
+        if not self.config['FLUSH_INTERVAL']:
+            self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def pending_for_user(self, user_id):
+        """Return {playlist_id: viewed_at} for the user's unflushed views"""
+        with self._lock:
+            return {
+                playlist_id: viewed_at
+                for (pending_user_id, playlist_id), (viewed_at, _) in self._pending.items()
+                if pending_user_id == user_id
+            }
+
+    def flush(self):
+        """
+        Write every buffered view to the database. If that fails the views
+        go back into the buffer for the next flush, their journal is kept
+        until then, and the error is raised.
+        """
+        with self._journal_lock:
+            journal = self._rotate_journal()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if journal:
+                self._failed_journals.append(journal)
+            journals, self._failed_journals = self._failed_journals, []
+
+        try:
+            apply_views(pending)
+        except Exception:
+            with self._lock:
+                for (user_id, playlist_id), (viewed_at, counts) in pending.items():
+                    merge(self._pending, user_id, playlist_id, viewed_at, counts)
+                self._failed_journals = journals + self._failed_journals
+            raise
+        for path in journals:
+            remove_journal(path)
+
+    def _write_journal(self, user_id, playlist_id, viewed_at, counts):
+        directory = self.config['JOURNAL_DIR']
+        if not directory:
+            return
+        line = json.dumps({
+            'user': user_id,
+            'playlist': playlist_id,
+            'viewed_at': viewed_at.isoformat(),
+            'counts': counts,
+        }) + '\n'
+        with self._journal_lock:
+            if self._journal is None:
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f"views-{os.getpid()}{JOURNAL_SUFFIX}")
+                self._journal = open(path, 'a', encoding='utf-8')
+            self._journal.write(line)
+            self._journal.flush()
+            if self.config['FSYNC']:
+                os.fsync(self._journal.fileno())
+
+    def _rotate_journal(self):
+        """Close the current journal and rename it for the flush in progress"""
+        if self._journal is None:
+            return None
+        path = self._journal.name
+        self._journal.close()
+        self._journal = None
+        flushing = path[:-len(JOURNAL_SUFFIX)] + f"-{time.time_ns()}{FLUSHING_SUFFIX}"
+        os.replace(path, flushing)
+        return flushing
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='playlist-view-flusher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.config['FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The views stay buffered and are retried on the next flush
+                logger.exception("Failed to flush playlist views")
+            finally:
+                connection.close()
+
+
+def remove_journal(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        # Already replayed by the flush_playlist_views command
+        pass
+
+
+def is_live_journal(name):
+    """Return whether a .log journal still belongs to a running process"""
+    pid = name[len('views-'):-len(JOURNAL_SUFFIX)]
+    if not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def replay_journals(directory):
+    """
+    Apply the journal files left in ``directory`` by failed flushes and
+    exited workers, deleting each once applied. Journals still being
+    written by a running process are skipped. Returns the number of views.
+    """
+    total = 0
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if entry.name.endswith(JOURNAL_SUFFIX):
+            if is_live_journal(entry.name):
+                continue
+        elif not entry.name.endswith(FLUSHING_SUFFIX):
+            continue
+        pending = {}
+        with open(entry.path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+                merge(
+                    pending, record['user'], record['playlist'],
+                    datetime.fromisoformat(record['viewed_at']), record['counts']
+                )
+        apply_views(pending)
+        remove_journal(entry.path)
+        total += len(pending)
+    return total
+
+
+view_buffer = PlaylistViewBuffer()
+atexit.register(view_buffer.flush)
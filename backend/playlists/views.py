@@ -1,18 +1,37 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated, SAFE_METHODS
 from .models import Playlist, Video, Tag, PlaylistView
 from .serializers import (
     PlaylistSerializer, 
+    PlaylistSummarySerializer,
     PlaylistCreateSerializer,
+    BulkLikeSerializer,
+    BulkVideoSerializer,
+    BulkVideoItemSerializer,
+    MoveVideoSerializer,
+    ReorderVideosSerializer,
     VideoSerializer, 
-    TagSerializer
+    TagSerializer,
+    get_liked_ids
 )
 from .permissions import IsOwnerOrReadOnly
-from django.db.models import Q, F, Count
-from django.utils import timezone
-import random
+from .response_cache import response_cache
+from .tag_index import tag_index
+from .thumbnails import ThumbnailUnavailable, thumbnail_cache, url_version
+from .view_buffer import view_buffer
+from . import explore, likes, search, tiktok, trending, videos
+from kalanisVault.conditional import conditional_response, latest, make_etag
+from kalanisVault.params import get_page_params
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, F, Sum
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 
 class TagViewSet(viewsets.ModelViewSet):
     """
@@ -24,18 +43,36 @@ class TagViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
     
+    def list(self, request, *args, **kwargs):
+        """
+        Return all tags, optionally filtered by ?search=, from the response cache.
+        """
+        def compute():
+            queryset = self.filter_queryset(self.get_queryset())
+            return self.get_serializer(queryset, many=True).data
+        
+        return Response(response_cache.get_or_set(
+            'tags', 'tag_list', (request.query_params.get('search', ''),), compute
+        ))
+    
     @action(detail=False, methods=['get'])
     def autocomplete(self, request):
         """
         API endpoint that allows autocomplete for tags.
+        Answers from the in-memory prefix index, most used tags first.
         """
-        query = request.query_params.get('q', '')
+        query = request.query_params.get('q', '').strip()
         if len(query) < 2:  
             return Response([])
             
-        tags = Tag.objects.filter(name__icontains=query)[:10]  
-        serializer = self.get_serializer(tags, many=True)
-        return Response(serializer.data)
+        return Response(tag_index.lookup(query, limit=10))
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def autocomplete_stats(self, request):
+        """
+        Return hit and rebuild metrics for the autocomplete index.
+        """
+        return Response(tag_index.stats())
 
 class PlaylistViewSet(viewsets.ModelViewSet):
     """
@@ -46,6 +83,10 @@ class PlaylistViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'description', 'tags__name']
     ordering_fields = ['created_at', 'updated_at', 'title', 'view_count', 'share_count']
+    list_actions = [
+        'list', 'my_playlists', 'liked_playlists', 'popular', 'trending',
+        'search', 'by_tag', 'explore', 'recent_playlists'
+    ]
     
     def get_queryset(self):
         """
@@ -53,9 +94,9 @@ class PlaylistViewSet(viewsets.ModelViewSet):
         Filter by tag if requested.
         """
         user = self.request.user
-        queryset = Playlist.objects.filter(
+        queryset = self.with_representation(Playlist.objects.filter(
             Q(is_public=True) | Q(user=user)
-        ).prefetch_related('videos', 'likes', 'tags')
+        ))
         
         tag = self.request.query_params.get('tag', None)
         if tag:
@@ -69,33 +110,143 @@ class PlaylistViewSet(viewsets.ModelViewSet):
         """
         if self.action in ['create', 'update', 'partial_update']:
             return PlaylistCreateSerializer
+        if self.action in self.list_actions:
+            return PlaylistSummarySerializer
         return PlaylistSerializer
     
+    def get_query_param_set(self, name, allowed):
+        """
+        Parse a comma-separated query parameter into a set of names. Names
+        not in ``allowed`` raise a ValidationError, which the API answers
+        with a 400.
+        """
+        value = self.request.query_params.get(name, '')
+        names = {item.strip() for item in value.split(',') if item.strip()}
+        unknown = names - set(allowed)
+        if unknown:
+            raise ValidationError({name: f"Unknown names: {', '.join(sorted(unknown))}."})
+        return names
+    
+    def get_sparse_fieldset(self):
+        """Return the ?fields= and ?expand= sets of a list action"""
+        expandable = PlaylistSummarySerializer.expandable_fields.keys()
+        fields = self.get_query_param_set(
+            'fields', {*PlaylistSummarySerializer.Meta.fields, *expandable}
+        )
+        return fields, self.get_query_param_set('expand', expandable)
+    
+    def get_serializer_context(self):
+        """
+        Pass the ?fields= sparse fieldset and ?expand= relations through to
+        the summary serializer used by list actions.
+        """
+        context = super().get_serializer_context()
+        if self.action in self.list_actions:
+            context['fields'], context['expand'] = self.get_sparse_fieldset()
+        return context
+    
+    def with_representation(self, queryset):
+        """
+        Apply the joins and prefetches the serializer for this action needs,
+        skipping nested relations a list response will not render.
+        """
+        if self.action in self.list_actions:
+            fields, expand = self.get_sparse_fieldset()
+            return queryset.with_summary(fields=fields, expand=expand)
+        if self.action == 'retrieve':
+            return queryset.with_details()
+        return queryset
+    
+    def cached_list_response(self, params, get_queryset):
+        """
+        Serve a list of public playlists from the response cache, keyed on
+        the action, ``params`` and the sparse fieldset. The cached body has
+        no per-user fields; is_liked is patched in for the requesting user.
+        """
+        cached = response_cache.get_or_set(
+            'playlists', self.action, self.cached_list_params(params),
+            lambda: self.shared_list_body(list(get_queryset()))
+        )
+        
+        liked_ids = get_liked_ids(self.request, cached['ids']) if self.wants_is_liked() else set()
+        return Response(self.with_is_liked(cached, liked_ids))
+    
+    def cached_list_params(self, params):
+        """Response cache parameters for ``params`` and the sparse fieldset"""
+        fields, expand = self.get_sparse_fieldset()
+        return (params, sorted(fields), sorted(expand))
+    
+    def shared_list_body(self, playlists):
+        """Serialize playlists for the response cache, without per-user fields"""
+        context = self.get_serializer_context()
+        context['shared'] = True
+        serializer = self.get_serializer_class()(playlists, many=True, context=context)
+        return {
+            'ids': [playlist.pk for playlist in playlists],
+            'data': list(serializer.data),
+        }
+    
+    def wants_is_liked(self):
+        """Whether the response includes is_liked under the sparse fieldset"""
+        fields, _ = self.get_sparse_fieldset()
+        return not fields or 'is_liked' in fields
+    
+    def with_is_liked(self, cached, liked_ids):
+        """Patch is_liked into a cached list body for the requesting user"""
+        data = cached['data']
+        if self.wants_is_liked():
+            for playlist_id, item in zip(cached['ids'], data):
+                item['is_liked'] = playlist_id in liked_ids
+        return data
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def response_cache_stats(self, request):
+        """
+        Return hit ratios of the public response cache for this process.
+        """
+        return Response(response_cache.stats())
+    
+    def get_state_queryset(self):
+        """
+        Values of the visible playlists that their detail response depends
+        on, from which retrieve builds its validators. Tag renames and
+        owner profile changes show through their updated_at stamps; tags
+        added, removed or deleted bump the playlist's own updated_at.
+        """
+        return Playlist.objects.filter(Q(is_public=True) | Q(user=self.request.user)).values(
+            'id', 'user_id', 'updated_at', 'likes_changed_at',
+            'like_count', 'video_count', 'view_count', 'share_count',
+            'user__username', 'user__email', 'user__first_name', 'user__last_name',
+            'user__profile_picture', 'user__profile_picture_variants', 'user__updated_at'
+        ).annotate(last_video_at=Max('videos__added_at'), tags_changed_at=Max('tags__updated_at'))
+    
+    @staticmethod
+    def get_state_last_modified(state):
+        """The Last-Modified of a detail response, from its state values"""
+        return latest(
+            state['updated_at'], state['likes_changed_at'], state['last_video_at'],
+            state['tags_changed_at'], state['user__updated_at']
+        )
+    
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        """
+        Return a playlist with its videos.
+        Answers If-None-Match / If-Modified-Since with a 304 when nothing
+        the response depends on has changed, checked with a single query.
+        """
+        state = get_object_or_404(self.get_state_queryset(), pk=kwargs['pk'])
         
+        # View tracking is buffered and written in batches; the view count
+        # only goes up for a viewer's first view of someone else's playlist
         if request.user.is_authenticated:
-            view_exists = PlaylistView.objects.filter(
-                user=request.user,
-                playlist=instance
-            ).exists()
-            
-            PlaylistView.objects.update_or_create(
-                user=request.user,
-                playlist=instance,
-                defaults={'viewed_at': timezone.now()}
-            )
-            
-            # Only increment the view count if:
-            # 1. The viewer is not the owner
-            # 2. This is a new view (not just updating an existing view)
-            if request.user != instance.user and not view_exists:
-                instance.view_count = F('view_count') + 1
-                instance.save(update_fields=['view_count'])
-                instance.refresh_from_db()
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+            view_buffer.record(request.user.id, state['id'], state['user_id'])
+        
+        return conditional_response(
+            request,
+            lambda: Response(self.get_serializer(self.get_object()).data),
+            etag=make_etag(request.user.id, *state.values()),
+            last_modified=self.get_state_last_modified(state)
+        )
 
     @action(detail=False, methods=['get'])
     def recent_playlists(self, request):
@@ -108,11 +259,16 @@ class PlaylistViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_401_UNAUTHORIZED
             )
         
-        recent_views = PlaylistView.objects.filter(
+        recent_views = dict(PlaylistView.objects.filter(
             user=request.user
-        ).order_by('-viewed_at')[:10]
+        ).order_by('-viewed_at').values_list('playlist_id', 'viewed_at')[:10])
         
-        playlists = [view.playlist for view in recent_views]
+        # Include views still waiting in the buffer
+        for playlist_id, viewed_at in view_buffer.pending_for_user(request.user.id).items():
+            recent_views[playlist_id] = max(viewed_at, recent_views.get(playlist_id, viewed_at))
+        recent_ids = sorted(recent_views, key=recent_views.get, reverse=True)[:10]
+        
+        playlists = self.with_representation(Playlist.objects.all()).in_order(recent_ids)
         serializer = self.get_serializer(playlists, many=True)
         return Response(serializer.data)
     
@@ -120,7 +276,8 @@ class PlaylistViewSet(viewsets.ModelViewSet):
     def search(self, request):
         """
         Search playlists by query parameter.
-        Searches across title, description, tags and username.
+        Searches across title, description, tags and username, best match
+        first, paginated with page and limit (default 20) parameters.
         """
         query = request.query_params.get('q', '')
         if not query:
@@ -129,17 +286,12 @@ class PlaylistViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        user = request.user
-        queryset = Playlist.objects.filter(
-            Q(is_public=True) | Q(user=user)
-        ).prefetch_related('videos', 'likes', 'tags')
+        page, limit = get_page_params(request.query_params, 20, 100)
         
-        queryset = queryset.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(tags__name__icontains=query) |
-            Q(user__username__icontains=query)
-        ).distinct()
+        ranked_ids = search.get_backend().search(
+            query, request.user, (page - 1) * limit, limit
+        )
+        queryset = self.with_representation(Playlist.objects.all()).in_order(ranked_ids)
         
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
@@ -149,63 +301,83 @@ class PlaylistViewSet(viewsets.ModelViewSet):
         """
         Returns a random selection of public playlists for exploration.
         Supports pagination for infinite scrolling with 6 playlists per page.
+        Pages are slices of a per-day, per-user-bucket permutation. Its
+        generation is sent in the X-Explore-Generation header; passing it
+        back as ?generation= keeps later pages on the same permutation, so
+        they never repeat or skip a playlist while it stays cached, even
+        if playlists joined the feed since the first page.
         """
-        page = int(request.query_params.get('page', 1))
-        limit = int(request.query_params.get('limit', 6)) 
-        
-        base_queryset = Playlist.objects.filter(
-            is_public=True
-        ).annotate(
-            num_videos=Count('videos')
-        ).filter(
-            num_videos__gt=0
-        ).prefetch_related('videos', 'likes', 'tags')
-        
-        day_of_year = timezone.now().timetuple().tm_yday
-        user_id = request.user.id
-        seed = day_of_year * 1000 + user_id + page
-        random.seed(seed)
-        
-        total_playlists = base_queryset.count()
+        page, limit = get_page_params(request.query_params, 6, settings.EXPLORE_MAX_LIMIT)
+        key = explore.get_permutation_key(
+            request.user.id, explore.parse_generation(request.query_params.get('generation'))
+        )
         
-        if total_playlists <= limit:
-            queryset = base_queryset.all()
-        else:
-            offset = (page - 1) * limit
-            if offset >= total_playlists:
-                queryset = []
-            else:
-                playlist_ids = list(base_queryset.values_list('id', flat=True))
-                random.shuffle(playlist_ids)
-                
-                end_idx = min(offset + limit, len(playlist_ids))
-                page_ids = playlist_ids[offset:end_idx]
-                
-                if page_ids:
-                    queryset = Playlist.objects.filter(
-                        id__in=page_ids
-                    ).prefetch_related('videos', 'likes', 'tags')
-                else:
-                    queryset = []
+        def get_queryset():
+            page_ids = explore.get_page_ids(request.user.id, page, limit, key)
+            return self.with_representation(Playlist.objects.filter(
+                is_public=True
+            )).in_order(page_ids)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # Every user in a bucket sees the same pages, so they share entries
+        response = self.cached_list_response((key, page, limit), get_queryset)
+        response[explore.GENERATION_HEADER] = explore.key_generation(key)
+        return response
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post', 'put', 'delete'], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
         """
-        Toggle like status for a playlist.
+        Like or unlike a playlist.
+        PUT likes and DELETE unlikes, both idempotently; POST toggles.
         Any authenticated user can like/unlike a playlist.
         """
         playlist = self.get_object()
         user = request.user
         
-        if user in playlist.likes.all():
-            playlist.likes.remove(user)
-            return Response({'status': 'unliked'})
+        if request.method == 'PUT':
+            liked = True
+        elif request.method == 'DELETE':
+            liked = False
+        else:
+            liked = not likes.is_liked(playlist, user)
+        
+        if liked:
+            likes.like(playlist, user)
         else:
-            playlist.likes.add(user)
-            return Response({'status': 'liked'})
+            likes.unlike(playlist, user)
+        
+        like_count = Playlist.objects.filter(pk=playlist.pk).values_list('like_count', flat=True).get()
+        return Response({
+            'status': 'liked' if liked else 'unliked',
+            'like_count': like_count
+        })
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk_like(self, request):
+        """
+        Like or unlike many playlists in one request.
+        Expects {"playlist_ids": [...], "liked": true|false}.
+        """
+        serializer = BulkLikeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        requested_ids = set(serializer.validated_data['playlist_ids'])
+        liked = serializer.validated_data['liked']
+        
+        visible_ids = set(Playlist.objects.filter(
+            Q(is_public=True) | Q(user=request.user),
+            id__in=requested_ids
+        ).values_list('id', flat=True))
+        
+        changed = likes.set_liked(visible_ids, request.user, liked)
+        like_counts = dict(Playlist.objects.filter(
+            id__in=visible_ids
+        ).values_list('id', 'like_count'))
+        
+        return Response({
+            'status': 'liked' if liked else 'unliked',
+            'changed': sorted(changed),
+            'like_counts': like_counts,
+            'not_found': sorted(requested_ids - visible_ids)
+        })
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def share(self, request, pk=None):
@@ -227,31 +399,71 @@ class PlaylistViewSet(viewsets.ModelViewSet):
     def my_playlists(self, request):
         """
         Return only the current user's playlists.
+        Answers conditional requests from aggregate validators without
+        serializing the list.
         """
-        queryset = Playlist.objects.filter(user=request.user)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        playlists = Playlist.objects.filter(user=request.user)
+        state = playlists.aggregate(
+            count=Count('id'),
+            updated_at=Max('updated_at'),
+            likes_changed_at=Max('likes_changed_at'),
+            view_count=Sum('view_count'),
+            share_count=Sum('share_count'),
+        )
+        last_video_at = Video.objects.filter(
+            playlist__user=request.user
+        ).aggregate(last_video_at=Max('added_at'))['last_video_at']
+        
+        def render():
+            queryset = self.with_representation(playlists)
+            return Response(self.get_serializer(queryset, many=True).data)
+        
+        return conditional_response(
+            request,
+            render,
+            etag=make_etag(
+                request.user.id, request.user.username, str(request.user.profile_picture),
+                request.user.profile_picture_variants.get('source'),
+                request.query_params.urlencode(), last_video_at, *state.values()
+            ),
+            last_modified=latest(state['updated_at'], state['likes_changed_at'], last_video_at)
+        )
     
     @action(detail=False, methods=['get'])
     def liked_playlists(self, request):
         """
         Return playlists the current user has liked.
         """
-        queryset = request.user.liked_playlists.all()
+        queryset = self.with_representation(request.user.liked_playlists.all())
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def popular(self, request):
         """
-        Return the most viewed public playlists.
+        Return the most viewed public playlists, optionally for one tag.
+        """
+        return self.leaderboard_response('popular')
+    
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        Return the public playlists with the most recent activity,
+        optionally for one tag.
         """
-        queryset = Playlist.objects.filter(
-            is_public=True
-        ).order_by('-view_count')[:10]
+        return self.leaderboard_response('trending')
+    
+    def leaderboard_response(self, kind):
+        """Serialize a cached leaderboard, filtered by the optional ?tag="""
+        tag = self.request.query_params.get('tag')
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        def get_queryset():
+            ids = trending.get_leaderboard(kind, tag)
+            return self.with_representation(Playlist.objects.filter(
+                is_public=True
+            )).in_order(ids)
+        
+        return self.cached_list_response((tag,), get_queryset)
     
     @action(detail=False, methods=['get'])
     def by_tag(self, request):
@@ -265,9 +477,18 @@ class PlaylistViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        queryset = self.get_queryset().filter(tags__name=tag_name)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # The user's own private playlists are not part of the shared
+        # response, so users who have some with this tag bypass the cache
+        if Playlist.objects.filter(
+            user=request.user, is_public=False, tags__name=tag_name
+        ).exists():
+            queryset = self.get_queryset().filter(tags__name=tag_name)
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+        
+        return self.cached_list_response((tag_name,), lambda: self.with_representation(
+            Playlist.objects.filter(is_public=True, tags__name=tag_name)
+        ))
 
 class VideoViewSet(viewsets.ModelViewSet):
     """
@@ -281,6 +502,8 @@ class VideoViewSet(viewsets.ModelViewSet):
         Filter videos based on playlist ownership or public status.
         """
         user = self.request.user
+        if not user.is_authenticated:
+            return Video.objects.filter(playlist__is_public=True)
         return Video.objects.filter(
             Q(playlist__is_public=True) | Q(playlist__user=user)
         )
@@ -288,20 +511,159 @@ class VideoViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """
         Check if the current user owns the playlist before adding a video.
+        Without an explicit order the video goes after the last one.
         """
-        playlist_id = self.request.data.get('playlist')
-        playlist = Playlist.objects.get(id=playlist_id)
+        playlist = serializer.validated_data['playlist']
         
         if playlist.user != self.request.user:
+            raise PermissionDenied('You do not have permission to add videos to this playlist.')
+        
+        with transaction.atomic():
+            videos.lock_playlist(playlist.pk)
+            if 'order' not in self.request.data:
+                try:
+                    order = videos.next_order(playlist.pk)
+                except ValueError as error:
+                    raise ValidationError({'detail': str(error)})
+                serializer.save(order=order)
+            else:
+                serializer.save()
+    
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_add(self, request):
+        """
+        Add many videos to one of the user's playlists in one request.
+        Expects {"playlist": id, "videos": [...], "allow_duplicates": false}
+        and returns a result per item: created (with the video), invalid
+        (with errors) or duplicate (tiktok_id already in the playlist).
+        """
+        serializer = BulkVideoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        playlist = get_object_or_404(Playlist, pk=serializer.validated_data['playlist'])
+        
+        if playlist.user != request.user:
+            raise PermissionDenied('You do not have permission to add videos to this playlist.')
+        
+        items = serializer.validated_data['videos']
+        # Look up missing metadata of all items concurrently up front, within
+        # one SAVE_TIMEOUT, and validate the items against the results
+        metadata = tiktok.resolve_many(
+            [item['tiktok_url'] for item in items if tiktok.needs_metadata(item)],
+            timeout=settings.TIKTOK['SAVE_TIMEOUT']
+        )
+        
+        results = [None] * len(items)
+        valid_indexes, valid_items = [], []
+        for index, item in enumerate(items):
+            item_serializer = BulkVideoItemSerializer(data=item, context={'tiktok_metadata': metadata})
+            if item_serializer.is_valid():
+                valid_indexes.append(index)
+                valid_items.append(item_serializer.validated_data)
+            else:
+                results[index] = {'index': index, 'status': 'invalid', 'errors': item_serializer.errors}
+        
+        try:
+            added = videos.add_videos(
+                playlist, valid_items, serializer.validated_data['allow_duplicates']
+            )
+        except ValueError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        for index, item, (result, video) in zip(valid_indexes, valid_items, added):
+            results[index] = {'index': index, 'status': result}
+            if video is None:
+                results[index]['tiktok_id'] = item['tiktok_id']
+            else:
+                results[index]['video'] = VideoSerializer(video, context={'request': request}).data
+        
+        created = sum(1 for result in results if result['status'] == 'created')
+        return Response({
+            'created': created,
+            'duplicates': [
+                result['tiktok_id'] for result in results if result['status'] == 'duplicate'
+            ],
+            'results': results
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def move(self, request, pk=None):
+        """
+        Move a video directly after or before another video of its playlist.
+        Expects {"after": video_id} or {"before": video_id}.
+        """
+        video = self.get_object()
+        if video.playlist.user != request.user:
+            raise PermissionDenied('You do not have permission to reorder this playlist.')
+        
+        serializer = MoveVideoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        (position, neighbour_id), = serializer.validated_data.items()
+        
+        neighbour = Video.objects.filter(
+            pk=neighbour_id, playlist_id=video.playlist_id
+        ).exclude(pk=video.pk).first()
+        if neighbour is None:
             return Response(
-                {'detail': 'You do not have permission to add videos to this playlist.'},
-                status=status.HTTP_403_FORBIDDEN
+                {'detail': 'The target video must be another video of the same playlist.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        if 'order' not in self.request.data:
-            order = playlist.videos.count()
-            serializer.save(order=order)
+        order, rebalanced = videos.move_video(video, **{position: neighbour})
+        return Response({'id': video.pk, 'order': order, 'rebalanced': rebalanced})
+    
+    @action(detail=False, methods=['post'])
+    def reorder(self, request):
+        """
+        Set the order of all videos of one of the user's playlists.
+        Expects {"playlist": id, "videos": [video ids in their new order]}.
+        """
+        serializer = ReorderVideosSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        playlist = get_object_or_404(Playlist, pk=serializer.validated_data['playlist'])
+        
+        if playlist.user != request.user:
+            raise PermissionDenied('You do not have permission to reorder this playlist.')
+        
+        try:
+            changed = videos.reorder_videos(playlist, serializer.validated_data['videos'])
+        except ValueError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'status': 'reordered', 'changed': changed})
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def thumbnail_cache_stats(self, request):
+        """
+        Return the size of the thumbnail cache and its counters for this process.
+        """
+        return Response(thumbnail_cache.stats())
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def thumbnail(self, request, pk=None):
+        """
+        Serve the video's remote thumbnail_url from the local thumbnail cache.
+        Images are loaded without the auth header, so anonymous requests
+        get the thumbnails of public playlists. Links carrying the current
+        ?v= digest (see thumbnail_proxy_url) are cacheable for a year.
+        """
+        video = self.get_object()
+        if not video.thumbnail_url:
+            return Response({'detail': 'This video has no thumbnail.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        version = url_version(video.thumbnail_url)
+        response = get_conditional_response(request, etag=quote_etag(version))
+        if response is None:
+            try:
+                path, content_type = thumbnail_cache.get(video.thumbnail_url)
+            except ThumbnailUnavailable as error:
+                return Response({'detail': str(error)}, status=status.HTTP_502_BAD_GATEWAY)
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        
+        response['ETag'] = quote_etag(version)
+        visibility = {'public': True} if video.playlist.is_public else {'private': True}
+        if request.query_params.get('v') == version:
+            patch_cache_control(
+                response, max_age=settings.THUMBNAIL_PROXY['MAX_AGE'], immutable=True, **visibility
+            )
         else:
-            serializer.save()
-
-
+            patch_cache_control(response, no_cache=True, **visibility)
+        return response
@@ -12,4 +12,8 @@ class UsersConfig(AppConfig):
     the default database field type and the app's name.
     """
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'users'
\ No newline at end of file
+    name = 'users'
+
+    def ready(self):
+        """Register the signal handlers that maintain the follow counters."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('by-username/<str:username>/', async_views.user_by_username, name='async-user-by-username'),
+    path('follow-status/<int:user_id>/', async_views.follow_status, name='async-follow-status'),
+]
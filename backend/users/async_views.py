@@ -0,0 +1,65 @@
+"""
+Native async versions of the busiest user read endpoints, served under
+/api/v1/async/users/. See kalanisVault.async_api.
+"""
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.shortcuts import aget_object_or_404
+
+from kalanisVault.async_api import async_api_view, drf_view, render
+from kalanisVault.conditional import aconditional_response, latest, make_etag
+from .models import UserFollow
+from .serializers import UserFollowStatusSerializer
+from .views import UserByUsernameView
+
+User = get_user_model()
+
+
+@async_api_view
+async def user_by_username(request, username):
+    """
+    Return a user's profile with follow stats, answering conditional
+    requests like UserByUsernameView.
+    """
+    view = drf_view(UserByUsernameView, request, 'retrieve', username=username)
+    state = await aget_object_or_404(view.get_state_queryset(), username=username)
+    
+    async def render_profile():
+        instance, is_following = await asyncio.gather(
+            aget_object_or_404(view.get_queryset(), pk=state['id']),
+            UserFollow.objects.filter(followed_id=state['id'], follower=request.user).aexists(),
+        )
+        data = view.get_serializer(instance).data
+        data['follower_count'] = instance.follower_count
+        data['following_count'] = instance.following_count
+        data['is_following'] = is_following
+        return render(data)
+    
+    return await aconditional_response(
+        request,
+        render_profile,
+        etag=make_etag(request.user.id, *state.values()),
+        last_modified=latest(state['follows_changed_at'], state['date_joined'])
+    )
+
+
+@async_api_view
+async def follow_status(request, user_id):
+    """
+    Return whether the current user follows another user, and that user's
+    follower count.
+    """
+    follower_count, is_following = await asyncio.gather(
+        User.objects.filter(id=user_id).values_list('follower_count', flat=True).afirst(),
+        UserFollow.objects.filter(follower=request.user, followed_id=user_id).aexists(),
+    )
+    if follower_count is None:
+        return render({"detail": "User not found."}, status=404)
+    
+    serializer = UserFollowStatusSerializer(data={
+        'is_following': is_following,
+        'follower_count': follower_count
+    })
+    serializer.is_valid()
+    return render(serializer.data)
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_userfollow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Follower Count'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Following Count'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='liked_playlist_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Liked Playlist Count'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='playlist_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Playlist Count'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follows_changed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Follows Changed At'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_user_follows_changed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Profile Picture Variants'),
+        ),
+    ]
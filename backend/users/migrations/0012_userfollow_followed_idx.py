@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_user_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userfollow',
+            index=models.Index(fields=['followed', 'follower'], name='userfollow_followed_idx'),
+        ),
+    ]
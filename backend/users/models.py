@@ -3,11 +3,12 @@ This module defines the User model for the application.
 It extends Django's AbstractBaseUser to implement a custom user model
 with email-based authentication and additional profile fields.
 """
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
 from .managers import CustomUserManager
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
 
 class User(AbstractBaseUser, PermissionsMixin):
     """
@@ -27,10 +28,21 @@ class User(AbstractBaseUser, PermissionsMixin):
         default="profile_pics/default.png",
         blank=True
     )
+    profile_picture_variants = models.JSONField(
+        _("Profile Picture Variants"), default=dict, blank=True
+    )
     
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
+    # Bumped by profile edits and new picture variants, not by last_login
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    playlist_count = models.PositiveIntegerField(_("Playlist Count"), default=0)
+    liked_playlist_count = models.PositiveIntegerField(_("Liked Playlist Count"), default=0)
+    follower_count = models.PositiveIntegerField(_("Follower Count"), default=0)
+    following_count = models.PositiveIntegerField(_("Following Count"), default=0)
+    follows_changed_at = models.DateTimeField(_("Follows Changed At"), blank=True, null=True)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name", "username"]
@@ -40,6 +52,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = _("User")
         verbose_name_plural = _("Users")
+        indexes = [
+            # Case-insensitive prefix search in UserSearchView
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('first_name'), name='user_first_name_lower_idx'),
+            models.Index(Lower('last_name'), name='user_last_name_lower_idx'),
+        ]
 
     def __str__(self):
         """
@@ -49,6 +67,17 @@ class User(AbstractBaseUser, PermissionsMixin):
             The user's email address
         """
         return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored username, so a save can tell it changed
+        if 'username' in field_names:
+            instance._loaded_username = instance.username
+        # and the stored picture, so a replaced one can be released
+        if 'profile_picture' in field_names:
+            instance._loaded_profile_picture = instance.profile_picture.name
+        return instance
     
     @property
     def get_full_name(self):
@@ -60,26 +89,6 @@ class User(AbstractBaseUser, PermissionsMixin):
         """
         return f"{self.first_name} {self.last_name}"
     
-    @property
-    def playlist_count(self):
-        """Returns the number of playlists created by this user"""
-        return self.playlists.count()
-
-    @property
-    def follower_count(self):
-        """Returns the number of users following this user"""
-        return self.followers.count()
-
-    @property
-    def following_count(self):
-        """Returns the number of users this user is following"""
-        return self.following.count()
-
-    @property
-    def liked_playlist_count(self):
-        """Returns the number of playlists this user has liked"""
-        return self.liked_playlists.count()
-    
 class UserFollow(models.Model):
     """
     Model to track user follow relationships.
@@ -105,10 +114,22 @@ class UserFollow(models.Model):
         unique_together = ('follower', 'followed')
         verbose_name = _("User Follow")
         verbose_name_plural = _("User Follows")
+        indexes = [
+            # A user's followers; the unique constraint covers the other direction
+            models.Index(fields=['followed', 'follower'], name='userfollow_followed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.follower.username} follows {self.followed.username}"
 
+    def save(self, *args, **kwargs):
+        """
+        Save inside a transaction so the follow counters, maintained by a
+        post_save handler, commit together with the relationship.
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
     def clean(self):
         """Validate that users cannot follow themselves."""
         if self.follower == self.followed:
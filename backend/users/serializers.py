@@ -9,6 +9,7 @@ from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 from djoser.serializers import TokenCreateSerializer
 from django.contrib.auth import authenticate
+from kalanisVault.images import ImageVariantsField
 from .models import UserFollow
 
 logger = logging.getLogger('users')
@@ -23,10 +24,12 @@ class CreateUserSerializer(UserCreateSerializer):
     including profile picture uploads and additional validation.
     """
     profile_picture = serializers.ImageField(required=False, allow_null=True)
+    profile_picture_variants = ImageVariantsField('profile_picture')
 
     class Meta(UserCreateSerializer.Meta):
         model = User
-        fields = ['id', 'email', 'username', 'first_name', 'last_name', 'password', 'profile_picture']
+        fields = ['id', 'email', 'username', 'first_name', 'last_name', 'password',
+                  'profile_picture', 'profile_picture_variants']
     
     def validate(self, data):
         """
@@ -63,6 +66,18 @@ class CreateUserSerializer(UserCreateSerializer):
         return user
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact, read-only representation of a user for nesting in lists.
+    """
+    profile_picture_variants = ImageVariantsField('profile_picture')
+    
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'profile_picture', 'profile_picture_variants']
+        read_only_fields = fields
+
+
 class CustomTokenCreateSerializer(TokenCreateSerializer):
     """
     Custom serializer for token creation during user authentication.
@@ -0,0 +1,27 @@
+"""
+This module registers the signal handlers for the users app.
+They keep the follower and following counters on User, and the
+follows_changed_at stamp, in step with the UserFollow table.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from kalanisVault.counters import adjust
+from .models import User, UserFollow
+
+
+@receiver(post_save, sender=UserFollow)
+def follow_created(sender, instance, created, **kwargs):
+    """Increment both sides' counters when a follow is created"""
+    if created:
+        now = timezone.now()
+        adjust(User.objects.filter(pk=instance.followed_id), 'follower_count', 1, follows_changed_at=now)
+        adjust(User.objects.filter(pk=instance.follower_id), 'following_count', 1, follows_changed_at=now)
+
+
+@receiver(post_delete, sender=UserFollow)
+def follow_deleted(sender, instance, **kwargs):
+    """Decrement both sides' counters when a follow is removed"""
+    now = timezone.now()
+    adjust(User.objects.filter(pk=instance.followed_id), 'follower_count', -1, follows_changed_at=now)
+    adjust(User.objects.filter(pk=instance.follower_id), 'following_count', -1, follows_changed_at=now)
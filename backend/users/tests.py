@@ -1,3 +1,123 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from kalanisVault.testing import AsyncEndpointTestCase, QueryPlanTestCase, create_user
+from .models import User, UserFollow
+
+
+class FollowQueryPlanTests(QueryPlanTestCase):
+    """
+    Regression tests for the indexes behind follower checks.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(number) for number in range(8)]
+        UserFollow.objects.bulk_create([
+            UserFollow(follower=follower, followed=followed)
+            for follower in cls.users
+            for followed in cls.users
+            if follower != followed
+        ])
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def test_profile_follow_check_uses_index(self):
+        path = f'/api/v1/users/by-username/{self.users[1].username}/'
+        for plan in self.get_plans(self.client, path, 'users_userfollow'):
+            self.assertUsesIndex(plan, 'users_userfollow')
+
+    def test_follow_status_uses_index(self):
+        path = f'/api/v1/users/follow-status/{self.users[1].pk}/'
+        for plan in self.get_plans(self.client, path, 'users_userfollow'):
+            self.assertUsesIndex(plan, 'users_userfollow')
+
+    def test_followers_are_read_from_covering_index(self):
+        queryset = UserFollow.objects.filter(followed=self.users[1]).values('follower_id')
+        plan = self.query_plan(str(queryset.query))
+        self.assertUsesIndex(plan, 'users_userfollow')
+        self.assertIn('COVERING INDEX userfollow_followed_idx', ' '.join(plan))
+
+
+class FollowCounterTests(TestCase):
+    """
+    The denormalized follow counters follow rows as they come and go.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(number) for number in range(2)]
+
+    def assertCounts(self, follower_count, following_count):
+        followed, follower = self.users[1], self.users[0]
+        followed.refresh_from_db()
+        follower.refresh_from_db()
+        self.assertEqual(followed.follower_count, follower_count)
+        self.assertEqual(follower.following_count, following_count)
+
+    def test_follow_and_unfollow(self):
+        follow = UserFollow.objects.create(follower=self.users[0], followed=self.users[1])
+        self.assertCounts(1, 1)
+        follow.delete()
+        self.assertCounts(0, 0)
+
+    def test_decrement_is_clamped(self):
+        follow = UserFollow.objects.create(follower=self.users[0], followed=self.users[1])
+        type(self.users[0]).objects.filter(pk__in=[user.pk for user in self.users]).update(
+            follower_count=0, following_count=0
+        )
+        follow.delete()
+        self.assertCounts(0, 0)
+
+
+class UserSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        cls.other = User.objects.create_user(
+            email="emile@example.com", username="Émile", first_name="Émile",
+            last_name="Zola", password="password123!", is_active=True,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        response = self.client.get('/api/v1/users/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data]
+
+    def test_prefix_match_ignores_ascii_case(self):
+        self.assertEqual(self.search("ZO"), ["Émile"])
+        self.assertEqual(self.search("ÉMI"), ["Émile"])
+        self.assertEqual(self.search("user"), [])
+
+    def test_page_parameters_are_validated(self):
+        response = self.client.get('/api/v1/users/search/', {'q': "z", 'page': "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.search("z", limit=0), ["Émile"])
+
+
+class UserAsyncEndpointTests(AsyncEndpointTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(number) for number in range(3)]
+        UserFollow.objects.create(follower=cls.users[0], followed=cls.users[1])
+
+    async def test_profile_matches_sync(self):
+        response = await self.assertSameResponse(
+            self.users[0], f'users/by-username/{self.users[1].username}/'
+        )
+        self.assertTrue(response.json()['is_following'])
+        await self.assertSameResponse(self.users[0], f'users/by-username/{self.users[2].username}/')
+        await self.assertSameResponse(self.users[0], 'users/by-username/nobody/')
+
+    async def test_follow_status_matches_sync(self):
+        response = await self.assertSameResponse(
+            self.users[0], f'users/follow-status/{self.users[1].pk}/'
+        )
+        self.assertEqual(response.json(), {'is_following': True, 'follower_count': 1})
+        await self.assertSameResponse(self.users[1], f'users/follow-status/{self.users[0].pk}/')
+        await self.assertSameResponse(self.users[0], 'users/follow-status/0/')
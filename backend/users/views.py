@@ -1,12 +1,18 @@
 from rest_framework import generics, permissions
+from rest_framework.generics import get_object_or_404
 from django.contrib.auth import get_user_model
 from rest_framework.parsers import MultiPartParser, FormParser
 from .serializers import CreateUserSerializer, UserFollowSerializer, UserFollowStatusSerializer
 from .models import UserFollow
 from rest_framework.response import Response
 from rest_framework import status
+import string
+from django.db import connection
 from django.db.models import Q
+from django.db.models.functions import Lower
 from rest_framework.views import APIView
+from kalanisVault.conditional import conditional_response, latest, make_etag
+from kalanisVault.params import get_page_params
 
 User = get_user_model()
 
@@ -48,21 +54,43 @@ class UserByUsernameView(generics.RetrieveAPIView):
     lookup_field = 'username'
     lookup_url_kwarg = 'username'
 
+    def get_state_queryset(self):
+        """Values of users that their profile response depends on"""
+        return User.objects.values(
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'profile_picture', 'profile_picture_variants',
+            'follower_count', 'following_count', 'follows_changed_at', 'date_joined'
+        )
+
     def retrieve(self, request, *args, **kwargs):
-        """Custom retrieve method to include follow stats."""
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        
-        data['follower_count'] = instance.followers.count()
-        data['following_count'] = instance.following.count()
+        """
+        Custom retrieve method to include follow stats.
+        Answers conditional requests with a 304 when neither the profile nor
+        its follows changed, checked with a single query.
+        """
+        state = get_object_or_404(self.get_state_queryset(), username=kwargs['username'])
         
-        is_following = False
-        if request.user.is_authenticated:
-            is_following = instance.followers.filter(follower=request.user).exists()
-        data['is_following'] = is_following
+        def render():
+            instance = self.get_object()
+            serializer = self.get_serializer(instance)
+            data = serializer.data
+            
+            data['follower_count'] = instance.follower_count
+            data['following_count'] = instance.following_count
+            
+            is_following = False
+            if request.user.is_authenticated:
+                is_following = instance.followers.filter(follower=request.user).exists()
+            data['is_following'] = is_following
+            
+            return Response(data)
         
-        return Response(data)
+        return conditional_response(
+            request,
+            render,
+            etag=make_etag(request.user.id, *state.values()),
+            last_modified=latest(state['follows_changed_at'], state['date_joined'])
+        )
 
 class FollowUserView(generics.CreateAPIView):
     """API endpoint to follow a user."""
@@ -157,7 +185,7 @@ class FollowStatusView(generics.RetrieveAPIView):
                 followed=target_user
             ).exists()
             
-            follower_count = target_user.followers.count()
+            follower_count = target_user.follower_count
             
             data = {
                 'is_following': is_following,
@@ -174,36 +202,62 @@ class FollowStatusView(generics.RetrieveAPIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+# SQLite's LOWER() only folds ASCII letters
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def db_lower(value):
+    """Lower-case ``value`` the way the database's LOWER() does"""
+    if connection.vendor == 'sqlite':
+        return value.translate(ASCII_LOWER)
+    return value.lower()
+
+
 class UserSearchView(APIView):
     """API endpoint to search for users by username or name."""
     permission_classes = [permissions.IsAuthenticated]
+    search_fields = ['username', 'first_name', 'last_name']
     
     def get(self, request):
         """
         Search users by query parameter.
-        Searches across username, first_name, and last_name.
+        Matches users whose username, first_name or last_name starts with
+        the query, paginated with page and limit (default 20) parameters.
         """
-        query = request.query_params.get('q', '')
+        query = db_lower(request.query_params.get('q', '').strip())
         if not query:
             return Response(
                 {"detail": "Search query is required."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        queryset = User.objects.exclude(id=request.user.id)
+        page, limit = get_page_params(request.query_params, 20, 100)
+        offset = (page - 1) * limit
+        
+        # Compare lower(field) against a [query, query + max char) range so
+        # the lower() expression indexes on User can serve the prefix match
+        upper_bound = query + chr(0x10FFFF)
+        matches = Q()
+        for field in self.search_fields:
+            matches |= Q(**{
+                f'{field}_lower__gte': query,
+                f'{field}_lower__lt': upper_bound
+            })
+        
+        queryset = User.objects.exclude(id=request.user.id).annotate(**{
+            f'{field}_lower': Lower(field) for field in self.search_fields
+        }).filter(matches).order_by('username')
         
-        queryset = queryset.filter(
-            Q(username__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        ).distinct()
+        users = list(queryset[offset:offset + limit])
+        following_ids = set(UserFollow.objects.filter(
+            follower=request.user,
+            followed__in=users
+        ).values_list('followed_id', flat=True))
         
-        users_data = []
-        for user in queryset:
-            user_data = CreateUserSerializer(user, context={'request': request}).data
-            user_data['follower_count'] = user.followers.count()
-            user_data['following_count'] = user.following.count()
-            user_data['is_following'] = user.followers.filter(follower=request.user).exists()
-            users_data.append(user_data)
+        users_data = CreateUserSerializer(users, many=True, context={'request': request}).data
+        for user, user_data in zip(users, users_data):
+            user_data['follower_count'] = user.follower_count
+            user_data['following_count'] = user.following_count
+            user_data['is_following'] = user.id in following_ids
         
-        return Response(users_data)
\ No newline at end of file
+        return Response(users_data)
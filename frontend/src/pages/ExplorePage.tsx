@@ -37,6 +37,9 @@ const ExplorePage: React.FC = () => {
   const PLAYLISTS_PER_PAGE = 6; // Changed from 8 to 6
   const observerRef = useRef<IntersectionObserver | null>(null);
   const loadMoreRef = useRef<HTMLDivElement>(null);
+  // Feed generation of the first page, sent back so later pages come from
+  // the same shuffle even if playlists are added in between
+  const generationRef = useRef<string | null>(null);
 
   useEffect(() => {
     if (user && Object.keys(userInfo || {}).length === 0) {
@@ -90,10 +93,17 @@ const ExplorePage: React.FC = () => {
           params: {
             page: pageNum,
             limit: PLAYLISTS_PER_PAGE,
+            ...(!isInitial && generationRef.current
+              ? { generation: generationRef.current }
+              : {}),
           },
         }
       );
 
+      if (isInitial) {
+        generationRef.current = response.headers["x-explore-generation"] ?? null;
+      }
+
       setHasMore(response.data.length === PLAYLISTS_PER_PAGE);
 
       if (isInitial) {